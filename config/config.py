@@ -7,14 +7,45 @@
 # - "driving": 驾驶模拟模式，支持陀螺仪
 MODE = "driving"
 
+# 启动时的配置档案
+# - "default": config/buttons.json
+# - 其它: config/profiles/<名称>.json（可在 JSON 中用 "mode" 指定该档案的模式，缺省为上面的 MODE）
+# 所有档案在启动时预加载，运行中可通过网页或 POST /api/profiles/switch 切换，无需重启
+ACTIVE_PROFILE = "default"
+
 # 调试选项
 DEBUG = True  # 是否输出详细日志
 SHOW_JOYSTICK_MONITOR = True  # 是否显示虚拟手柄监视器悬浮窗
 
+# 按键注入后端
+# - "auto": Linux 上优先使用 uinput 虚拟键盘（需要 /dev/uinput 写权限），否则使用 pynput
+# - "uinput": uinput 虚拟键盘（不依赖 X11，Wayland/控制台下也可用），失败时回退到 pynput
+# - "pynput": 使用 pynput
+# - "null": 只打印按键，不实际注入
+KEYBOARD_BACKEND = "auto"
+
 # 服务器配置
 SERVER_HOST = "0.0.0.0"
 SERVER_PORT = 5000
 
+# 服务器运行模式（启动时会在日志中打印当前模式）
+# - "threading": Werkzeug + 每个连接一个线程（默认，无额外依赖）
+# - "asgi": uvicorn 上的 asyncio Socket.IO 服务器，需要 pip install uvicorn a2wsgi；
+#   事件处理函数（按键组合中的等待、布局文件读写等）在线程池中执行，不阻塞事件循环
+# - "eventlet" / "gevent": 交给 flask-socketio 的对应协程模式（需自行安装）
+SERVER_MODE = "threading"
+
+ASGI_CONFIG = {
+    "workers": 16,           # 执行 Socket.IO 事件处理函数 / Flask 路由的线程数
+    "log_level": "warning",  # uvicorn 日志级别
+}
+
+# devicemotion 角速度源（轴配置的 source_id 为 rate_alpha/beta/gamma 或 fused_alpha/beta/gamma 时使用）
+MOTION_CONFIG = {
+    "time_constant": 1.0,  # fused_* 源向 deviceorientation 姿态校正漂移的时间常数（秒），越小越贴近原始姿态
+    "max_dt": 0.1,         # 相邻样本间隔超过该值（秒）视为中断，不积分
+}
+
 # 驾驶模式设置
 DRIVING_CONFIG = {
     # 陀螺仪灵敏度倍数
@@ -42,7 +73,30 @@ DRIVING_CONFIG = {
             "source_id": "gamma",   # 陀螺仪轴名称或拖动条ID
             "peak_value": 1.0,      # 峰值（最大输出）
             "deadzone": 0.05,       # 死区
-            "gyro_range": 90.0      # 陀螺仪归一化范围（度），90度表示转动90度达到满输出
+            "gyro_range": 90.0,     # 陀螺仪归一化范围（度），90度表示转动90度达到满输出
+            "outer_deadzone": 0.0,  # 外死区：幅值达到 1 - outer_deadzone 即满输出
+            "anti_deadzone": 0.0,   # 反死区：离开死区后输出从该值起步（抵消游戏内死区）
+            "invert": False,        # 反转输出
+            # 响应曲线（作用于去除死区后的幅值，启动/保存配置时编译为查找表）
+            # type: linear / expo / s_curve / spline / asymmetric
+            # expo、s_curve 使用 exponent；spline 使用 points: [[x, y], ...]；
+            # asymmetric 使用 positive / negative 两条子曲线
+            "curve": {
+                "type": "linear",
+                "exponent": 2.0
+            },
+            # 滤波与延迟补偿（仅对陀螺仪源生效）
+            # type: none / one_euro / critically_damped
+            # prediction: none / linear / velocity，外推时长为测得的网络延迟（不超过 max_horizon 秒）
+            "filter": {
+                "type": "none",
+                "min_cutoff": 1.0,
+                "beta": 5.0,
+                "d_cutoff": 1.0,
+                "smooth_time": 0.03,
+                "prediction": "none",
+                "max_horizon": 0.05
+            }
         },
         "left_y": {
             "source_type": "gyro",
@@ -82,6 +136,108 @@ DRIVING_CONFIG = {
     }
 }
 
+# 输入看门狗（驾驶模式）
+# 主设备切到后台、断网或断开连接时，把它驱动的轴归中
+WATCHDOG_CONFIG = {
+    "enabled": True,
+    # 陀螺仪等持续输出的源超过该时间（秒）没有更新即视为停滞
+    "timeout": 0.5,
+    # 归中方式: "ramp"（在 ramp_time 内线性回零）或 "snap"（立即归零）
+    "recenter": "ramp",
+    "ramp_time": 0.2,
+    # 检查间隔（秒）
+    "interval": 0.05,
+}
+
+# 宏（按钮动作为“宏”时）：调度线程按单调时钟执行按键序列
+MACRO_CONFIG = {
+    # 截止时间前多少秒改为自旋等待，换取亚毫秒级精度（0 为只睡眠）
+    "spin_threshold": 0.002,
+    # 宏脚本中 tap 未写时间时的保持时间（秒）
+    "default_hold": 0.03,
+    # /api/status 中时间误差统计使用的最近步骤数
+    "stats_window": 2000,
+}
+
+# 输入录制：把收到的陀螺仪、拖动条、按钮事件写入二进制日志，用 server/input_recorder.py 回放
+# 运行中通过 POST /api/recording {"action": "start"|"stop"} 开始/停止
+RECORDING_CONFIG = {
+    # 录制文件目录（默认为项目根目录下的 recordings/）
+    "directory": None,
+    # 启动服务器时自动开始录制
+    "autostart": False,
+}
+
+# 运行指标：GET /metrics 以 Prometheus 文本格式输出各事件处理函数的调用次数、异常和耗时直方图
+METRICS_CONFIG = {
+    "enabled": True,
+}
+
+# 网页看板（/dashboard）与直播叠加层（/overlay，可作为 OBS 浏览器源）
+# 状态按 max_rate 采样并以增量推送（/api/dashboard/stream，Server-Sent Events）
+DASHBOARD_CONFIG = {
+    "enabled": True,
+    # 每秒最多推送的帧数
+    "max_rate": 30,
+}
+
+# 共享内存遥测：虚拟手柄每写入一帧，把轴值、按键、主设备和时间戳发布到定长布局的映射文件
+# 外部工具用 server/telemetry.py 中的 TelemetryReader（或按其中文档的布局）直接读取
+TELEMETRY_CONFIG = {
+    "enabled": True,
+    # 文件路径；为 None 时 Linux 上为 /dev/shm/wtxrc-telemetry，其他系统在临时目录
+    "path": None,
+}
+
+# 按需采样分析器：GET/POST /api/debug/profile?seconds=5 对运行中的服务器采样，返回折叠栈（火焰图）
+PROFILER_CONFIG = {
+    "enabled": True,
+    # 访问令牌（请求头 "Authorization: Bearer <token>" 或 ?token=）；为 None 时启动时随机生成并打印
+    "token": None,
+    # 单次采样的最长时间（秒）
+    "max_duration": 30,
+    # 默认采样间隔（秒）
+    "interval": 0.005,
+}
+
+# 本地多人（驾驶模式）：最多同时存在的主设备数，每台主设备绑定一个独立的虚拟手柄（玩家 1..N）
+# 为 1 时新的主设备会替换之前的主设备
+MAX_GAMEPADS = 1
+
+# 鼠标（相对移动）后端，用于陀螺仪瞄准和触控板；取值同 KEYBOARD_BACKEND
+MOUSE_BACKEND = "auto"
+
+# 鼠标输出频率（Hz）：陀螺仪瞄准与触控板的位移在一个输出周期内累积后一次写出
+MOUSE_OUTPUT_RATE = 250
+
+# 触控板控件：单指移动指针，轻触点击，双指拖动滚动，双指轻触右键
+# 指针灵敏度在每个触控板控件上单独设置（布局编辑器）
+TOUCHPAD_CONFIG = {
+    # 每个 CSS 像素的双指位移对应的滚轮格数
+    "scroll_sensitivity": 0.05,
+    # 自然滚动：内容跟随手指移动（与手机一致）
+    "natural_scroll": True,
+}
+
+# 陀螺仪瞄准（驾驶模式下主设备可切换）：姿态变化转换为鼠标相对移动
+GYRO_MOUSE_CONFIG = {
+    # 新的主设备默认是否使用陀螺仪瞄准
+    "enabled": False,
+    # 水平 / 竖直移动使用的姿态角: "alpha" / "beta" / "gamma"
+    "yaw_source": "alpha",
+    "pitch_source": "beta",
+    # 每度对应的像素数
+    "sensitivity": 20.0,
+    "invert_x": False,
+    "invert_y": False,
+    # 加速：角速度超过 accel_threshold（度/秒）后，每超出 100 度/秒增益增加 acceleration，最大 max_gain
+    "acceleration": 0.0,
+    "accel_threshold": 30.0,
+    "max_gain": 3.0,
+    # 单个样本超过该角度（度）的跳变视为传感器异常并丢弃
+    "max_delta": 45.0,
+}
+
 # 虚拟摇杆设置（驾驶模式）
 
 # Joystick Settings (for driving mode)
@@ -91,6 +247,14 @@ JOYSTICK_CONFIG = {
     # Axis range
     "axis_min": -32767,
     "axis_max": 32767,
+    # Trigger range (left_trigger / right_trigger)
+    "trigger_min": 0,
+    "trigger_max": 255,
+    # Linux backend:
+    # - "auto": write /dev/uinput directly, fall back to python-uinput
+    # - "raw": only write /dev/uinput directly (full axis set incl. triggers)
+    # - "python-uinput": only use python-uinput (sticks and A/B/X/Y only)
+    "linux_backend": "auto",
 }
 
 # Supported Modifier Keys
@@ -1,14 +1,33 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
+import hmac
 import json
+import math
 import os
+import secrets
 import sys
 import multiprocessing
-from overlay import run_overlay
+import socket
 import input_manager
 import signal
 import time
+import axis_curves
+from startup import tracker, STATE_LOADING, STATE_READY, STATE_FAILED, STATE_DISABLED
+from input_watchdog import InputWatchdog
+from axis_filters import LatencyEstimator
+from gamepad_pool import (GamepadPool, InputPipeline, AXIS_SLOTS, GAMEPAD_AXES, GAMEPAD_API_AXES, GAMEPAD_API_BUTTONS,
+                          GAMEPAD_API_TRIGGERS)
+from joystick_manager import STICK_AXES
+from gyro_mouse import GyroMouse
+from motion_fusion import OrientationFusion, MOTION_RATE_SOURCES, MOTION_FUSED_SOURCES
+from pointer_output import PointerOutput, MOUSE_BUTTONS
+from profiles import ProfileStore, DEFAULT_PROFILE
+from input_recorder import InputRecorder
+from metrics import MetricsRegistry, RateGauge, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from dashboard import StateBroadcaster
+from telemetry import TelemetryWriter
+from profiler import SamplingProfiler, ProfilerBusy, DEFAULT_INTERVAL as PROFILER_INTERVAL
 
 # 将配置目录加入路径以便导入
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -17,7 +36,11 @@ from config import config
 app = Flask(__name__, template_folder="../templates", static_folder="../static")
 app.config['SECRET_KEY'] = 'secret!'
 CORS(app)  # 启用CORS
-socketio = SocketIO(app, cors_allowed_origins="*")
+# 运行模式由 config.SERVER_MODE 决定，不再取决于是否安装了 eventlet；
+# asgi 模式下这里的 threading 服务器只用于登记处理函数，启动时由 asgi_server 接管
+SERVER_MODE = getattr(config, 'SERVER_MODE', 'threading')
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    async_mode='threading' if SERVER_MODE in ('threading', 'asgi') else SERVER_MODE)
 
 # IPC Queue for Overlay
 overlay_queue = multiprocessing.Queue()
@@ -25,47 +48,382 @@ overlay_process = None
 
 # Store connected devices and their roles
 connected_devices = {}
-main_device_sid = None
 
-# Virtual joystick instance
+# Virtual joystick instance（玩家 1 的虚拟手柄，启动时创建）
 virtual_joystick = None
 slider_values = {}  # 存储拖动条当前值
 
+
+def _create_player_joystick(slot):
+    """按需为玩家槽位创建虚拟手柄；玩家 1 使用启动时创建的 virtual_joystick"""
+    if slot == 0 or not profiles.has_mode('driving'):
+        return virtual_joystick
+    from joystick_manager import VirtualJoystick
+    name = f"{config.JOYSTICK_CONFIG.get('name', 'wtxrc virtual gamepad')} {slot + 1}"
+    joystick = VirtualJoystick(name=name, monitor=False)
+    print(f"[POOL] 玩家 {slot + 1} 的虚拟手柄: {joystick.backend if joystick.initialized else '初始化失败'}")
+    return joystick
+
+
+# 主设备 -> 虚拟手柄槽位（每台主设备一个玩家）
+gamepad_pool = GamepadPool(getattr(config, 'MAX_GAMEPADS', 1), factory=_create_player_joystick)
+# 非主设备的输入（拖动条）作用于玩家 1，没有主设备时使用这条管线
+_default_pipeline = InputPipeline()
+
+# 各连接的网络延迟估计
+latency = LatencyEstimator()
+
+# 鼠标输出线程：陀螺仪瞄准与触控板的位移按输出周期累积，事件处理函数不直接注入
+pointer_output = PointerOutput(input_manager.load_mouse_backend, getattr(config, 'MOUSE_OUTPUT_RATE', 250))
+
+# 陀螺仪瞄准：主设备的姿态变化转换为鼠标相对移动
+gyro_mouse = GyroMouse(pointer_output, getattr(config, 'GYRO_MOUSE_CONFIG', {}))
+
+# 触控板控件：双指滚动的像素 -> 滚轮格数
+_touchpad_config = getattr(config, 'TOUCHPAD_CONFIG', {})
+_touchpad_scroll_scale = float(_touchpad_config.get('scroll_sensitivity', 0.05)) * \
+    (1.0 if _touchpad_config.get('natural_scroll', True) else -1.0)
+
+# 宏 / 按键序列：单独的调度线程按单调时钟执行，button_up 时取消连发
+macro_engine = input_manager.MacroEngine(input_manager.load_backend, getattr(config, 'MACRO_CONFIG', {}))
+
+# 输入录制（见 input_recorder.py），开始录制前 record() 不做任何事
+recorder = InputRecorder()
+_recording_config = getattr(config, 'RECORDING_CONFIG', {})
+
+# 运行指标（/metrics）：模块末尾包装所有处理函数，见 _setup_metrics()
+metrics = MetricsRegistry()
+_metrics_config = getattr(config, 'METRICS_CONFIG', {})
+
+# 网页看板 / 直播叠加层：广播循环按 max_rate 采样状态并推送增量，见 _dashboard_state()
+_dashboard_config = getattr(config, 'DASHBOARD_CONFIG', {})
+dashboard = StateBroadcaster(lambda: _dashboard_state(), _dashboard_config.get('max_rate', 30))
+
+# 共享内存遥测：虚拟手柄每写入一帧就发布到定长布局的映射文件，供外部工具零拷贝读取（telemetry.py）
+# 在 start_background_tasks() 中创建，回放、压力测试等导入本模块的工具不会覆盖运行中服务器的文件
+_telemetry_config = getattr(config, 'TELEMETRY_CONFIG', {})
+telemetry = None
+
+# 按需采样分析器（/api/debug/profile），不采样时没有线程也没有钩子
+_profiler_config = getattr(config, 'PROFILER_CONFIG', {})
+profiler = SamplingProfiler(max_duration=float(_profiler_config.get('max_duration', 30)))
+_profiler_token = _profiler_config.get('token') or secrets.token_urlsafe(16)
+
+# 按住中的按钮（button_down 之后、button_up 之前）：sid -> {btn_id}
+held_buttons = {}
+
+# 手机上连接的手柄按住的虚拟手柄按键：sid -> (VirtualJoystick, {button})
+gamepad_held = {}
+
+# devicemotion 角速度源（rate_* / fused_*）的姿态融合参数
+_motion_config = getattr(config, 'MOTION_CONFIG', {})
+
 # 向后兼容常量：旧配置（没有axis_config）使用的陀螺仪范围
 LEGACY_GYRO_RANGE = 45.0
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../config/buttons.json')
+PROFILES_DIR = os.path.join(os.path.dirname(__file__), '../config/profiles')
+
+
+def _on_input_stall(source, reason, axes, owner):
+    """看门狗回调：输入源停滞或断开时释放按住的输入并通知客户端"""
+    print(f"[WATCHDOG] 输入源 {source} 停滞 ({reason})，归中轴: {axes}")
+    if owner is not None:
+        _release_held_inputs(owner)
+        gyro_mouse.forget(owner)
+        if owner in connected_devices:
+            socketio.emit('input_stalled', {'source': source, 'reason': reason, 'axes': axes}, to=owner)
+
+
+_watchdog_config = getattr(config, 'WATCHDOG_CONFIG', {})
+watchdog = InputWatchdog(
+    lambda: virtual_joystick,
+    timeout=_watchdog_config.get('timeout', 0.5),
+    recenter=_watchdog_config.get('recenter', 'ramp'),
+    ramp_time=_watchdog_config.get('ramp_time', 0.2),
+    interval=_watchdog_config.get('interval', 0.05),
+    on_stall=_on_input_stall,
+)
+
+
+def _release_held_inputs(sid):
+    """释放某个连接按住的按钮：隐藏 overlay，松开虚拟手柄按键"""
+    if held_buttons.pop(sid, None):
+        overlay_queue.put({'cmd': 'HIDE'})
+    macro_engine.cancel_owner(sid)
+    session = gamepad_pool.get(sid)
+    joystick = session.joystick if session is not None else None
+    if joystick and joystick.initialized:
+        with joystick.frame():
+            for button in joystick.pressed_buttons():
+                joystick.release_button(button)
+    # 非主设备的手柄作用于玩家 1，单独记录
+    held = gamepad_held.pop(sid, None)
+    if held is not None and held[0].initialized:
+        with held[0].frame():
+            for button in held[1]:
+                held[0].release_button(button)
+
+# 档案没有 axis_config 时共用的空映射：每次返回同一个对象，编译结果只有一份
+_NO_AXIS_CONFIG = {}
+
+def _compile_profile(profile):
+    """预编译档案的轴配置（全局与各玩家）和宏脚本，切换后输入热路径直接命中缓存"""
+    driving_config = profile.data.get('driving_config') or {}
+    axis_configs = [driving_config.get('axis_config') or _NO_AXIS_CONFIG]
+    axis_configs.extend(driving_config.get('player_profiles', {}).values())
+    compiled = [gamepad_pool.compile(axis_config, pin=True) for axis_config in axis_configs]
+    for btn in profile.buttons.values():
+        if btn.get('action') == 'macro':
+            try:
+                macro_engine.compile((btn.get('macro') or {}).get('script', ''))
+            except ValueError as e:
+                print(f"[PROFILE] 档案 {profile.name} 中按钮 {btn.get('label')} 的宏脚本有误: {e}")
+    return compiled
+
+# 所有档案在启动时预加载并编译；输入热路径读取 profiles.active，切换档案只替换这个引用
+profiles = ProfileStore(CONFIG_PATH, PROFILES_DIR, config.MODE, compile=_compile_profile)
+profiles.load_all(getattr(config, 'ACTIVE_PROFILE', DEFAULT_PROFILE))
 
 def load_config():
-    if os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+    """从磁盘读取当前档案（编辑接口使用，输入热路径使用 get_runtime_config）"""
+    path = profiles.active.path
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
     return {"buttons": []}
 
 def save_config(data):
+    profile = profiles.active
+    path = profile.path
     # Ensure directory exists
-    os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
-    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=4)
+    # 只重新读取并编译写入的这个档案，整体替换；进行中的事件仍使用完整的旧档案
+    _profile_replaced(*profiles.reload(profile.name))
+    # 顺便加载新放入目录的档案（已有档案不重新读取）
+    profiles.load_new()
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+def _profile_replaced(previous, profile):
+    """档案被替换后释放旧档案固定在缓存中的轴配置编译结果"""
+    if previous is not None:
+        gamepad_pool.unpin(previous.compiled)
 
-@app.route('/api/config')
-def get_config():
-    button_config = load_config()
-    # 从 config.py 加载模式和其它设置
-    button_config['mode'] = config.MODE
+def get_runtime_config():
+    """返回当前档案的配置（只读，已预加载）"""
+    return profiles.active.data
+
+def _client_config(profile):
+    """发送给客户端的完整配置：档案内容加上模式、修饰键和档案列表"""
+    button_config = dict(profile.data)
+    # 模式由档案决定，未指定时使用 config.py 中的 MODE
+    button_config['mode'] = profile.mode
     button_config['modifier_keys'] = config.MODIFIER_KEYS
     button_config['special_keys'] = config.SPECIAL_KEYS
+    button_config['profile'] = profile.name
+    button_config['profiles'] = profiles.list()
     
-    # 优先使用 buttons.json 中的 driving_config，如果没有则使用 config.py 中的默认值
-    if config.MODE == 'driving':
+    # 优先使用档案中的 driving_config，如果没有则使用 config.py 中的默认值
+    if profile.mode == 'driving':
         if 'driving_config' not in button_config:
             button_config['driving_config'] = config.DRIVING_CONFIG
-            
-    return jsonify(button_config)
+    return button_config
+
+def switch_profile(name):
+    """原子切换当前档案：释放旧布局按住的输入、归中旧映射驱动的轴，并把新布局推送给所有客户端
+
+    Raises KeyError for an unknown profile.
+    """
+    start = time.perf_counter()
+    previous, profile = profiles.switch(name)
+    if previous is profile:
+        return profile
+    # 旧档案的按钮和轴映射不再有效
+    for sid in list(connected_devices):
+        watchdog.drop_owner(sid, 'profile')
+        _release_held_inputs(sid)
+    _default_pipeline.reset()
+    for session in gamepad_pool.sessions():
+        session.pipeline.reset()
+        if profile.mode != 'driving':
+            _release_player(session.sid, 'profile')
+            socketio.emit('main_status_changed', {'is_main': False}, to=session.sid)
+    socketio.emit('profile_changed', {'name': profile.name, 'config': _client_config(profile)})
+    if profile.mode == 'driving' and previous.mode != 'driving':
+        socketio.emit('ask_main_device', {
+            'current_main': bool(gamepad_pool.sessions()),
+            'free_slots': gamepad_pool.free_slots(),
+            'max_gamepads': gamepad_pool.max_gamepads,
+        })
+    print(f"[PROFILE] 切换档案 {previous.name} -> {profile.name} ({profile.mode})，"
+          f"用时 {(time.perf_counter() - start) * 1e3:.2f} ms")
+    return profile
+
+def _axis_config_for(session, driving_config):
+    """玩家自己的轴配置（player_profiles），没有则使用全局 axis_config"""
+    if session is not None:
+        profile = driving_config.get('player_profiles', {}).get(str(session.player))
+        if profile:
+            return profile
+    return driving_config.get('axis_config') or _NO_AXIS_CONFIG
+
+def _pipeline_for(session, axis_config):
+    """切换到 axis_config 对应的编译结果（查找表按配置对象缓存）并返回输入管线"""
+    pipeline = session.pipeline if session is not None else _default_pipeline
+    pipeline.use(gamepad_pool.compile(axis_config))
+    return pipeline
+
+@app.route('/api/status')
+def get_status():
+    """返回启动阶段耗时、输入后端就绪状态和虚拟摇杆写入统计"""
+    status = tracker.snapshot()
+    if virtual_joystick is not None and virtual_joystick.initialized:
+        status['joystick'] = virtual_joystick.get_stats()
+    status['players'] = gamepad_pool.players()
+    status['gyro_mouse'] = gyro_mouse.get_stats()
+    status['pointer'] = pointer_output.get_stats()
+    status['macros'] = macro_engine.get_stats()
+    status['recording'] = recorder.get_stats()
+    status['dashboard'] = dashboard.get_stats()
+    return jsonify(status)
+
+def _dashboard_state():
+    """看板显示的当前状态（扁平键值），由广播循环调用，输入处理路径不参与"""
+    profile = profiles.active
+    held = set()
+    for ids in list(held_buttons.values()):
+        held.update(ids)
+    labels = []
+    for btn_id in held:
+        btn = profile.button(btn_id)
+        labels.append((btn.get('label') if btn else None) or str(btn_id))
+    state = {
+        'profile': profile.title,
+        'mode': profile.mode,
+        'devices': len(connected_devices),
+        'players': len(gamepad_pool.sessions()),
+        'held': sorted(labels),
+    }
+    for slot, joystick in gamepad_pool.joysticks_by_slot().items():
+        if not joystick.initialized:
+            continue
+        axes, buttons = joystick.state()
+        prefix = f"p{slot + 1}"
+        for axis in GAMEPAD_AXES:
+            state[f"{prefix}.{axis}"] = round(axes.get(axis, 0.0), 3)
+        state[f"{prefix}.buttons"] = buttons
+    for slider_id, value in list(slider_values.items()):
+        btn = profile.button(slider_id)
+        state[f"slider.{(btn.get('label') if btn else None) or slider_id}"] = round(value, 3)
+    return state
+
+@app.route('/dashboard')
+def dashboard_page():
+    return render_template('dashboard.html', overlay=False)
+
+@app.route('/overlay')
+def overlay_page():
+    """透明背景的直播叠加层（OBS 浏览器源）"""
+    return render_template('dashboard.html', overlay=True)
+
+@app.route('/api/dashboard/stream')
+def dashboard_stream():
+    """Server-Sent Events：先发送快照，之后按 max_rate 发送增量"""
+    if not _dashboard_config.get('enabled', True):
+        return jsonify({'status': 'error', 'message': 'dashboard disabled'}), 404
+    return Response(dashboard.stream(socketio.sleep), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus 文本格式的运行指标"""
+    if not _metrics_config.get('enabled', True):
+        return jsonify({'status': 'error', 'message': 'metrics disabled'}), 404
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+def _profiler_authorized():
+    header = request.headers.get('Authorization', '')
+    token = header[7:] if header.startswith('Bearer ') else request.args.get('token', '')
+    return hmac.compare_digest(token.encode(), _profiler_token.encode())
+
+@app.route('/api/debug/profile', methods=['GET', 'POST'])
+def debug_profile():
+    """对所有线程采样 seconds 秒；format=collapsed（默认，火焰图输入）或 json（热点函数 + 折叠栈）"""
+    if not _profiler_config.get('enabled', True):
+        return jsonify({'status': 'error', 'message': 'profiler disabled'}), 404
+    if not _profiler_authorized():
+        return jsonify({'status': 'error', 'message': 'invalid token'}), 401
+    params = request.get_json(silent=True) or {}
+    params = {**params, **request.args.to_dict()}
+    try:
+        seconds = float(params.get('seconds', 5))
+        interval = float(params.get('interval', _profiler_config.get('interval', PROFILER_INTERVAL)))
+        top = int(params.get('top', 20))
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'invalid parameters'}), 400
+    print(f"[PROFILER] 开始采样 {seconds}s（间隔 {interval * 1000:.1f} ms）")
+    try:
+        session = profiler.profile(seconds, interval, sleep=socketio.sleep)
+    except ProfilerBusy:
+        return jsonify({'status': 'error', 'message': 'profiler already running'}), 409
+    summary = session.summary(top)
+    print(f"[PROFILER] 采样结束: {summary['samples']} 次, 每次耗时 {summary['sample_cost']}")
+    if params.get('format') == 'json':
+        return jsonify({'status': 'success', **summary, 'collapsed': session.collapsed()})
+    return Response(session.collapsed(), content_type='text/plain; charset=utf-8')
+
+def start_recording(path=None):
+    """开始录制输入事件；已经是主设备的连接先记录下来，回放时恢复"""
+    if path is None:
+        directory = _recording_config.get('directory') or os.path.join(os.path.dirname(__file__), '../recordings')
+        path = os.path.join(directory, time.strftime('session-%Y%m%d-%H%M%S.rec'))
+    main_sids = [session.sid for session in gamepad_pool.sessions()]
+    gyro_mouse_sids = [session.sid for session in gamepad_pool.sessions() if session.gyro_mouse]
+    # 已测得的延迟决定滤波器的预测时长，回放时先恢复（单向延迟 x2 即往返毫秒数）
+    latencies = {sid: delay * 2000.0 for sid, delay in latency.snapshot().items()}
+    recorder.start(path, main_sids, profiles.active.name, latencies, gyro_mouse_sids)
+    return path
+
+@app.route('/api/recording', methods=['GET', 'POST'])
+def recording():
+    """GET 返回录制状态；POST {"action": "start"|"stop"} 开始或停止录制"""
+    if request.method == 'POST':
+        action = (request.json or {}).get('action')
+        try:
+            if action == 'start':
+                start_recording()
+            elif action == 'stop':
+                recorder.stop()
+            else:
+                return jsonify({'status': 'error', 'message': f'未知操作: {action}'}), 400
+        except (OSError, RuntimeError) as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 409
+    return jsonify({'status': 'success', **recorder.get_stats()})
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/api/config')
+def get_config():
+    return jsonify(_client_config(profiles.active))
+
+@app.route('/api/profiles')
+def get_profiles():
+    """列出预加载的档案和当前档案"""
+    return jsonify({'active': profiles.active.name, 'profiles': profiles.list()})
+
+@app.route('/api/profiles/switch', methods=['POST'])
+def post_switch_profile():
+    """切换当前档案（不读写文件，不需要重启）"""
+    name = (request.json or {}).get('name')
+    recorder.record('switch_profile', 'rest', {'name': name})
+    try:
+        profile = switch_profile(name)
+    except KeyError:
+        return jsonify({'status': 'error', 'message': f'未知档案: {name}'}), 404
+    return jsonify({'status': 'success', 'profile': profile.info()})
 
 @app.route('/api/update_button', methods=['POST'])
 def update_button():
@@ -134,6 +492,11 @@ def update_driving_config():
         # 这里我们保存到buttons.json中
         current_config = load_config()
         driving_config = data.get('driving_config', {}) if data else {}
+        # 各玩家的轴配置通过 set_player_profile 单独保存，这里保留
+        if 'player_profiles' not in driving_config:
+            player_profiles = current_config.get('driving_config', {}).get('player_profiles')
+            if player_profiles:
+                driving_config['player_profiles'] = player_profiles
         current_config['driving_config'] = driving_config
         
         if config.DEBUG:
@@ -144,7 +507,7 @@ def update_driving_config():
         if config.DEBUG:
             print("[CONFIG] 驾驶配置保存成功")
         
-        response = jsonify({'status': 'success', 'message': '配置已保存，请重启服务器以应用更改'})
+        response = jsonify({'status': 'success', 'message': '配置已保存并已生效'})
         if config.DEBUG:
             print(f"[CONFIG] 返回响应: {response.get_json()}")
         return response
@@ -161,130 +524,452 @@ def handle_connect():
     sid = request.sid
     connected_devices[sid] = {'role': None, 'is_main': False}
     
+    # 告知客户端当前各输入后端的就绪状态
+    emit('backend_status', tracker.snapshot())
+    
     # In driving mode, ask if this should be the main device
-    if config.MODE == 'driving':
-        emit('ask_main_device', {'current_main': main_device_sid is not None})
+    if profiles.active.mode == 'driving':
+        emit('ask_main_device', {
+            'current_main': bool(gamepad_pool.sessions()),
+            'free_slots': gamepad_pool.free_slots(),
+            'max_gamepads': gamepad_pool.max_gamepads,
+        })
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    global connected_devices, main_device_sid
+    global connected_devices
     sid = request.sid
+    recorder.record('disconnect', sid)
+    # 断开的连接所驱动的轴立即归中，按住的按钮被释放，玩家槽位被释放
+    _release_player(sid)
+    watchdog.drop_owner(sid, 'disconnect')
+    # 只按了按钮的连接在看门狗中没有输入源，这里直接释放（宏、手柄按键）
+    _release_held_inputs(sid)
+    latency.forget(sid)
     if sid in connected_devices:
-        if connected_devices[sid].get('is_main'):
-            main_device_sid = None
         del connected_devices[sid]
 
+@socketio.on('latency_probe')
+def handle_latency_probe(data):
+    """原样返回客户端时间戳，客户端据此测量往返延迟"""
+    return data
+
+@socketio.on('latency_report')
+def handle_latency_report(data):
+    """客户端上报测得的往返延迟（毫秒），用于滤波器的预测时长"""
+    recorder.record('latency_report', request.sid, data)
+    try:
+        latency.report_rtt(request.sid, float(data.get('rtt', 0.0)) / 1000.0)
+    except (TypeError, ValueError, AttributeError):
+        pass
+
+@socketio.on('client_hidden')
+def handle_client_hidden():
+    """客户端页面进入后台：不再等待超时，立即归中"""
+    recorder.record('client_hidden', request.sid)
+    watchdog.drop_owner(request.sid, 'hidden')
+    gyro_mouse.forget(request.sid)
+    macro_engine.cancel_owner(request.sid)
+
+def _release_player(sid, reason='disconnect'):
+    """释放连接占用的玩家槽位：虚拟手柄复位后留给下一位玩家"""
+    session = gamepad_pool.release(sid)
+    if session is None:
+        return None
+    print(f"[POOL] 玩家 {session.player} 离开 ({reason})")
+    gyro_mouse.forget(sid)
+    if sid in connected_devices:
+        connected_devices[sid]['is_main'] = False
+    # 手柄已复位，看门狗不需要再归中
+    watchdog.drop(f"gyro:{sid}", reason)
+    _broadcast_players()
+    return session
+
+def _broadcast_players():
+    socketio.emit('players_changed', {
+        'players': gamepad_pool.players(),
+        'max_gamepads': gamepad_pool.max_gamepads,
+    })
+
+@socketio.on('switch_profile')
+def handle_switch_profile(data):
+    name = (data or {}).get('name')
+    recorder.record('switch_profile', request.sid, data)
+    try:
+        profile = switch_profile(name)
+    except KeyError:
+        return {'status': 'error', 'message': f'未知档案: {name}'}
+    return {'status': 'success', 'profile': profile.info()}
+
 @socketio.on('set_main_device')
 def handle_set_main_device(data):
-    global main_device_sid, connected_devices
+    global connected_devices
     sid = request.sid
+    recorder.record('set_main_device', sid, data)
     is_main = data.get('is_main', False)
     
     if is_main:
-        # 从之前的主设备移除主设备状态
-        if main_device_sid and main_device_sid in connected_devices:
-            connected_devices[main_device_sid]['is_main'] = False
-            socketio.emit('main_status_changed', {'is_main': False}, to=main_device_sid)
+        # 只有一个槽位时保持原来的行为：新的主设备替换之前的主设备
+        if gamepad_pool.max_gamepads == 1 and gamepad_pool.get(sid) is None:
+            previous = gamepad_pool.primary()
+            if previous is not None:
+                _release_player(previous.sid, 'replaced')
+                socketio.emit('main_status_changed', {'is_main': False}, to=previous.sid)
         
-        main_device_sid = sid
+        session = gamepad_pool.assign(sid)
+        if session is None:
+            emit('main_status_changed', {'is_main': False, 'reason': 'full'})
+            return
         connected_devices[sid]['is_main'] = True
-        emit('main_status_changed', {'is_main': True})
+        session.gyro_mouse = bool(gyro_mouse.config['enabled'])
+        print(f"[POOL] {sid} 成为玩家 {session.player}")
+        emit('main_status_changed', {'is_main': True, 'gyro_mouse': session.gyro_mouse, **session.info()})
+        _broadcast_players()
     else:
-        if main_device_sid == sid:
-            main_device_sid = None
+        _release_player(sid, 'demoted')
         connected_devices[sid]['is_main'] = False
         emit('main_status_changed', {'is_main': False})
 
+@socketio.on('set_gyro_mouse')
+def handle_set_gyro_mouse(data):
+    """切换主设备的陀螺仪用途：瞄准（鼠标相对移动）或摇杆轴映射"""
+    sid = request.sid
+    recorder.record('set_gyro_mouse', sid, data)
+    session = gamepad_pool.get(sid)
+    if session is None:
+        return
+    enabled = bool((data or {}).get('enabled'))
+    if enabled != session.gyro_mouse:
+        session.gyro_mouse = enabled
+        gyro_mouse.forget(sid)
+        # 切换到瞄准时，之前由陀螺仪驱动的轴归中
+        watchdog.drop(f"gyro:{sid}", 'mode')
+        print(f"[GYRO] 玩家 {session.player} 陀螺仪瞄准: {'开' if enabled else '关'}")
+    emit('gyro_mouse_changed', {'enabled': session.gyro_mouse})
+
+@socketio.on('set_player_profile')
+def handle_set_player_profile(data):
+    """保存当前玩家自己的轴配置；axis_config 为空时恢复使用全局配置"""
+    recorder.record('set_player_profile', request.sid, data)
+    session = gamepad_pool.get(request.sid)
+    if session is None:
+        return {'status': 'error', 'message': '只有主设备可以设置玩家配置'}
+    axis_config = (data or {}).get('axis_config')
+    current_config = load_config()
+    player_profiles = current_config.setdefault('driving_config', {}).setdefault('player_profiles', {})
+    if axis_config:
+        player_profiles[str(session.player)] = axis_config
+    else:
+        player_profiles.pop(str(session.player), None)
+    save_config(current_config)
+    print(f"[POOL] 已保存玩家 {session.player} 的轴配置")
+    return {'status': 'success', 'player': session.player}
+
 @socketio.on('gyro_data')
 def handle_gyro_data(data):
     """处理来自主设备的驾驶模式陀螺仪数据"""
-    global main_device_sid, virtual_joystick
     sid = request.sid
+    recorder.record('gyro_data', sid, data)
     
     # 仅接受来自主设备的陀螺仪数据
-    if sid != main_device_sid:
+    session = gamepad_pool.get(sid)
+    if session is None:
         return
     
     alpha = data.get('alpha', 0)  # Z-axis rotation
     beta = data.get('beta', 0)    # X-axis rotation (front-back tilt)
     gamma = data.get('gamma', 0)  # Y-axis rotation (left-right tilt)
+    # 样本时间（秒）：优先使用客户端传感器事件时间戳，否则使用接收时间
+    sample_time = data.get('t')
+    sample_time = sample_time / 1000.0 if isinstance(sample_time, (int, float)) else time.monotonic()
     
     if config.DEBUG:
         print(f"[GYRO] 收到陀螺仪数据: alpha={alpha:.2f}, beta={beta:.2f}, gamma={gamma:.2f}")
     
-    # 发送到 overlay 进程用于显示（overlay 进程会显示陀螺仪数值，但不处理轴映射）
-    overlay_queue.put({
-        'cmd': 'GYRO',
-        'alpha': alpha,
-        'beta': beta,
-        'gamma': gamma
-    })
+    # 发送到 overlay 进程用于显示（overlay 进程会显示陀螺仪数值，但不处理轴映射；只显示玩家 1）
+    if session.slot == 0:
+        overlay_queue.put({
+            'cmd': 'GYRO',
+            'alpha': alpha,
+            'beta': beta,
+            'gamma': gamma
+        })
+    
+    # 陀螺仪瞄准：姿态变化累积为鼠标移动，由 gyro_mouse 的输出循环写出
+    if session.gyro_mouse:
+        gyro_mouse.feed(sid, {'alpha': alpha, 'beta': beta, 'gamma': gamma}, sample_time)
+        watchdog.touch(f"gyro:{sid}", owner=sid)
+        return
+    
+    _drive_gyro_axes(session, {'alpha': alpha, 'beta': beta, 'gamma': gamma}, sample_time)
+
+@socketio.on('motion_data')
+def handle_motion_data(data):
+    """处理主设备的 devicemotion 角速度（轴配置使用 rate_* / fused_* 源时客户端改为发送此事件）
+
+    data: {'rate_alpha', 'rate_beta', 'rate_gamma'（度/秒）, 't'（毫秒）}，
+    期间收到新的 deviceorientation 时附带 'alpha', 'beta', 'gamma' 作为参考姿态。
+    """
+    sid = request.sid
+    recorder.record('motion_data', sid, data)
+    
+    session = gamepad_pool.get(sid)
+    if session is None:
+        return
+    
+    rates = tuple(float(data.get(name) or 0.0) for name in MOTION_RATE_SOURCES)
+    sample_time = data.get('t')
+    sample_time = sample_time / 1000.0 if isinstance(sample_time, (int, float)) else time.monotonic()
+    reference = None
+    if 'alpha' in data:
+        reference = (float(data.get('alpha') or 0.0), float(data.get('beta') or 0.0), float(data.get('gamma') or 0.0))
+    
+    fusion = session.motion
+    if fusion is None:
+        fusion = session.motion = OrientationFusion(
+            time_constant=_motion_config.get('time_constant', 1.0),
+            max_dt=_motion_config.get('max_dt', 0.1))
+    fused = fusion.update(rates, sample_time, reference)
+    
+    # 角速度、融合姿态，以及最近一次参考姿态（使 alpha/beta/gamma 源在此模式下照常工作）
+    gyro_values = dict(zip(MOTION_RATE_SOURCES, rates))
+    gyro_values.update(zip(MOTION_FUSED_SOURCES, fused))
+    if fusion.reference is not None:
+        gyro_values.update(zip(('alpha', 'beta', 'gamma'), fusion.reference))
+    
+    if session.slot == 0:
+        overlay_queue.put({'cmd': 'GYRO', 'alpha': fused[0], 'beta': fused[1], 'gamma': fused[2]})
     
-    # 应用陀螺仪数据到虚拟手柄（如果已初始化）
-    if virtual_joystick and virtual_joystick.initialized:
-        button_config = load_config()
-        axis_config = button_config.get('driving_config', {}).get('axis_config', {})
+    if session.gyro_mouse:
+        gyro_mouse.feed(sid, {'alpha': fused[0], 'beta': fused[1], 'gamma': fused[2]}, sample_time)
+        watchdog.touch(f"gyro:{sid}", owner=sid)
+        return
+    
+    _drive_gyro_axes(session, gyro_values, sample_time)
+
+def _drive_gyro_axes(session, gyro_values, sample_time):
+    """把一个陀螺仪样本（源名 -> 值）映射到该玩家的虚拟手柄轴"""
+    sid = session.sid
+    joystick = session.joystick
+    # 应用陀螺仪数据到该玩家的虚拟手柄（如果已初始化）
+    if joystick and joystick.initialized:
+        # 本次数据引起的所有轴变化合并为一帧写入设备
+        with joystick.frame():
+            driving_config = get_runtime_config().get('driving_config', {})
+            axis_config = _axis_config_for(session, driving_config)
+            driven_axes = []
         
-        # 如果没有新的轴配置，回退到旧的 gyro_axis_mapping
-        if not axis_config:
-            gyro_mapping = button_config.get('driving_config', {}).get('gyro_axis_mapping', {})
-            if not gyro_mapping:
-                gyro_mapping = config.DRIVING_CONFIG.get('gyro_axis_mapping', {})
+            # 如果没有新的轴配置，回退到旧的 gyro_axis_mapping
+            if not axis_config:
+                gyro_mapping = driving_config.get('gyro_axis_mapping', {})
+                if not gyro_mapping:
+                    gyro_mapping = config.DRIVING_CONFIG.get('gyro_axis_mapping', {})
             
-            # 使用旧的映射方式（使用 LEGACY_GYRO_RANGE 保持向后兼容）
-            gyro_values = {'alpha': alpha, 'beta': beta, 'gamma': gamma}
-            for gyro_axis, gamepad_axis in gyro_mapping.items():
-                if gamepad_axis and gyro_axis in gyro_values:
-                    value = normalize_gyro_value(gyro_values[gyro_axis], gyro_axis, LEGACY_GYRO_RANGE)
-                    if config.DEBUG:
-                        print(f"[GYRO] 映射 {gyro_axis}({gyro_values[gyro_axis]:.2f}) -> {gamepad_axis}({value:.2f})")
-                    virtual_joystick.set_axis(gamepad_axis, value)
-        else:
-            # 使用新的统一轴配置
-            gyro_values = {'alpha': alpha, 'beta': beta, 'gamma': gamma}
-            for gamepad_axis, axis_cfg in axis_config.items():
-                if axis_cfg.get('source_type') == 'gyro' and axis_cfg.get('source_id'):
-                    gyro_axis = axis_cfg['source_id']
-                    if gyro_axis in gyro_values:
-                        gyro_range = axis_cfg.get('gyro_range', 45.0)  # 获取陀螺仪范围，默认45度
-                        raw_value = normalize_gyro_value(gyro_values[gyro_axis], gyro_axis, gyro_range)
-                        # 应用死区
-                        value = apply_deadzone(raw_value, axis_cfg.get('deadzone', 0.05))
-                        # 应用峰值限制
-                        value = apply_peak_value(value, axis_cfg.get('peak_value', 1.0))
+                # 使用旧的映射方式（使用 LEGACY_GYRO_RANGE 保持向后兼容）
+                for gyro_axis, gamepad_axis in gyro_mapping.items():
+                    if gamepad_axis and gyro_axis in gyro_values:
+                        value = normalize_gyro_value(gyro_values[gyro_axis], gyro_axis, LEGACY_GYRO_RANGE)
                         if config.DEBUG:
-                            print(f"[GYRO] 映射 {gyro_axis}({gyro_values[gyro_axis]:.2f}) -> {gamepad_axis}({value:.2f}) [range={gyro_range}, deadzone={axis_cfg.get('deadzone', 0.05)}, peak={axis_cfg.get('peak_value', 1.0)}]")
-                        virtual_joystick.set_axis(gamepad_axis, value)
-                elif axis_cfg.get('source_type') == 'none':
-                    # 当轴配置为 none 时，显式将该轴重置为 0，避免保留上一次的陀螺仪值
-                    if config.DEBUG:
-                        print(f"[GYRO] 轴 {gamepad_axis} 的 source_type=none，重置为 0")
-                    virtual_joystick.set_axis(gamepad_axis, 0.0)
+                            print(f"[GYRO] 映射 {gyro_axis}({gyro_values[gyro_axis]:.2f}) -> {gamepad_axis}({value:.2f})")
+                        joystick.set_axis(gamepad_axis, value)
+                        driven_axes.append(gamepad_axis)
+            else:
+                # 使用新的统一轴配置
+                pipeline = _pipeline_for(session, axis_config)
+                filters = pipeline.filters
+                for gamepad_axis, axis_cfg in axis_config.items():
+                    if axis_cfg.get('source_type') == 'gyro' and axis_cfg.get('source_id'):
+                        gyro_axis = axis_cfg['source_id']
+                        if gyro_axis in gyro_values:
+                            gyro_range = axis_cfg.get('gyro_range', 45.0)  # 获取陀螺仪范围，默认45度
+                            raw_value = normalize_gyro_value(gyro_values[gyro_axis], gyro_axis, gyro_range)
+                            # 应用滤波与延迟补偿预测
+                            slot = AXIS_SLOTS.get(gamepad_axis)
+                            if slot is not None:
+                                filters.configure(slot, axis_cfg.get('filter'))
+                                if filters.is_active(slot):
+                                    raw_value = filters.step(slot, raw_value, sample_time, latency.get(sid))
+                                    raw_value = max(-1.0, min(1.0, raw_value))
+                            # 应用死区、响应曲线和峰值（查表）
+                            value = pipeline.shape(gamepad_axis, raw_value, axis_cfg)
+                            if config.DEBUG:
+                                print(f"[GYRO] 映射 {gyro_axis}({gyro_values[gyro_axis]:.2f}) -> {gamepad_axis}({value:.2f}) [range={gyro_range}, deadzone={axis_cfg.get('deadzone', 0.05)}, peak={axis_cfg.get('peak_value', 1.0)}]")
+                            joystick.set_axis(gamepad_axis, value)
+                            driven_axes.append(gamepad_axis)
+                    elif axis_cfg.get('source_type') == 'none':
+                        # 当轴配置为 none 时，显式将该轴重置为 0，避免保留上一次的陀螺仪值
+                        if config.DEBUG:
+                            print(f"[GYRO] 轴 {gamepad_axis} 的 source_type=none，重置为 0")
+                        joystick.set_axis(gamepad_axis, 0.0)
+        watchdog.touch(f"gyro:{sid}", tuple(driven_axes), owner=sid, device=joystick)
     else:
         if config.DEBUG:
             print("[GYRO] 警告: 虚拟摇杆未初始化")
 
+def _gyro_batch_rows(samples):
+    """校验批量样本：每行 3 个（无时间戳）或 4 个有限数值，且所有行长度一致；不合法时返回 None"""
+    if not isinstance(samples, (list, tuple)):
+        return None
+    width = None
+    for row in samples:
+        if not isinstance(row, (list, tuple)) or len(row) not in (3, 4):
+            return None
+        if width is None:
+            width = len(row)
+        elif len(row) != width:
+            return None
+        for value in row:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                return None
+    return samples
+
+def _gyro_batch_times(samples, now):
+    """每个样本的时间（秒）：有时间戳时取时间戳，否则按标称更新频率从 now 往前排开"""
+    if len(samples[0]) > 3:
+        return [row[3] / 1000.0 for row in samples]
+    # 同一时间的样本在滤波器中会被合并成一个，排开后每个样本都按正常间隔参与滤波
+    rate = config.DRIVING_CONFIG.get('gyro_update_rate') or 60
+    count = len(samples)
+    return [now - (count - 1 - r) / rate for r in range(count)]
+
+@socketio.on('gyro_batch')
+def handle_gyro_batch(data):
+    """处理一批缓冲的陀螺仪样本
+
+    data: {'samples': [[alpha, beta, gamma, t], ...]}，t 为传感器时间戳（毫秒，可省略）。
+    归一化与曲线查表对整批样本向量化处理；滤波器按顺序消化每个样本，
+    虚拟手柄只写入最后一个样本对应的状态。返回处理的样本数；样本格式不对
+    （行长度不一致、不是数值）时返回错误。
+    """
+    sid = request.sid
+    recorder.record('gyro_batch', sid, data)
+    session = gamepad_pool.get(sid)
+    if session is None:
+        return 0
+    samples = _gyro_batch_rows(data.get('samples') if isinstance(data, dict) else None)
+    if samples is None:
+        return {'status': 'error', 'message': '样本格式错误：每行应为 3 或 4 个数值且长度一致'}
+    if not samples:
+        return 0
+    times = _gyro_batch_times(samples, time.monotonic())
+    if session.gyro_mouse:
+        for row, t in zip(samples, times):
+            gyro_mouse.feed(sid, {'alpha': row[0], 'beta': row[1], 'gamma': row[2]}, t)
+        watchdog.touch(f"gyro:{sid}", owner=sid)
+        return len(samples)
+    joystick = session.joystick
+    if not (joystick and joystick.initialized):
+        if config.DEBUG:
+            print("[GYRO] 警告: 虚拟摇杆未初始化")
+        return 0
+
+    driving_config = get_runtime_config().get('driving_config', {})
+    axis_config = _axis_config_for(session, driving_config)
+    last = samples[-1]
+    if session.slot == 0:
+        overlay_queue.put({'cmd': 'GYRO', 'alpha': last[0], 'beta': last[1], 'gamma': last[2]})
+    if not axis_config:
+        # 旧的 gyro_axis_mapping 没有批量实现，按最后一个样本处理
+        _drive_gyro_axes(session, {'alpha': last[0], 'beta': last[1], 'gamma': last[2]}, times[-1])
+        return len(samples)
+
+    pipeline = _pipeline_for(session, axis_config)
+    filters = pipeline.filters
+    mapper = pipeline.batch_mapper
+    count = len(samples)
+    values = mapper.normalize(samples)
+    delay = latency.get(sid)
+    for k, gamepad_axis in enumerate(mapper.axes):
+        slot = AXIS_SLOTS.get(gamepad_axis)
+        if slot is None:
+            continue
+        filters.configure(slot, axis_config[gamepad_axis].get('filter'))
+        if filters.is_active(slot):
+            for r in range(count):
+                value = filters.step(slot, values[r][k], times[r], delay)
+                values[r][k] = max(-1.0, min(1.0, value))
+    shaped = mapper.shape(values)
+
+    with joystick.frame():
+        for k, gamepad_axis in enumerate(mapper.axes):
+            joystick.set_axis(gamepad_axis, float(shaped[-1][k]))
+        for gamepad_axis, axis_cfg in axis_config.items():
+            if axis_cfg.get('source_type') == 'none':
+                joystick.set_axis(gamepad_axis, 0.0)
+    if config.DEBUG:
+        print(f"[GYRO] 批量处理 {count} 个样本 -> {dict(zip(mapper.axes, (round(float(v), 3) for v in shaped[-1])))}")
+    watchdog.touch(f"gyro:{sid}", mapper.axes, owner=sid, device=joystick)
+    return count
+
 @socketio.on('button_down')
 def handle_button_down(data):
+    recorder.record('button_down', request.sid, data)
     btn_id = data.get('id')
     label = data.get('label')
+    held_buttons.setdefault(request.sid, set()).add(btn_id)
+    btn = profiles.active.button(btn_id)
+    if btn and btn.get('action') == 'gyro_clutch':
+        # 离合：按住期间忽略姿态变化
+        gyro_mouse.set_clutch(request.sid, True)
+        return
+    if btn and btn.get('action') == 'macro':
+        # 宏在按下时开始执行
+        try:
+            macro_engine.start((request.sid, btn_id), btn.get('macro') or {})
+        except ValueError as e:
+            print(f"[MACRO] 按钮 {label} 的宏脚本有误: {e}")
+            return
     # Show overlay
     overlay_queue.put({'cmd': 'SHOW', 'text': f"Holding: {label}"})
 
 @socketio.on('button_up')
 def handle_button_up(data):
+    recorder.record('button_up', request.sid, data)
     btn_id = data.get('id')
     print(f"Button released: {btn_id}")
+    held_buttons.get(request.sid, set()).discard(btn_id)
+    
+    btn = profiles.active.button(btn_id)
+    if btn and btn.get('action') == 'gyro_clutch':
+        gyro_mouse.set_clutch(request.sid, False)
+        return
     
     # Hide overlay
     overlay_queue.put({'cmd': 'HIDE'})
     
+    if btn and btn.get('action') == 'macro':
+        macro_engine.release((request.sid, btn_id))
+        return
+    
     # Execute keys
-    button_config = load_config()
-    btn = next((b for b in button_config['buttons'] if b['id'] == btn_id), None)
     if btn:
         input_manager.execute_combination(btn.get('keys', []))
 
+@socketio.on('touchpad_delta')
+def handle_touchpad_delta(data):
+    """触控板一帧内累积的位移：dx/dy 为指针像素（已乘控件灵敏度），sx/sy 为双指滚动的像素"""
+    recorder.record('touchpad_delta', request.sid, data)
+    dx = float(data.get('dx', 0.0))
+    dy = float(data.get('dy', 0.0))
+    if dx or dy:
+        pointer_output.add_motion(dx, dy)
+    sx = float(data.get('sx', 0.0))
+    sy = float(data.get('sy', 0.0))
+    if sx or sy:
+        # 手指向下拖动（sy > 0）时自然滚动为向上滚（滚轮正方向）
+        pointer_output.add_scroll(-sx * _touchpad_scroll_scale, sy * _touchpad_scroll_scale)
+
+@socketio.on('touchpad_tap')
+def handle_touchpad_tap(data):
+    """触控板轻触：单指左键，双指右键"""
+    recorder.record('touchpad_tap', request.sid, data)
+    button = data.get('button', 'left')
+    if button not in MOUSE_BUTTONS:
+        return
+    if config.DEBUG:
+        print(f"[TOUCHPAD] {data.get('id')} 轻触: {button}")
+    pointer_output.click(button)
+
 @socketio.on('hide_overlay')
 def handle_hide_overlay():
     """处理隐藏overlay的请求"""
@@ -294,7 +979,8 @@ def handle_hide_overlay():
 @socketio.on('slider_value')
 def handle_slider_value(data):
     """处理拖动条值的更新"""
-    global virtual_joystick, slider_values
+    global slider_values
+    recorder.record('slider_value', request.sid, data)
     slider_id = data.get('id')
     value = data.get('value', 0.0)  # -1.0 到 1.0
     
@@ -304,15 +990,21 @@ def handle_slider_value(data):
     # 保存当前值
     slider_values[slider_id] = value
     
+    # 主设备的拖动条作用于自己的手柄，其他设备的拖动条作用于玩家 1
+    session = gamepad_pool.get(request.sid) or gamepad_pool.primary()
+    joystick = session.joystick if session is not None else virtual_joystick
+    
     # 应用到虚拟手柄（如果已初始化）
-    if virtual_joystick and virtual_joystick.initialized:
+    if joystick and joystick.initialized:
         if config.DEBUG:
             print("[SLIDER] 虚拟摇杆已初始化，应用拖动条值")
-        button_config = load_config()
-        axis_config = button_config.get('driving_config', {}).get('axis_config', {})
-        buttons = button_config.get('buttons', [])
+        profile = profiles.active
+        button_config = profile.data
+        axis_config = _axis_config_for(session, button_config.get('driving_config', {}))
         # 找到滑块的展示标签/autoCenter 信息（如果存在）
-        slider_btn = next((b for b in buttons if b.get('id') == slider_id and b.get('type') == 'slider'), None)
+        slider_btn = profile.button(slider_id)
+        if slider_btn is not None and slider_btn.get('type') != 'slider':
+            slider_btn = None
         slider_label = slider_btn.get('label') if slider_btn else slider_id
         slider_auto_center = bool(slider_btn.get('autoCenter')) if slider_btn else False
         # 显示 overlay（实时显示正在操作的滑块）
@@ -321,39 +1013,41 @@ def handle_slider_value(data):
         except Exception:
             pass
         
-        # 如果没有新的轴配置，回退到旧方式
-        if not axis_config:
-            if config.DEBUG:
-                print("[SLIDER] 警告: 找不到按钮新版配置")
-            buttons = button_config.get('buttons', [])
-            slider = next((b for b in buttons if b.get('id') == slider_id and b.get('type') == 'slider'), None)
-            
-            if slider and slider.get('axis'):
-                axis = slider['axis']
+        with joystick.frame():
+            # 如果没有新的轴配置，回退到旧方式
+            if not axis_config:
                 if config.DEBUG:
-                    print(f"[SLIDER] 应用到轴: {axis} = {value:.3f}")
-                virtual_joystick.set_axis(axis, value)
+                    print("[SLIDER] 警告: 找不到按钮新版配置")
+                slider = slider_btn
+            
+                if slider and slider.get('axis'):
+                    axis = slider['axis']
+                    if config.DEBUG:
+                        print(f"[SLIDER] 应用到轴: {axis} = {value:.3f}")
+                    joystick.set_axis(axis, value)
+                    watchdog.touch(f"slider:{slider_id}", (axis,), owner=request.sid, streaming=False, device=joystick)
+                else:
+                    if config.DEBUG:
+                        print(f"[SLIDER] 警告: 找不到拖动条 {slider_id} 的配置或轴映射")
             else:
                 if config.DEBUG:
-                    print(f"[SLIDER] 警告: 找不到拖动条 {slider_id} 的配置或轴映射")
-        else:
-            if config.DEBUG:
-                print("[SLIDER] 使用新版统一轴配置应用拖动条值")
-                print(f"[SLIDER] axis_config: {axis_config}")
-                print(f"[SLIDER] 查找 slider_id: {slider_id}")
-            # 使用新的统一轴配置
-            for gamepad_axis, axis_cfg in axis_config.items():
-                if config.DEBUG:
-                    print(f"[SLIDER] 检查轴 {gamepad_axis}: {axis_cfg}")
-                if axis_cfg.get('source_type') == 'slider' and axis_cfg.get('source_id') == slider_id:
-                    # 应用死区
-                    processed_value = apply_deadzone(value, axis_cfg.get('deadzone', 0.05))
-                    # 应用峰值限制
-                    processed_value = apply_peak_value(processed_value, axis_cfg.get('peak_value', 1.0))
+                    print("[SLIDER] 使用新版统一轴配置应用拖动条值")
+                    print(f"[SLIDER] axis_config: {axis_config}")
+                    print(f"[SLIDER] 查找 slider_id: {slider_id}")
+                # 使用新的统一轴配置
+                pipeline = _pipeline_for(session, axis_config)
+                for gamepad_axis, axis_cfg in axis_config.items():
                     if config.DEBUG:
-                        print(f"[SLIDER] 应用到轴: {gamepad_axis} = {processed_value:.3f} [原始={value:.3f}, deadzone={axis_cfg.get('deadzone', 0.05)}, peak={axis_cfg.get('peak_value', 1.0)}]")
-                    virtual_joystick.set_axis(gamepad_axis, processed_value)
-                    break
+                        print(f"[SLIDER] 检查轴 {gamepad_axis}: {axis_cfg}")
+                    if axis_cfg.get('source_type') == 'slider' and axis_cfg.get('source_id') == slider_id:
+                        # 应用死区、响应曲线和峰值（查表）
+                        processed_value = pipeline.shape(gamepad_axis, value, axis_cfg)
+                        if config.DEBUG:
+                            print(f"[SLIDER] 应用到轴: {gamepad_axis} = {processed_value:.3f} [原始={value:.3f}, deadzone={axis_cfg.get('deadzone', 0.05)}, peak={axis_cfg.get('peak_value', 1.0)}]")
+                        joystick.set_axis(gamepad_axis, processed_value)
+                        # 拖动条按住不动时不会持续发送，因此只在断开时归中
+                        watchdog.touch(f"slider:{slider_id}", (gamepad_axis,), owner=request.sid, streaming=False, device=joystick)
+                        break
         # 如果滑块设置为自动归中并且回到默认值，则隐藏 overlay
         try:
             default_val = 0.5 if (slider_btn and slider_btn.get('rangeMode') == 'unipolar') else 0.0
@@ -368,6 +1062,113 @@ def handle_slider_value(data):
         if config.DEBUG:
             print("[SLIDER] 警告: 虚拟摇杆未初始化")
 
+@socketio.on('stick_value')
+def handle_stick_value(data):
+    """处理虚拟摇杆控件：每帧一条 x/y 组合消息，作为一次两轴原子更新写入手柄"""
+    recorder.record('stick_value', request.sid, data)
+    stick_id = data.get('id')
+    x = float(data.get('x', 0.0))
+    y = float(data.get('y', 0.0))  # 向上为正
+    
+    session = gamepad_pool.get(request.sid) or gamepad_pool.primary()
+    joystick = session.joystick if session is not None else virtual_joystick
+    if not joystick or not joystick.initialized:
+        return
+    
+    stick_btn = profiles.active.button(stick_id)
+    if stick_btn is None or stick_btn.get('type') != 'thumbstick':
+        if config.DEBUG:
+            print(f"[STICK] 警告: 找不到摇杆 {stick_id} 的配置")
+        return
+    stick = stick_btn.get('stick', 'left')
+    x, y = axis_curves.stick_deadzone(x, y, float(stick_btn.get('deadzone', 0.1)),
+                                      stick_btn.get('deadzoneShape', 'radial'))
+    joystick.set_stick(stick, x, y)
+    if config.DEBUG:
+        print(f"[STICK] {stick_id} -> {stick}: ({x:.3f}, {y:.3f})")
+    # 按住不动时不会持续发送，因此只在断开时归中
+    watchdog.touch(f"stick:{stick_id}", STICK_AXES[stick], owner=request.sid, streaming=False, device=joystick)
+
+@socketio.on('gamepad_delta')
+def handle_gamepad_delta(data):
+    """手机上连接的手柄（浏览器 Gamepad API）的状态变化，镜像到虚拟手柄
+
+    只包含变化的部分：``a`` / ``b`` 为 [下标, 值, 下标, 值, ...] 的轴 / 按键列表；
+    ``reset`` 为真时（手柄连接、断开）先松开按键并把映射的轴归零。
+    轴与扳机通过 axis_config 中 source_type 为 'gamepad' 的条目映射（死区、曲线等照常生效），
+    按键按 standard 映射直接对应。一条消息在虚拟手柄上只产生一帧。
+    """
+    sid = request.sid
+    recorder.record('gamepad_delta', sid, data)
+    session = gamepad_pool.get(sid) or gamepad_pool.primary()
+    joystick = session.joystick if session is not None else virtual_joystick
+    if not joystick or not joystick.initialized:
+        return
+    
+    axis_config = _axis_config_for(session, get_runtime_config().get('driving_config', {}))
+    if axis_config:
+        pipeline = _pipeline_for(session, axis_config)
+        routes = pipeline.gamepad_routes
+    else:
+        # 没有轴配置（旧版驾驶配置、按键布局档案）：只镜像按键
+        pipeline = None
+        routes = {}
+    held = gamepad_held.get(sid)
+    if held is None or held[0] is not joystick:
+        # 目标手柄变了（主设备变化）：先松开旧手柄上的按键
+        if held is not None and held[0].initialized:
+            with held[0].frame():
+                for button in held[1]:
+                    held[0].release_button(button)
+        held = gamepad_held[sid] = (joystick, set())
+    pressed = held[1]
+    moved = False
+    
+    with joystick.frame():
+        if data.get('reset'):
+            for button in pressed:
+                joystick.release_button(button)
+            pressed.clear()
+            for targets in routes.values():
+                for gamepad_axis, _ in targets:
+                    joystick.set_axis(gamepad_axis, 0.0)
+        
+        axes = data.get('a') or ()
+        for i in range(0, len(axes) - 1, 2):
+            index = int(axes[i])
+            if not 0 <= index < len(GAMEPAD_API_AXES):
+                continue
+            value = float(axes[i + 1])
+            if index % 2:
+                value = -value
+            for gamepad_axis, axis_cfg in routes.get(GAMEPAD_API_AXES[index], ()):
+                joystick.set_axis(gamepad_axis, pipeline.shape(gamepad_axis, value, axis_cfg))
+                moved = True
+        
+        buttons = data.get('b') or ()
+        for i in range(0, len(buttons) - 1, 2):
+            index = int(buttons[i])
+            value = float(buttons[i + 1])
+            trigger = GAMEPAD_API_TRIGGERS.get(index)
+            if trigger is not None:
+                for gamepad_axis, axis_cfg in routes.get(trigger, ()):
+                    joystick.set_axis(gamepad_axis, pipeline.shape(gamepad_axis, value, axis_cfg))
+                    moved = True
+            elif 0 <= index < len(GAMEPAD_API_BUTTONS) and GAMEPAD_API_BUTTONS[index]:
+                button = GAMEPAD_API_BUTTONS[index]
+                if value >= 0.5:
+                    pressed.add(button)
+                else:
+                    pressed.discard(button)
+                joystick.set_button(button, value >= 0.5)
+    
+    if config.DEBUG:
+        print(f"[GAMEPAD] {sid}: 轴 {axes}, 按键 {buttons}")
+    if moved:
+        # 手柄静止时不会发送，因此只在断开时归中（归中所有映射到手柄源的轴）
+        watchdog.touch(f"gamepad:{sid}", pipeline.compiled.gamepad_axes, owner=sid, streaming=False,
+                       device=joystick)
+
 @socketio.on('save_layout')
 def handle_save_layout(data):
     # Data should be the new list of buttons
@@ -381,66 +1182,116 @@ def normalize_gyro_value(gyro_value, gyro_axis, gyro_range=45.0):
     """将陀螺仪值归一化到 -1.0 到 1.0 范围
     
     Args:
-        gyro_value: 陀螺仪原始值（度）
-        gyro_axis: 陀螺仪轴名称 ('alpha', 'beta', 'gamma')
-        gyro_range: 归一化范围（度），表示转动多少度达到满输出
+        gyro_value: 陀螺仪原始值（度；rate_* 源为度/秒）
+        gyro_axis: 陀螺仪源名称 ('alpha', 'beta', 'gamma', 'fused_*', 'rate_*')
+        gyro_range: 归一化范围（度），表示转动多少度达到满输出；rate_* 源为满输出的角速度（度/秒）
     
     Returns:
         归一化后的值，范围 [-1.0, 1.0]
     """
-    if gyro_axis == 'alpha':  # Z轴旋转，范围 0 到 360
+    if gyro_axis in ('alpha', 'fused_alpha'):  # Z轴旋转，范围 0 到 360
         # 转换为 -180 到 180
         normalized = gyro_value if gyro_value <= 180 else gyro_value - 360
         return max(-1.0, min(1.0, normalized / gyro_range))
-    else:  # gamma (左右倾斜) 和 beta (前后倾斜)
+    else:  # gamma (左右倾斜)、beta (前后倾斜) 和角速度
         return max(-1.0, min(1.0, gyro_value / gyro_range))
 
 
-def apply_deadzone(value, deadzone):
-    """应用死区到输入值"""
-    # 使用 <= 来处理边界情况，确保在死区阈值处的连续性
-    if abs(value) <= deadzone:
-        return 0.0
-    # 防止除以零
-    if deadzone >= 1.0:
-        return 0.0
-    # 移除死区后重新映射到完整范围
-    if value > 0:
-        return (value - deadzone) / (1.0 - deadzone)
-    else:
-        return (value + deadzone) / (1.0 - deadzone)
-
-def apply_peak_value(value, peak_value):
-    """应用峰值限制到输入值"""
-    return value * peak_value
-
 def init_virtual_joystick():
     """初始化驾驶模式的虚拟摇杆"""
     global virtual_joystick
     if config.DEBUG:
-        print(f"[INIT] 当前模式: {config.MODE}")
-    if config.MODE == 'driving':
+        print(f"[INIT] 当前档案: {profiles.active.name} ({profiles.active.mode})")
+    # 任一档案使用驾驶模式时都需要虚拟摇杆，切换档案时不再创建设备
+    if profiles.has_mode('driving'):
+        tracker.set_backend('joystick', STATE_LOADING)
         try:
             from joystick_manager import VirtualJoystick
             virtual_joystick = VirtualJoystick()
+            gamepad_pool.set_joystick(0, virtual_joystick)
             if virtual_joystick.initialized:
+                tracker.set_backend('joystick', STATE_READY, virtual_joystick.system)
                 if config.DEBUG:
                     print("[INIT] ✅ 虚拟摇杆已成功初始化")
             else:
+                tracker.set_backend('joystick', STATE_FAILED, '虚拟摇杆初始化失败')
                 print("[INIT] ⚠️ 警告: 虚拟摇杆初始化失败")
         except Exception as e:
+            tracker.set_backend('joystick', STATE_FAILED, str(e))
             print(f"[INIT] ❌ 错误: 虚拟摇杆初始化异常 - {e}")
             import traceback
             traceback.print_exc()
     else:
+        tracker.set_backend('joystick', STATE_DISABLED, profiles.active.mode)
         if config.DEBUG:
             print(f"[INIT] 非驾驶模式，跳过虚拟摇杆初始化")
 
+def init_keyboard():
+    """加载按键注入后端（uinput / pynput）"""
+    tracker.set_backend('keyboard', STATE_LOADING)
+    backend = input_manager.load_backend()
+    if backend.name != 'null':
+        tracker.set_backend('keyboard', STATE_READY, backend.name)
+    else:
+        tracker.set_backend('keyboard', STATE_FAILED, '按键将仅被模拟输出')
+
+def init_mouse():
+    """加载陀螺仪瞄准和触控板使用的鼠标后端（uinput / pynput）"""
+    tracker.set_backend('mouse', STATE_LOADING)
+    backend = input_manager.load_mouse_backend()
+    if backend.name != 'null':
+        tracker.set_backend('mouse', STATE_READY, backend.name)
+    else:
+        tracker.set_backend('mouse', STATE_FAILED, '鼠标移动将被丢弃')
+
 def start_overlay():
     global overlay_process
-    overlay_process = multiprocessing.Process(target=run_overlay, args=(overlay_queue,))
-    overlay_process.daemon = True
-    overlay_process.start()
+    # overlay 模块会导入 tkinter，延迟到此处导入
+    from overlay import run_overlay
+    tracker.set_backend('overlay', STATE_LOADING)
+    try:
+        overlay_process = multiprocessing.Process(target=run_overlay, args=(overlay_queue,))
+        overlay_process.daemon = True
+        overlay_process.start()
+        tracker.set_backend('overlay', STATE_READY, f"pid={overlay_process.pid}")
+    except Exception as e:
+        tracker.set_backend('overlay', STATE_FAILED, str(e))
+        print(f"[INIT] ❌ 错误: overlay 进程启动失败 - {e}")
+
+
+def _wait_for_listener(host, port, timeout=5.0):
+    """等待 HTTP/Socket.IO 监听端口可连接"""
+    probe_host = '127.0.0.1' if host in ('0.0.0.0', '') else host
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((probe_host, port), timeout=0.2):
+                return True
+        except OSError:
+            socketio.sleep(0.01)
+    return False
+
+
+def load_backends(host, port):
+    """后台启动阶段：先等待监听就绪，再依次加载各输入后端"""
+    if _wait_for_listener(host, port):
+        tracker.mark('listening')
+    else:
+        print("[STARTUP] ⚠️ 等待监听端口超时，继续加载后端")
+    with tracker.phase('keyboard_backend'):
+        init_keyboard()
+    with tracker.phase('joystick_backend'):
+        init_virtual_joystick()
+    with tracker.phase('mouse_backend'):
+        init_mouse()
+    with tracker.phase('overlay_process'):
+        start_overlay()
+    tracker.mark('backends_loaded')
+    print(tracker.report())
+
+
+def _broadcast_backend_status(snapshot):
+    socketio.emit('backend_status', snapshot)
 
 
 def shutdown_server(grace_period: float = 2.0):
@@ -470,14 +1321,23 @@ def shutdown_server(grace_period: float = 2.0):
                     pass
                 overlay_process.join(timeout=1.0)
 
+        watchdog.stop()
+        pointer_output.stop()
+        dashboard.stop()
+        macro_engine.stop()
+        recorder.stop()
+        
         # 关闭虚拟摇杆
         try:
             if virtual_joystick is not None:
                 if config.DEBUG:
                     print("[SHUTDOWN] 关闭虚拟摇杆")
                 virtual_joystick.close()
+            gamepad_pool.close()
         except Exception:
             pass
+        if telemetry is not None:
+            telemetry.close()
 
         # 停止监视器（如果存在）
         try:
@@ -492,6 +1352,91 @@ def shutdown_server(grace_period: float = 2.0):
         print(f"[SHUTDOWN] 清理时发生错误: {e}")
 
 
+def _joystick_writes():
+    """所有虚拟手柄实际写入设备的次数（请求次数减去未变化被跳过的次数）"""
+    return sum(j.writes_requested - j.writes_suppressed for j in gamepad_pool.joysticks())
+
+
+def _overlay_queue_depth():
+    try:
+        return overlay_queue.qsize()
+    except NotImplementedError:
+        # macOS 不支持 multiprocessing.Queue.qsize()
+        return None
+
+
+def _setup_metrics():
+    """包装所有已注册的 Socket.IO 事件与 HTTP 路由，并注册抓取时计算的仪表"""
+    metrics.instrument_socketio(socketio)
+    metrics.instrument_flask(app)
+    metrics.gauge('connected_devices', 'Connected Socket.IO clients.', lambda: len(connected_devices))
+    metrics.gauge('main_devices', 'Connections bound to a virtual gamepad slot.',
+                  lambda: len(gamepad_pool.sessions()))
+    metrics.gauge('main_device_present', '1 when at least one main device is connected.',
+                  lambda: 1 if gamepad_pool.sessions() else 0)
+    metrics.gauge('held_buttons', 'Buttons currently held down by clients.',
+                  lambda: sum(len(ids) for ids in held_buttons.values()))
+    metrics.gauge('overlay_queue_depth', 'Messages waiting for the overlay process.', _overlay_queue_depth)
+    metrics.gauge('joystick_writes_total', 'Axis/button values written to virtual gamepads.',
+                  _joystick_writes, metric_type='counter')
+    metrics.gauge('joystick_writes_per_second', 'Virtual gamepad write rate since the previous scrape.',
+                  RateGauge(_joystick_writes))
+    metrics.gauge('injection_backlog', 'Injected input waiting to be executed.',
+                  lambda: {'macro': macro_engine.backlog(), 'pointer': pointer_output.backlog()},
+                  labels=('queue',))
+    metrics.gauge('active_profile', 'Currently active profile.',
+                  lambda: {(profiles.active.name, profiles.active.mode): 1}, labels=('profile', 'mode'))
+    metrics.gauge('dashboard_viewers', 'Open dashboard/overlay streams.', lambda: dashboard.viewers)
+
+
+if _metrics_config.get('enabled', True):
+    _setup_metrics()
+
+
+def start_telemetry():
+    """创建共享内存遥测文件并让所有虚拟手柄槽位发布到其中"""
+    global telemetry
+    try:
+        telemetry = TelemetryWriter(_telemetry_config.get('path'), gamepad_pool.max_gamepads)
+    except OSError as e:
+        print(f"[TELEMETRY] 无法创建遥测文件: {e}")
+        return None
+    gamepad_pool.attach_telemetry(telemetry)
+    print(f"[TELEMETRY] 手柄状态发布到 {telemetry.path}（{telemetry.slot_count} 个槽位）")
+    return telemetry
+
+
+def start_background_tasks(host, port):
+    """启动输入后端加载、看门狗、鼠标输出、看板广播等后台任务（两种运行模式共用）"""
+    tracker.mark('imports_done')
+    for backend in ('keyboard', 'joystick', 'mouse', 'overlay'):
+        tracker.register_backend(backend)
+    tracker.add_listener(_broadcast_backend_status)
+    
+    # 共享内存遥测：在加载虚拟手柄之前创建，手柄一出现就开始发布
+    if _telemetry_config.get('enabled', True):
+        start_telemetry()
+    
+    # 输入后端（pynput、vgamepad/uinput、Tk 监视器、overlay 进程）在监听就绪后于后台加载
+    socketio.start_background_task(load_backends, host, port)
+    
+    # 输入看门狗：输入源停滞或断开时归中
+    if _watchdog_config.get('enabled', True):
+        socketio.start_background_task(watchdog.run, socketio.sleep)
+    
+    # 鼠标输出循环（陀螺仪瞄准、触控板）
+    socketio.start_background_task(pointer_output.run, socketio.sleep)
+    
+    # 网页看板 / 直播叠加层的状态广播
+    if _dashboard_config.get('enabled', True):
+        socketio.start_background_task(dashboard.run, socketio.sleep)
+    
+    if _recording_config.get('autostart'):
+        start_recording()
+    if _profiler_config.get('enabled', True) and not _profiler_config.get('token'):
+        print(f"[PROFILER] 采样分析器令牌: {_profiler_token}（/api/debug/profile）")
+
+
 def _signal_handler(sig, frame):
     # Called on SIGINT/SIGTERM
     try:
@@ -506,15 +1451,19 @@ def _signal_handler(sig, frame):
         os._exit(0)
 
 if __name__ == '__main__':
-    # Initialize virtual joystick for driving mode
-    init_virtual_joystick()
-    
-    # Start overlay
-    start_overlay()
     print(
-    "Server started. Access the web interface at http://<your-device-ip>:5000",
-    "For Example: http://localhost:5000",
+    f"Server started. Access the web interface at http://<your-device-ip>:{config.SERVER_PORT}",
+    f"For Example: http://localhost:{config.SERVER_PORT}",
     )
+    if SERVER_MODE == 'asgi':
+        # uvicorn 处理 SIGINT/SIGTERM，并在 lifespan 中启动后台任务、调用 shutdown_server；
+        # 传入正在运行的 __main__ 模块，避免 asgi_server 再导入一份 app
+        import asgi_server
+        asgi_server.run(sys.modules[__name__], config.SERVER_HOST, config.SERVER_PORT)
+        os._exit(0)
+
+    start_background_tasks(config.SERVER_HOST, config.SERVER_PORT)
+    print(f"[SERVER] 运行模式: {SERVER_MODE}（Werkzeug + Socket.IO async_mode={socketio.async_mode}）")
     # Start server
     # host='0.0.0.0' so it is accessible from other devices
     # Register signal handlers so Ctrl+C triggers cleanup
@@ -528,7 +1477,7 @@ if __name__ == '__main__':
         pass
 
     try:
-        socketio.run(app, host='0.0.0.0', port=5000, allow_unsafe_werkzeug=True)
+        socketio.run(app, host=config.SERVER_HOST, port=config.SERVER_PORT, allow_unsafe_werkzeug=True)
     except KeyboardInterrupt:
         # In some environments KeyboardInterrupt may be raised instead of signal handler
         print("[MAIN] KeyboardInterrupt caught, shutting down...")
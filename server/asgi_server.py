@@ -0,0 +1,273 @@
+"""
+asyncio / ASGI 运行模式（``config.SERVER_MODE = "asgi"``）。
+
+默认的 threading 模式使用 Werkzeug 开发服务器，每个连接一个线程。ASGI 模式
+把 Socket.IO 放到 uvicorn 上的 ``socketio.AsyncServer``，HTTP 路由（Flask）
+通过 WSGI→ASGI 适配器（a2wsgi，或 asgiref）挂在同一个应用下::
+
+    pip install uvicorn a2wsgi
+    # config.py 中 SERVER_MODE = "asgi"，然后照常 python server/app.py
+    # 或由 uvicorn 直接加载（后台任务在 lifespan startup 时启动）:
+    uvicorn --factory asgi_server:create_app --app-dir server --host 0.0.0.0 --port 5000
+
+app.py 中的事件处理函数不需要改写：:class:`ServerBridge` 替换 flask-socketio
+的 ``socketio.server``，已注册（以及之后用 ``@socketio.on`` 注册）的处理函数
+都由事件循环上的协程分发到线程池执行，因此 ``execute_combination`` 中的
+``time.sleep``、``load_config`` / ``save_config`` 的文件读写、虚拟手柄写入都
+不会阻塞事件循环。同一连接的事件按到达顺序逐个执行（每个 sid 一把公平的
+``asyncio.Lock``），``button_down`` 不会被同一台设备的 ``button_up`` 超过。
+
+``socketio.emit`` 等从工作线程调用时通过 ``run_coroutine_threadsafe`` 交给
+事件循环；``start_background_task`` 启动普通线程，``socketio.sleep`` 即
+``time.sleep``，所以看门狗、鼠标输出循环、看板广播等后台任务与 threading
+模式完全相同。
+
+替换 ``socketio.server`` 依赖 flask-socketio 的内部属性（``server_options``、
+``server.handlers``，以及模块级 ``emit`` / ``join_room`` 等转调的服务器方法），
+所以 requirements.txt 固定了 flask-socketio / python-socketio / python-engineio
+的版本；:func:`install` 在这些属性缺失时拒绝启动，版本与 :data:`TESTED_VERSIONS`
+不同时打印警告。
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 16
+
+# 验证过 ServerBridge 的版本（主版本, 次版本），与 requirements.txt 一致
+TESTED_VERSIONS = {
+    'flask-socketio': (5, 7),
+    'python-socketio': (5, 17),
+    'python-engineio': (4, 14),
+}
+
+
+class ServerBridge:
+    """Stands in for flask-socketio's ``socketio.server`` and runs handlers off the event loop.
+
+    Args:
+        sio: the ``socketio.AsyncServer`` (``async_mode='asgi'``) that owns the connections
+        flask_app: Flask application whose request context the handlers run in
+        workers: threads executing event handlers
+    """
+
+    async_mode = 'asgi'
+
+    def __init__(self, sio, flask_app, workers=DEFAULT_WORKERS):
+        self.sio = sio
+        self.eio = sio.eio
+        self.flask_app = flask_app
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sio-handler')
+        # namespace -> {event: handler}，与 socketio.Server.handlers 结构相同，可被 metrics/load_test 包装
+        self.handlers = {}
+        self.loop = None
+        self._locks = {}
+
+    # ---- 处理函数 ----
+
+    def on(self, event, handler=None, namespace=None):
+        namespace = namespace or '/'
+
+        def register(handler):
+            self.handlers.setdefault(namespace, {})[event] = handler
+            self.sio.on(event, self._dispatcher(event, namespace), namespace=namespace)
+            return handler
+
+        if handler is None:
+            return register
+        register(handler)
+
+    def _dispatcher(self, event, namespace):
+        handlers = self.handlers[namespace]
+
+        async def dispatch(sid, *args):
+            if event == 'connect':
+                # flask-socketio 的 WSGI 中间件平时在 environ 中放入 flask.app
+                environ = args[0]
+                environ['flask.app'] = self.flask_app
+                environ.setdefault('wsgi.url_scheme', environ.get('asgi.scope', {}).get('scheme', 'http'))
+            lock = self._locks.get(sid)
+            if lock is None:
+                lock = self._locks[sid] = asyncio.Lock()
+            async with lock:
+                ret = None
+                try:
+                    # 每次分发时查找，包装（metrics、load_test）后的处理函数立即生效
+                    ret = await asyncio.get_running_loop().run_in_executor(
+                        self.executor, handlers[event], sid, *args)
+                    return ret
+                finally:
+                    if event == 'disconnect' or (event == 'connect' and ret is False):
+                        self._locks.pop(sid, None)
+
+        dispatch.__name__ = f"dispatch_{event}"
+        return dispatch
+
+    # ---- 从工作线程调用的服务器方法 ----
+
+    def _submit(self, coro):
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            # 事件循环尚未启动或已关闭：没有连接可以发送
+            coro.close()
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def _offload(self, callback):
+        async def offloaded(*args):
+            return await asyncio.get_running_loop().run_in_executor(self.executor, callback, *args)
+        return offloaded
+
+    def emit(self, event, *args, **kwargs):
+        if kwargs.get('callback') is not None:
+            kwargs['callback'] = self._offload(kwargs['callback'])
+        self._submit(self.sio.emit(event, *args, **kwargs))
+
+    def send(self, data, **kwargs):
+        self.emit('message', data, **kwargs)
+
+    def enter_room(self, sid, room, namespace=None):
+        self._submit(self.sio.enter_room(sid, room, namespace=namespace))
+
+    def leave_room(self, sid, room, namespace=None):
+        self._submit(self.sio.leave_room(sid, room, namespace=namespace))
+
+    def close_room(self, room, namespace=None):
+        self._submit(self.sio.close_room(room, namespace=namespace))
+
+    def disconnect(self, sid, namespace=None):
+        self._submit(self.sio.disconnect(sid, namespace=namespace))
+
+    def rooms(self, sid, namespace=None):
+        return self.sio.rooms(sid, namespace=namespace)
+
+    def call(self, event, *args, timeout=60, **kwargs):
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            raise RuntimeError('事件循环未运行')
+        future = asyncio.run_coroutine_threadsafe(self.sio.call(event, *args, timeout=timeout, **kwargs), loop)
+        return future.result()
+
+    def get_environ(self, sid, namespace=None):
+        return self.sio.get_environ(sid, namespace=namespace)
+
+    def start_background_task(self, target, *args, **kwargs):
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+    def sleep(self, seconds=0):
+        time.sleep(seconds)
+
+
+def _check_versions(socketio):
+    """Refuse to patch a flask-socketio without the internals ServerBridge replaces."""
+    if not hasattr(socketio, 'server_options') or not hasattr(socketio, 'server'):
+        raise RuntimeError('ASGI 模式不支持当前的 flask-socketio 版本，请按 requirements.txt 安装')
+    if socketio.server is not None and not isinstance(getattr(socketio.server, 'handlers', None), dict):
+        raise RuntimeError('ASGI 模式不支持当前的 python-socketio 版本，请按 requirements.txt 安装')
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return
+    for package, tested in TESTED_VERSIONS.items():
+        try:
+            installed = version(package)
+        except PackageNotFoundError:
+            continue
+        if tuple(int(part) for part in installed.split('.')[:2] if part.isdigit()) != tested:
+            print(f"[SERVER] 警告: {package} {installed} 未经 ASGI 模式验证"
+                  f"（验证过的版本: {tested[0]}.{tested[1]}.x）")
+
+
+def _wsgi_to_asgi(flask_app, workers):
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError:
+        pass
+    else:
+        return WSGIMiddleware(flask_app, workers=workers)
+    try:
+        from asgiref.wsgi import WsgiToAsgi
+    except ImportError:
+        raise RuntimeError('ASGI 模式需要 WSGI 适配器: pip install uvicorn a2wsgi')
+    return WsgiToAsgi(flask_app)
+
+
+def install(flask_app, socketio, workers=DEFAULT_WORKERS, on_startup=None, on_shutdown=None, loop_tasks=()):
+    """Move ``socketio``'s handlers onto an asyncio Socket.IO server; returns the ASGI application.
+
+    ``on_startup`` / ``on_shutdown`` are plain callables run at lifespan startup
+    (on the loop, so they should only start threads) and shutdown (in the
+    executor); ``loop_tasks`` are coroutine functions started on the event loop.
+    """
+    import socketio as python_socketio
+
+    _check_versions(socketio)
+    options = dict(socketio.server_options)
+    options['async_mode'] = 'asgi'
+    sio = python_socketio.AsyncServer(**options)
+    bridge = ServerBridge(sio, flask_app, workers)
+    for namespace, handlers in (socketio.server.handlers if socketio.server else {}).items():
+        for event, handler in handlers.items():
+            bridge.on(event, handler, namespace=namespace)
+    socketio.server = bridge
+    socketio.async_mode = bridge.async_mode
+
+    async def startup():
+        bridge.loop = asyncio.get_running_loop()
+        for task in loop_tasks:
+            bridge.loop.create_task(task())
+        if on_startup is not None:
+            on_startup()
+
+    async def shutdown():
+        if on_shutdown is not None:
+            await asyncio.get_running_loop().run_in_executor(None, on_shutdown)
+        bridge.executor.shutdown(wait=False)
+
+    return python_socketio.ASGIApp(sio, other_asgi_app=_wsgi_to_asgi(flask_app, workers),
+                                   on_startup=startup, on_shutdown=shutdown)
+
+
+def build(app_module):
+    """ASGI application for app.py (the imported module, or ``__main__`` when run as a script)."""
+    config = app_module.config
+    asgi_config = getattr(config, 'ASGI_CONFIG', {})
+    workers = asgi_config.get('workers', DEFAULT_WORKERS)
+    application = install(app_module.app, app_module.socketio, workers=workers,
+                          on_startup=lambda: app_module.start_background_tasks(config.SERVER_HOST, config.SERVER_PORT),
+                          on_shutdown=app_module.shutdown_server)
+    print(f"[SERVER] 运行模式: asgi（uvicorn + asyncio Socket.IO，事件处理函数在 {workers} 个线程中执行）")
+    return application
+
+
+def create_app():
+    """``uvicorn --factory asgi_server:create_app --app-dir server``"""
+    import app
+    return build(app)
+
+
+def serve(application, host, port, log_level='warning'):
+    """Run an ASGI application on uvicorn until SIGINT/SIGTERM."""
+    try:
+        import uvicorn
+    except ImportError:
+        raise RuntimeError('ASGI 模式需要 uvicorn: pip install uvicorn a2wsgi')
+    uvicorn.run(application, host=host, port=port, log_level=log_level, lifespan='on',
+                timeout_graceful_shutdown=2)
+
+
+def run(app_module, host, port):
+    log_level = getattr(app_module.config, 'ASGI_CONFIG', {}).get('log_level', 'warning')
+    serve(build(app_module), host, port, log_level)
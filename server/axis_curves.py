@@ -0,0 +1,277 @@
+"""
+轴响应曲线：把每个轴的整条整形链预先编译成查找表。
+
+整形链（输入为归一化后的 -1..1 值）：
+
+1. 内死区 ``deadzone``：幅值不超过它时输出 0
+2. 外死区 ``outer_deadzone``：幅值达到 ``1 - outer_deadzone`` 即满输出
+3. 响应曲线 ``curve``（作用于幅值 0..1）
+   - ``linear``：线性
+   - ``expo``：幂曲线 ``m ** exponent``（exponent > 1 中心更细腻）
+   - ``s_curve``：S 曲线 ``m^a / (m^a + (1-m)^a)``，a = ``exponent``
+   - ``spline``：经过 ``points``（[[x, y], ...]，0..1）的单调三次样条
+   - ``asymmetric``：正负方向分别使用 ``positive`` / ``negative`` 曲线
+4. 反死区 ``anti_deadzone``：离开死区后输出直接从该值起步（抵消游戏自带死区）
+5. 峰值 ``peak_value``，反转 ``invert``
+
+摇杆控件（两个轴一起处理）的径向 / 方形死区见 :func:`stick_deadzone`。
+
+配置改变时 :func:`compile_axis` 用解析函数 :func:`shape` 采样整条链，
+得到 ``TABLE_SIZE`` 个点的 ``array('f')``；每个样本只做一次线性插值查表。
+直接运行本文件会对比查表结果与解析结果::
+
+    python server/axis_curves.py
+"""
+
+import math
+from array import array
+
+TABLE_SIZE = 4096
+
+CURVE_TYPES = ('linear', 'expo', 's_curve', 'spline', 'asymmetric')
+
+DEFAULT_CURVE = {
+    'type': 'linear',
+    'exponent': 2.0,
+}
+
+
+def _monotone_spline(points):
+    """Build a monotone cubic (Fritsch-Carlson) interpolant through ``points`` on 0..1."""
+    pts = sorted((min(1.0, max(0.0, float(x))), min(1.0, max(0.0, float(y)))) for x, y in points)
+    if not pts or pts[0][0] > 0.0:
+        pts.insert(0, (0.0, 0.0))
+    if pts[-1][0] < 1.0:
+        pts.append((1.0, 1.0))
+    # 去掉 x 重复的点
+    xs, ys = [], []
+    for x, y in pts:
+        if xs and x - xs[-1] < 1e-9:
+            ys[-1] = y
+        else:
+            xs.append(x)
+            ys.append(y)
+    n = len(xs)
+    if n < 2:
+        return lambda m: m
+    slopes = [(ys[i + 1] - ys[i]) / (xs[i + 1] - xs[i]) for i in range(n - 1)]
+    tangents = [slopes[0]] + [
+        0.0 if slopes[i - 1] * slopes[i] <= 0 else (slopes[i - 1] + slopes[i]) / 2.0
+        for i in range(1, n - 1)
+    ] + [slopes[-1]]
+    for i, s in enumerate(slopes):
+        if s == 0.0:
+            tangents[i] = tangents[i + 1] = 0.0
+            continue
+        a, b = tangents[i] / s, tangents[i + 1] / s
+        h = a * a + b * b
+        if h > 9.0:
+            k = 3.0 / math.sqrt(h)
+            tangents[i] = k * a * s
+            tangents[i + 1] = k * b * s
+
+    def spline(m):
+        i = 0
+        while i < n - 2 and m > xs[i + 1]:
+            i += 1
+        h = xs[i + 1] - xs[i]
+        t = (m - xs[i]) / h
+        t2, t3 = t * t, t * t * t
+        return ((2 * t3 - 3 * t2 + 1) * ys[i] + (t3 - 2 * t2 + t) * h * tangents[i]
+                + (-2 * t3 + 3 * t2) * ys[i + 1] + (t3 - t2) * h * tangents[i + 1])
+
+    return spline
+
+
+def _curve_function(curve_cfg):
+    """Return ``f(m) -> 0..1`` for magnitude ``m`` in 0..1, or ``(pos, neg)`` for asymmetric curves."""
+    cfg = dict(DEFAULT_CURVE)
+    cfg.update(curve_cfg or {})
+    curve_type = cfg['type']
+    if curve_type == 'asymmetric':
+        return (_curve_function(cfg.get('positive')), _curve_function(cfg.get('negative')))
+    exponent = max(0.01, float(cfg['exponent']))
+    if curve_type == 'expo':
+        return lambda m: m ** exponent
+    if curve_type == 's_curve':
+        def s_curve(m):
+            a = m ** exponent
+            return a / (a + (1.0 - m) ** exponent)
+        return s_curve
+    if curve_type == 'spline':
+        return _monotone_spline(cfg.get('points') or [])
+    return lambda m: m
+
+
+def shape(value, axis_cfg):
+    """Analytic shaping chain for one value; the reference the lookup table is built from."""
+    return _build_shaper(axis_cfg)(value)
+
+
+def _build_shaper(axis_cfg):
+    deadzone = max(0.0, float(axis_cfg.get('deadzone', 0.05)))
+    outer = max(0.0, float(axis_cfg.get('outer_deadzone', 0.0)))
+    anti = min(1.0, max(0.0, float(axis_cfg.get('anti_deadzone', 0.0))))
+    peak = float(axis_cfg.get('peak_value', 1.0))
+    sign_out = -1.0 if axis_cfg.get('invert') else 1.0
+    curve = _curve_function(axis_cfg.get('curve'))
+    if isinstance(curve, tuple):
+        pos_curve, neg_curve = curve
+    else:
+        pos_curve = neg_curve = curve
+    span = 1.0 - outer - deadzone
+
+    def shaper(value):
+        value = max(-1.0, min(1.0, value))
+        magnitude = abs(value)
+        # 与 apply_deadzone 一致：恰好在死区边界时输出 0
+        if magnitude <= deadzone or span <= 0.0:
+            return 0.0
+        m = min(1.0, (magnitude - deadzone) / span)
+        m = (pos_curve if value > 0 else neg_curve)(m)
+        m = min(1.0, max(0.0, m))
+        m = anti + (1.0 - anti) * m
+        out = m * peak * sign_out
+        return out if value > 0 else -out
+
+    return shaper
+
+
+class AxisCurve:
+    """One axis's shaping chain sampled into a dense ``array('f')`` over -1..1."""
+
+    __slots__ = ('table', 'size', 'deadzone', '_scale', '_last')
+
+    def __init__(self, axis_cfg, size=TABLE_SIZE):
+        shaper = _build_shaper(axis_cfg)
+        self.size = size
+        self._scale = (size - 1) * 0.5
+        self._last = size - 1
+        step = 2.0 / (size - 1)
+        self.table = array('f', [shaper(-1.0 + i * step) for i in range(size)])
+        self.deadzone = max(0.0, float(axis_cfg.get('deadzone', 0.05)))
+
+    def lookup(self, value):
+        """Map a -1..1 value through the table with linear interpolation."""
+        # 死区内严格输出 0，避免跨越死区边界的插值把静止的轴推离中心
+        if -self.deadzone <= value <= self.deadzone:
+            return 0.0
+        pos = (value + 1.0) * self._scale
+        if pos <= 0.0:
+            return self.table[0]
+        if pos >= self._last:
+            return self.table[self._last]
+        i = int(pos)
+        frac = pos - i
+        table = self.table
+        lo = table[i]
+        return lo + (table[i + 1] - lo) * frac
+
+
+STICK_DEADZONE_SHAPES = ('radial', 'square')
+
+
+def stick_deadzone(x, y, deadzone, shape='radial'):
+    """Apply a two-dimensional deadzone to a stick position and rescale the rest to full range.
+
+    ``radial`` works on the vector length, so the direction is preserved;
+    ``square`` works on each axis independently (snaps toward the cardinal
+    directions near the center). The input is clamped to the unit circle.
+    """
+    magnitude = math.hypot(x, y)
+    if magnitude > 1.0:
+        x /= magnitude
+        y /= magnitude
+        magnitude = 1.0
+    if deadzone <= 0.0:
+        return x, y
+    if deadzone >= 1.0:
+        return 0.0, 0.0
+    if shape == 'square':
+        def axial(v):
+            m = abs(v)
+            if m <= deadzone:
+                return 0.0
+            m = (m - deadzone) / (1.0 - deadzone)
+            return m if v > 0 else -m
+        return axial(x), axial(y)
+    if magnitude <= deadzone:
+        return 0.0, 0.0
+    scale = (magnitude - deadzone) / (1.0 - deadzone) / magnitude
+    return x * scale, y * scale
+
+
+def compile_axis(axis_cfg, size=TABLE_SIZE):
+    return AxisCurve(axis_cfg or {}, size)
+
+
+def compile_axes(axis_config, size=TABLE_SIZE):
+    """Compile every entry of a driving_config ``axis_config`` dict: {gamepad_axis: AxisCurve}."""
+    return {axis: compile_axis(cfg, size) for axis, cfg in (axis_config or {}).items()}
+
+
+def _edges(axis_cfg):
+    """Input magnitudes where the chain is discontinuous or has a kink."""
+    deadzone = max(0.0, float(axis_cfg.get('deadzone', 0.05)))
+    outer = max(0.0, float(axis_cfg.get('outer_deadzone', 0.0)))
+    return (deadzone, 1.0 - outer)
+
+
+def compare(axis_cfg, samples=100000, size=TABLE_SIZE):
+    """Compare table lookup with the analytic chain at ``samples`` evenly spaced inputs.
+
+    Inputs within one table cell of a deadzone edge are reported separately,
+    since the anti-deadzone makes the chain jump there.
+    Returns ``(max_error, max_error_at_edges)``.
+    """
+    curve = compile_axis(axis_cfg, size)
+    shaper = _build_shaper(axis_cfg)
+    cell = 2.0 / (size - 1)
+    edges = _edges(axis_cfg)
+    max_err = 0.0
+    max_edge_err = 0.0
+    for i in range(samples + 1):
+        x = -1.0 + 2.0 * i / samples
+        err = abs(curve.lookup(x) - shaper(x))
+        if any(abs(abs(x) - e) <= cell for e in edges):
+            max_edge_err = max(max_edge_err, err)
+        else:
+            max_err = max(max_err, err)
+    return max_err, max_edge_err
+
+
+if __name__ == '__main__':
+    import time
+
+    cases = {
+        'linear': {'deadzone': 0.05},
+        'expo': {'deadzone': 0.05, 'curve': {'type': 'expo', 'exponent': 2.5}},
+        's_curve': {'deadzone': 0.1, 'outer_deadzone': 0.05, 'curve': {'type': 's_curve', 'exponent': 3.0}},
+        'spline': {'deadzone': 0.02, 'curve': {'type': 'spline', 'points': [[0.25, 0.1], [0.5, 0.3], [0.8, 0.85]]}},
+        'asymmetric': {'deadzone': 0.05, 'invert': True, 'peak_value': 0.8,
+                       'curve': {'type': 'asymmetric', 'positive': {'type': 'expo', 'exponent': 1.5},
+                                 'negative': {'type': 'linear'}}},
+        'anti_deadzone': {'deadzone': 0.05, 'anti_deadzone': 0.2, 'curve': {'type': 'expo', 'exponent': 2.0}},
+    }
+    tolerance = 1e-3
+    failed = False
+    for name, cfg in cases.items():
+        err, edge_err = compare(cfg)
+        ok = err <= tolerance
+        failed |= not ok
+        print(f"[CURVE] {name:<14} max_err={err:.2e} edge_err={edge_err:.2e} {'OK' if ok else 'FAIL'}")
+
+    cfg = cases['spline']
+    curve = compile_axis(cfg)
+    shaper = _build_shaper(cfg)
+    xs = [-1.0 + 2.0 * i / 9999 for i in range(10000)]
+    start = time.perf_counter()
+    for x in xs:
+        curve.lookup(x)
+    lut_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for x in xs:
+        shaper(x)
+    analytic_time = time.perf_counter() - start
+    print(f"[CURVE] 查表 {lut_time / len(xs) * 1e9:.0f} ns/样本, 解析 {analytic_time / len(xs) * 1e9:.0f} ns/样本")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,217 @@
+"""
+轴输入滤波与延迟补偿。
+
+每个手柄轴占用 FilterBank 中一个预分配的槽位（array('d') 中固定步长的一段），
+每收到一个样本调用一次 ``step()``。每个槽位由两级组成：
+
+1. 平滑（``type``）
+   - ``none``：不平滑
+   - ``one_euro``：One Euro 滤波器，静止时强平滑、快速移动时几乎无延迟
+     （参数 ``min_cutoff``、``beta``、``d_cutoff``）
+   - ``critically_damped``：临界阻尼弹簧跟随（参数 ``smooth_time``，秒）
+2. 预测（``prediction``）
+   - ``none``：不预测
+   - ``linear``：用最近两次平滑值的斜率外推
+   - ``velocity``：用指数平滑后的速度外推（参数 ``velocity_smoothing``）
+   外推时长为测得的单向网络延迟，且不超过 ``max_horizon`` 秒。
+
+axis_config 中的配置示例::
+
+    "filter": {"type": "one_euro", "min_cutoff": 1.0, "beta": 5.0,
+               "prediction": "velocity", "max_horizon": 0.05}
+"""
+
+import math
+from array import array
+
+# 平滑方式
+SMOOTH_NONE = 0
+SMOOTH_ONE_EURO = 1
+SMOOTH_CRITICALLY_DAMPED = 2
+
+SMOOTH_TYPES = {
+    'none': SMOOTH_NONE,
+    'one_euro': SMOOTH_ONE_EURO,
+    'critically_damped': SMOOTH_CRITICALLY_DAMPED,
+}
+
+# 预测方式
+PREDICT_NONE = 0
+PREDICT_LINEAR = 1
+PREDICT_VELOCITY = 2
+
+PREDICTION_TYPES = {
+    'none': PREDICT_NONE,
+    'linear': PREDICT_LINEAR,
+    'velocity': PREDICT_VELOCITY,
+}
+
+# 每个槽位的状态字段
+_X = 0          # 上一次平滑输出
+_DX = 1         # One Euro 的导数估计 / 临界阻尼的速度
+_T = 2          # 上一次样本时间
+_INIT = 3       # 是否已有样本
+_V = 4          # 预测用速度
+_STATE_STRIDE = 5
+
+# 每个槽位的参数字段
+_MIN_CUTOFF = 0
+_BETA = 1
+_D_CUTOFF = 2
+_SMOOTH_TIME = 3
+_MAX_HORIZON = 4
+_VEL_SMOOTHING = 5
+_PARAM_STRIDE = 6
+
+# 样本间隔的下限（秒）。浏览器 event.timeStamp 精度常为 1 ms 或更粗，间隔小于
+# 此值（时间相同或倒退）的样本视为同一时刻的更新：照常平滑，但不用它估计导数
+# 和速度（除以极小的 dt 会让预测外推到满量程），预测沿用已有的速度
+_MIN_DT = 1e-3
+
+DEFAULT_FILTER = {
+    'type': 'none',
+    'min_cutoff': 1.0,
+    'beta': 5.0,
+    'd_cutoff': 1.0,
+    'smooth_time': 0.03,
+    'prediction': 'none',
+    'max_horizon': 0.05,
+    'velocity_smoothing': 0.5,
+}
+
+
+def _smoothing_factor(cutoff, dt):
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class FilterBank:
+    """Per-axis filter state in preallocated flat arrays."""
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.state = array('d', [0.0]) * (slots * _STATE_STRIDE)
+        self.params = array('d', [0.0]) * (slots * _PARAM_STRIDE)
+        self.smooth = array('b', [SMOOTH_NONE]) * slots
+        self.predict = array('b', [PREDICT_NONE]) * slots
+        self._configs = [None] * slots
+
+    def configure(self, slot, filter_cfg):
+        """Set a slot's filter from an axis_config 'filter' dict; resets its state if it changed."""
+        if filter_cfg == self._configs[slot]:
+            return
+        self._configs[slot] = dict(filter_cfg) if filter_cfg else None
+        cfg = dict(DEFAULT_FILTER)
+        cfg.update(filter_cfg or {})
+        self.smooth[slot] = SMOOTH_TYPES.get(cfg['type'], SMOOTH_NONE)
+        self.predict[slot] = PREDICTION_TYPES.get(cfg['prediction'], PREDICT_NONE)
+        p = slot * _PARAM_STRIDE
+        self.params[p + _MIN_CUTOFF] = max(1e-3, float(cfg['min_cutoff']))
+        self.params[p + _BETA] = float(cfg['beta'])
+        self.params[p + _D_CUTOFF] = max(1e-3, float(cfg['d_cutoff']))
+        self.params[p + _SMOOTH_TIME] = max(1e-4, float(cfg['smooth_time']))
+        self.params[p + _MAX_HORIZON] = max(0.0, float(cfg['max_horizon']))
+        self.params[p + _VEL_SMOOTHING] = min(1.0, max(0.0, float(cfg['velocity_smoothing'])))
+        self.reset(slot)
+
+    def is_active(self, slot):
+        return self.smooth[slot] != SMOOTH_NONE or self.predict[slot] != PREDICT_NONE
+
+    def reset(self, slot):
+        base = slot * _STATE_STRIDE
+        for i in range(_STATE_STRIDE):
+            self.state[base + i] = 0.0
+
+    def step(self, slot, x, t, delay=0.0):
+        """Feed one sample taken at time ``t`` (seconds) and return the filtered value.
+
+        ``delay`` is the measured one-way network delay used as prediction horizon.
+        """
+        smooth = self.smooth[slot]
+        predict = self.predict[slot]
+        if smooth == SMOOTH_NONE and predict == PREDICT_NONE:
+            return x
+
+        s = self.state
+        base = slot * _STATE_STRIDE
+        p = slot * _PARAM_STRIDE
+        params = self.params
+
+        if s[base + _INIT] == 0.0:
+            s[base + _X] = x
+            s[base + _DX] = 0.0
+            s[base + _T] = t
+            s[base + _V] = 0.0
+            s[base + _INIT] = 1.0
+            return x
+
+        dt = t - s[base + _T]
+        coalesced = dt < _MIN_DT
+        if coalesced:
+            dt = _MIN_DT
+        prev = s[base + _X]
+
+        if smooth == SMOOTH_ONE_EURO:
+            edx = s[base + _DX]
+            if not coalesced:
+                dx = (x - prev) / dt
+                a_d = _smoothing_factor(params[p + _D_CUTOFF], dt)
+                edx += a_d * (dx - edx)
+                s[base + _DX] = edx
+            cutoff = params[p + _MIN_CUTOFF] + params[p + _BETA] * abs(edx)
+            a = _smoothing_factor(cutoff, dt)
+            out = prev + a * (x - prev)
+        elif smooth == SMOOTH_CRITICALLY_DAMPED:
+            omega = 2.0 / params[p + _SMOOTH_TIME]
+            k = omega * dt
+            decay = 1.0 / (1.0 + k + 0.48 * k * k + 0.235 * k * k * k)
+            change = prev - x
+            vel = s[base + _DX]
+            temp = (vel + omega * change) * dt
+            if not coalesced:
+                s[base + _DX] = (vel - omega * temp) * decay
+            out = x + (change + temp) * decay
+        else:
+            out = x
+
+        s[base + _X] = out
+
+        if predict == PREDICT_NONE:
+            if not coalesced:
+                s[base + _T] = t
+            return out
+        horizon = min(delay, params[p + _MAX_HORIZON])
+        if coalesced:
+            return out + s[base + _V] * horizon
+        s[base + _T] = t
+        velocity = (out - prev) / dt
+        if predict == PREDICT_VELOCITY:
+            k = params[p + _VEL_SMOOTHING]
+            velocity = s[base + _V] + k * (velocity - s[base + _V])
+        s[base + _V] = velocity
+        return out + velocity * horizon
+
+
+class LatencyEstimator:
+    """Smoothed one-way network delay per connection, from client RTT reports."""
+
+    def __init__(self, smoothing=0.2, max_delay=0.25):
+        self.smoothing = smoothing
+        self.max_delay = max_delay
+        self._delays = {}
+
+    def report_rtt(self, sid, rtt):
+        """Record a round-trip time in seconds."""
+        delay = min(self.max_delay, max(0.0, rtt / 2.0))
+        prev = self._delays.get(sid)
+        self._delays[sid] = delay if prev is None else prev + self.smoothing * (delay - prev)
+
+    def get(self, sid):
+        return self._delays.get(sid, 0.0)
+
+    def snapshot(self):
+        """{sid: one-way delay in seconds} for every connection with a report."""
+        return dict(self._delays)
+
+    def forget(self, sid):
+        self._delays.pop(sid, None)
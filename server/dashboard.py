@@ -0,0 +1,213 @@
+"""
+网页看板 / 直播叠加层的状态推送（Server-Sent Events）。
+
+两个 Tk 窗口（overlay.py、joystick_monitor.py）只能在游戏电脑上看，推流软件在
+另一台机器上无法捕获。这里改为网页：``/dashboard`` 显示完整状态，``/overlay``
+是透明背景的浏览器源（OBS 等），两者都订阅 ``/api/dashboard/stream``。
+
+输入处理路径完全不参与：:class:`StateBroadcaster` 的广播循环按 ``max_rate``
+采样当前状态（``sample()`` 回调读取虚拟手柄已写入的轴值、按住的按钮等），与
+上一次广播的状态比较，只有变化的键组成一帧增量（delta），序列化一次后放进
+环形缓冲区。多个输入事件在一个周期内自然合并，广播的代价与观看者数量无关。
+
+每个观看者的 SSE 生成器先收到一份完整快照，之后按相同频率从环形缓冲区取
+自己还没收到的帧；落后太多（帧已被覆盖）时重新发送快照。
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+DEFAULT_MAX_RATE = 30
+# 环形缓冲区保留的增量帧数
+DEFAULT_HISTORY = 120
+# 没有数据时发送 SSE 注释保持连接（秒）
+DEFAULT_HEARTBEAT = 15.0
+
+
+_MISSING = object()
+
+
+def diff_state(previous, current):
+    """Keys whose value changed (or appeared) in ``current``; removed keys map to None."""
+    delta = {key: value for key, value in current.items() if previous.get(key, _MISSING) != value}
+    for key in previous:
+        if key not in current:
+            delta[key] = None
+    return delta
+
+
+def sse(event, data, event_id=None):
+    """One Server-Sent Events message (``data`` is an already serialized JSON string)."""
+    head = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{head}event: {event}\ndata: {data}\n\n"
+
+
+class StateBroadcaster:
+    """Sample state at a fixed rate and fan coalesced deltas out to any number of SSE viewers.
+
+    Args:
+        sample: ``sample() -> dict`` of flat, JSON-serializable state (called from the broadcast loop)
+        max_rate: maximum frames per second sent to viewers
+        history: delta frames kept for viewers that fall behind
+        heartbeat: seconds between keep-alive comments on an idle stream
+    """
+
+    def __init__(self, sample, max_rate=DEFAULT_MAX_RATE, history=DEFAULT_HISTORY, heartbeat=DEFAULT_HEARTBEAT):
+        self.sample = sample
+        self.interval = 1.0 / max(1.0, float(max_rate))
+        self.heartbeat = heartbeat
+        self.running = False
+        self._lock = threading.Lock()
+        self._state = None
+        self._seq = 0
+        # (seq, json)；seq 连续递增
+        self._frames = deque(maxlen=max(1, int(history)))
+        self.viewers = 0
+        self.frames_sent = 0
+        self.sample_errors = 0
+
+    # ---- 广播循环 ----
+
+    def tick(self):
+        """Sample once and append a delta frame if anything changed; returns the delta (or None)."""
+        if not self.viewers:
+            # 没有观看者时不采样；下一个观看者连接时重新取快照
+            if self._state is not None:
+                with self._lock:
+                    self._state = None
+            return None
+        try:
+            current = self.sample()
+        except Exception as e:
+            # 采样与输入线程并发读取，偶尔遇到正在修改的集合时跳过这一周期
+            self.sample_errors += 1
+            if self.sample_errors == 1:
+                print(f"[DASHBOARD] 状态采样失败: {e}")
+            return None
+        with self._lock:
+            previous = self._state
+            self._state = current
+            if previous is None:
+                return None
+            delta = diff_state(previous, current)
+            if not delta:
+                return None
+            self._seq += 1
+            self._frames.append((self._seq, json.dumps({'seq': self._seq, 'delta': delta}, ensure_ascii=False)))
+            self.frames_sent += 1
+        return delta
+
+    def run(self, sleep=time.sleep):
+        """Broadcast loop; ``sleep`` should be socketio.sleep when run as a background task."""
+        self.running = True
+        next_tick = time.monotonic()
+        while self.running:
+            self.tick()
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                next_tick = time.monotonic()
+                delay = 0
+            sleep(delay)
+
+    def stop(self):
+        self.running = False
+
+    # ---- 观看者 ----
+
+    def snapshot(self):
+        """(seq, json) of the full current state, sampling now if the loop has not yet."""
+        with self._lock:
+            state = self._state
+            seq = self._seq
+        if state is None:
+            state = self.sample()
+            with self._lock:
+                if self._state is None:
+                    self._state = state
+                state = self._state
+                seq = self._seq
+        return seq, json.dumps({'seq': seq, 'state': state}, ensure_ascii=False)
+
+    def frames_since(self, seq):
+        """Delta frames after ``seq``; None when some of them were already dropped."""
+        with self._lock:
+            if self._seq == seq:
+                return []
+            if not self._frames or self._frames[0][0] > seq + 1:
+                return None
+            return [frame for frame in self._frames if frame[0] > seq]
+
+    def stream(self, sleep=time.sleep):
+        """SSE generator for one viewer: a snapshot, then deltas at most every ``interval``."""
+        with self._lock:
+            self.viewers += 1
+        try:
+            seq, data = self.snapshot()
+            yield 'retry: 2000\n\n' + sse('snapshot', data, seq)
+            last_sent = time.monotonic()
+            while True:
+                sleep(self.interval)
+                frames = self.frames_since(seq)
+                if frames is None:
+                    seq, data = self.snapshot()
+                    chunk = sse('snapshot', data, seq)
+                elif frames:
+                    seq = frames[-1][0]
+                    chunk = ''.join(sse('delta', data, frame_seq) for frame_seq, data in frames)
+                elif time.monotonic() - last_sent >= self.heartbeat:
+                    chunk = ': keep-alive\n\n'
+                else:
+                    continue
+                yield chunk
+                last_sent = time.monotonic()
+        finally:
+            with self._lock:
+                self.viewers -= 1
+
+    def get_stats(self):
+        return {'viewers': self.viewers, 'seq': self._seq, 'frames': self.frames_sent,
+                'max_rate': round(1.0 / self.interval), 'sample_errors': self.sample_errors}
+
+
+if __name__ == '__main__':
+    # 自检：高频变化的状态按 max_rate 合并成增量，多个观看者收到相同的帧序列
+    state = {'p1.left_x': 0.0, 'held': []}
+
+    def writer(stop):
+        i = 0
+        while not stop.is_set():
+            i += 1
+            state['p1.left_x'] = round((i % 200) / 100.0 - 1.0, 3)
+            state['held'] = ['A'] if (i // 500) % 2 else []
+            time.sleep(0.0005)
+
+    broadcaster = StateBroadcaster(lambda: dict(state), max_rate=30)
+    stop = threading.Event()
+    threading.Thread(target=writer, args=(stop,), daemon=True).start()
+    threading.Thread(target=broadcaster.run, daemon=True).start()
+
+    received = {}
+
+    def viewer(name):
+        seen = received[name] = []
+        for chunk in broadcaster.stream():
+            seen.append(chunk)
+            if stop.is_set():
+                break
+
+    viewers = [threading.Thread(target=viewer, args=(f"v{i}",), daemon=True) for i in range(20)]
+    for thread in viewers:
+        thread.start()
+    time.sleep(1.0)
+    stop.set()
+    for thread in viewers:
+        thread.join(1.0)
+    broadcaster.stop()
+    stats = broadcaster.get_stats()
+    deltas = sum(chunk.count('event: delta') for chunk in received['v0'])
+    print(f"[DASHBOARD] 1 秒内广播 {stats['frames']} 帧（上限 30/s），每个观看者收到 {deltas} 个增量")
+    assert stats['frames'] <= 32
+    assert received['v0'][0].startswith('retry:') and 'event: snapshot' in received['v0'][0]
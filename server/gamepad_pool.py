@@ -0,0 +1,278 @@
+"""
+多主设备：每台主设备绑定一个独立的虚拟手柄。
+
+:class:`GamepadPool` 管理 ``max_gamepads`` 个槽位（玩家 1..N）。设备设为主设备时
+分配最小的空闲槽位；槽位的 ``VirtualJoystick`` 在第一次使用时创建，
+设备离开后只做复位并保留，供下一位玩家复用（创建设备较慢，且游戏通常
+按设备出现顺序识别玩家）。
+
+每个会话（:class:`GamepadSession`）有自己的轴配置、滤波器状态和编译好的
+曲线查找表（:class:`InputPipeline`），输入事件通过 ``sid`` 一次字典查找
+找到自己的会话，开销与玩家数量无关。
+"""
+
+import threading
+from collections import OrderedDict
+
+import axis_curves
+from axis_filters import FilterBank
+from batch_processing import BatchMapper, GYRO_SOURCES
+
+# Xbox 手柄轴；下标即该轴在滤波器组中的槽位
+GAMEPAD_AXES = ('left_x', 'left_y', 'right_x', 'right_y', 'left_trigger', 'right_trigger')
+AXIS_SLOTS = {axis: slot for slot, axis in enumerate(GAMEPAD_AXES)}
+
+# 浏览器 Gamepad API（standard 映射）：轴下标 -> 源名称；y 轴向下为正，进入时取反
+GAMEPAD_API_AXES = ('left_x', 'left_y', 'right_x', 'right_y')
+# 按键下标 -> 虚拟手柄按键；6、7 为模拟扳机，作为轴源（GAMEPAD_API_TRIGGERS）
+GAMEPAD_API_BUTTONS = ('a', 'b', 'x', 'y', 'lb', 'rb', None, None, 'back', 'start', 'ls', 'rs',
+                       'dpad_up', 'dpad_down', 'dpad_left', 'dpad_right', 'guide')
+GAMEPAD_API_TRIGGERS = {6: 'left_trigger', 7: 'right_trigger'}
+# axis_config 中 source_type 为 'gamepad' 时可用的 source_id
+GAMEPAD_SOURCES = GAMEPAD_API_AXES + ('left_trigger', 'right_trigger')
+# 不属于任何已加载档案的 axis_config 最多缓存的编译结果数
+MAX_TRANSIENT_COMPILED = 8
+
+
+class CompiledAxisConfig:
+    """Curve tables, batch mapper and gamepad routes compiled from one axis_config dict."""
+
+    __slots__ = ('axis_config', 'curves', 'batch_mapper', 'gamepad_routes', 'gamepad_axes')
+
+    def __init__(self, axis_config):
+        self.axis_config = axis_config
+        self.curves = axis_curves.compile_axes(axis_config)
+        self.batch_mapper = BatchMapper(axis_config, GYRO_SOURCES, curves=self.curves)
+        # 手柄源 -> ((手柄轴, axis_cfg), ...)，一个源可以驱动多个轴
+        routes = {}
+        for gamepad_axis, axis_cfg in (axis_config or {}).items():
+            if axis_cfg.get('source_type') == 'gamepad' and axis_cfg.get('source_id') in GAMEPAD_SOURCES:
+                routes.setdefault(axis_cfg['source_id'], []).append((gamepad_axis, axis_cfg))
+        self.gamepad_routes = {source: tuple(targets) for source, targets in routes.items()}
+        self.gamepad_axes = tuple(axis for targets in routes.values() for axis, _ in targets)
+
+
+class InputPipeline:
+    """Per-gamepad input state: active axis_config, its compiled tables and filter state."""
+
+    def __init__(self):
+        self.filters = FilterBank(len(GAMEPAD_AXES))
+        self.compiled = None
+        self.axis_config = {}
+
+    def use(self, compiled):
+        """Switch to a compiled axis_config (no-op when it is already active)."""
+        if compiled is not self.compiled:
+            self.compiled = compiled
+            self.axis_config = compiled.axis_config
+
+    def reset(self):
+        """Clear filter state (the axis mapping changed, e.g. after a profile switch)."""
+        for slot in range(self.filters.slots):
+            self.filters.reset(slot)
+
+    @property
+    def batch_mapper(self):
+        return self.compiled.batch_mapper
+
+    @property
+    def gamepad_routes(self):
+        return self.compiled.gamepad_routes
+
+    def shape(self, gamepad_axis, value, axis_cfg):
+        """Apply deadzone, response curve and peak through the compiled table."""
+        curves = self.compiled.curves
+        curve = curves.get(gamepad_axis)
+        if curve is None:
+            curve = curves[gamepad_axis] = axis_curves.compile_axis(axis_cfg)
+        return curve.lookup(value)
+
+
+class GamepadSession:
+    """One main device bound to one virtual gamepad slot."""
+
+    def __init__(self, sid, slot, joystick):
+        self.sid = sid
+        self.slot = slot
+        self.joystick = joystick
+        self.pipeline = InputPipeline()
+        # 陀螺仪用于瞄准（鼠标）而不是摇杆轴
+        self.gyro_mouse = False
+        # devicemotion 姿态融合状态（motion_fusion.OrientationFusion），收到第一个 motion_data 时创建
+        self.motion = None
+
+    @property
+    def player(self):
+        return self.slot + 1
+
+    def info(self):
+        return {'slot': self.slot, 'player': self.player}
+
+
+class GamepadPool:
+    """Allocate virtual gamepads to main devices on demand, up to ``max_gamepads``.
+
+    Args:
+        max_gamepads: number of slots (players)
+        factory: ``factory(slot) -> VirtualJoystick`` creating the device for a slot
+    """
+
+    def __init__(self, max_gamepads=1, factory=None):
+        self.max_gamepads = max(1, int(max_gamepads))
+        self.factory = factory
+        self._joysticks = [None] * self.max_gamepads
+        self._slots = [None] * self.max_gamepads  # slot -> GamepadSession
+        self._sessions = {}  # sid -> GamepadSession
+        # id(axis_config) -> CompiledAxisConfig：已加载档案的轴配置，保留到 invalidate()
+        self._compiled = {}
+        # 其它轴配置（不在档案中的字典）按最近使用保留 MAX_TRANSIENT_COMPILED 个
+        self._transient = OrderedDict()
+        self._lock = threading.Lock()
+        # 共享内存遥测（telemetry.TelemetryWriter），见 attach_telemetry()
+        self.telemetry = None
+
+    # ---- 设备 ----
+
+    def set_joystick(self, slot, joystick):
+        """Install an already created device for a slot (slot 0 is created at startup)."""
+        self._joysticks[slot] = joystick
+        session = self._slots[slot]
+        if session is not None:
+            session.joystick = joystick
+        self._attach(slot, joystick)
+
+    def joystick(self, slot):
+        """Return the device for a slot, creating it on first use."""
+        joystick = self._joysticks[slot]
+        if joystick is None and self.factory is not None:
+            joystick = self._joysticks[slot] = self.factory(slot)
+            self._attach(slot, joystick)
+        return joystick
+
+    def attach_telemetry(self, writer):
+        """Publish each slot's device frames and main device to a telemetry.TelemetryWriter."""
+        self.telemetry = writer
+        for slot, joystick in enumerate(self._joysticks):
+            self._attach(slot, joystick)
+            self._publish_owner(slot, self._slots[slot])
+
+    def _attach(self, slot, joystick):
+        # 没有驾驶模式时所有槽位共用同一个设备，只发布到它第一次出现的槽位
+        if self.telemetry is not None and joystick is not None and joystick.telemetry is None:
+            joystick.attach_telemetry(self.telemetry.slot(slot))
+
+    def _publish_owner(self, slot, session):
+        if self.telemetry is not None:
+            if session is None:
+                self.telemetry.slot(slot).set_owner(0, None)
+            else:
+                self.telemetry.slot(slot).set_owner(session.player, session.sid)
+
+    def joysticks(self):
+        return [j for j in self._joysticks if j is not None]
+
+    def joysticks_by_slot(self):
+        """{slot: device} for the slots whose device has been created."""
+        return {slot: j for slot, j in enumerate(self._joysticks) if j is not None}
+
+    # ---- 会话 ----
+
+    def get(self, sid):
+        """Session for a connection, or None (hot path: one dict lookup)."""
+        return self._sessions.get(sid)
+
+    def sessions(self):
+        return list(self._sessions.values())
+
+    def primary(self):
+        """The session with the lowest slot, or None."""
+        for session in self._slots:
+            if session is not None:
+                return session
+        return None
+
+    def free_slots(self):
+        return sum(1 for session in self._slots if session is None)
+
+    def assign(self, sid):
+        """Bind a connection to the lowest free slot. Returns the session, or None when full."""
+        with self._lock:
+            session = self._sessions.get(sid)
+            if session is not None:
+                return session
+            for slot, occupant in enumerate(self._slots):
+                if occupant is None:
+                    break
+            else:
+                return None
+            session = GamepadSession(sid, slot, None)
+            self._slots[slot] = session
+            self._sessions[sid] = session
+        session.joystick = self.joystick(slot)
+        self._publish_owner(slot, session)
+        return session
+
+    def release(self, sid):
+        """Unbind a connection; its device is reset and kept for the next player."""
+        with self._lock:
+            session = self._sessions.pop(sid, None)
+            if session is None:
+                return None
+            self._slots[session.slot] = None
+        self._publish_owner(session.slot, None)
+        joystick = session.joystick
+        if joystick is not None and joystick.initialized:
+            joystick.reset()
+        return session
+
+    def players(self):
+        """Slot table for clients: [{'slot', 'player', 'occupied'}]."""
+        return [
+            {'slot': slot, 'player': slot + 1, 'occupied': session is not None}
+            for slot, session in enumerate(self._slots)
+        ]
+
+    # ---- 轴配置 ----
+
+    def compile(self, axis_config, pin=False):
+        """Compile (or reuse) tables for an axis_config dict; keyed by identity.
+
+        ``pin`` keeps the result until :meth:`invalidate` (profiles compiled at load
+        time); other dicts share a small LRU so per-event temporaries cannot grow the cache.
+        """
+        key = id(axis_config)
+        compiled = self._compiled.get(key)
+        if compiled is not None and compiled.axis_config is axis_config:
+            return compiled
+        compiled = self._transient.get(key)
+        if compiled is None or compiled.axis_config is not axis_config:
+            compiled = CompiledAxisConfig(axis_config)
+        if pin:
+            self._transient.pop(key, None)
+            self._compiled[key] = compiled
+            return compiled
+        with self._lock:
+            self._transient[key] = compiled
+            self._transient.move_to_end(key)
+            while len(self._transient) > MAX_TRANSIENT_COMPILED:
+                self._transient.popitem(last=False)
+        return compiled
+
+    def unpin(self, compiled):
+        """Drop pinned tables of a replaced profile (the shared empty config stays pinned)."""
+        for entry in compiled or ():
+            key = id(entry.axis_config)
+            if entry.axis_config and self._compiled.get(key) is entry:
+                del self._compiled[key]
+
+    def invalidate(self):
+        """Drop compiled tables after the configuration was saved."""
+        self._compiled.clear()
+        self._transient.clear()
+
+    def close(self):
+        for joystick in self.joysticks():
+            try:
+                joystick.close()
+            except Exception:
+                pass
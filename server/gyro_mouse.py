@@ -0,0 +1,144 @@
+"""
+陀螺仪瞄准：把相邻两次 ``gyro_data`` 之间的姿态变化转换为鼠标相对移动。
+
+传感器样本以完整速率到达时调用 ``feed()``，只做角度差计算并把像素位移
+交给 :class:`pointer_output.PointerOutput` 累积，由它的输出循环按周期写出
+（整数像素，亚像素余量留到下一次）。因此无论一个输出周期内到达多少个
+样本，运动都不会丢失或重复。
+
+- 灵敏度 ``sensitivity``：每度对应的像素数
+- 加速 ``acceleration``：角速度超过 ``accel_threshold``（度/秒）后，
+  每超出 100 度/秒增益增加 ``acceleration``，最大 ``max_gain``
+- 离合（ratchet）：按住离合按钮时忽略姿态变化，用于在不移动准星的情况下
+  把手机转回舒适的角度
+"""
+
+import threading
+import time
+
+from pointer_output import PointerOutput
+
+DEFAULT_GYRO_MOUSE_CONFIG = {
+    'enabled': False,
+    'yaw_source': 'alpha',
+    'pitch_source': 'beta',
+    'sensitivity': 20.0,
+    'invert_x': False,
+    'invert_y': False,
+    'acceleration': 0.0,
+    'accel_threshold': 30.0,
+    'max_gain': 3.0,
+    'max_delta': 45.0,
+}
+
+# 各姿态角的取值周期（度），用于计算跨越边界时的最短角度差
+_PERIODS = {'alpha': 360.0, 'beta': 360.0, 'gamma': 180.0}
+
+
+def angle_delta(current, previous, period=360.0):
+    """Shortest signed difference between two angles with the given period."""
+    half = period / 2.0
+    return (current - previous + half) % period - half
+
+
+class GyroMouse:
+    """Convert orientation deltas at sensor rate into relative pointer motion.
+
+    Args:
+        output: the :class:`PointerOutput` that accumulates and injects the motion
+        settings: overrides for :data:`DEFAULT_GYRO_MOUSE_CONFIG`
+    """
+
+    def __init__(self, output, settings=None):
+        self.output = output
+        cfg = dict(DEFAULT_GYRO_MOUSE_CONFIG)
+        cfg.update(settings or {})
+        self.config = cfg
+        self.yaw_source = cfg['yaw_source']
+        self.pitch_source = cfg['pitch_source']
+        self.sensitivity = float(cfg['sensitivity'])
+        self.sign_x = -1.0 if not cfg['invert_x'] else 1.0
+        self.sign_y = -1.0 if not cfg['invert_y'] else 1.0
+        self.acceleration = float(cfg['acceleration'])
+        self.accel_threshold = float(cfg['accel_threshold'])
+        self.max_gain = float(cfg['max_gain'])
+        self.max_delta = float(cfg['max_delta'])
+        self._lock = threading.Lock()
+        # sid -> (上一个样本的 {姿态角}, 时间)
+        self._last = {}
+        self._clutched = set()
+        # 统计
+        self.samples = 0
+
+    def feed(self, sid, orientation, t=None):
+        """Feed one sensor sample ({'alpha', 'beta', 'gamma'} in degrees, ``t`` in seconds)."""
+        t = time.monotonic() if t is None else t
+        yaw = orientation.get(self.yaw_source, 0.0)
+        pitch = orientation.get(self.pitch_source, 0.0)
+        with self._lock:
+            self.samples += 1
+            last = self._last.get(sid)
+            self._last[sid] = (yaw, pitch, t)
+            if last is None or sid in self._clutched:
+                return
+            last_yaw, last_pitch, last_t = last
+            d_yaw = angle_delta(yaw, last_yaw, _PERIODS.get(self.yaw_source, 360.0))
+            d_pitch = angle_delta(pitch, last_pitch, _PERIODS.get(self.pitch_source, 360.0))
+            # 过大的跳变（万向节翻转、传感器重置）丢弃
+            if abs(d_yaw) > self.max_delta or abs(d_pitch) > self.max_delta:
+                return
+            gain = 1.0
+            if self.acceleration > 0.0:
+                dt = t - last_t
+                if dt > 0.0:
+                    speed = (d_yaw * d_yaw + d_pitch * d_pitch) ** 0.5 / dt
+                    if speed > self.accel_threshold:
+                        gain = min(self.max_gain, 1.0 + self.acceleration * (speed - self.accel_threshold) / 100.0)
+            scale = self.sensitivity * gain
+        self.output.add_motion(self.sign_x * d_yaw * scale, self.sign_y * d_pitch * scale)
+
+    def set_clutch(self, sid, engaged):
+        """Engage/release the ratchet for a connection; motion while engaged is discarded."""
+        with self._lock:
+            if engaged:
+                self._clutched.add(sid)
+            else:
+                self._clutched.discard(sid)
+                # 松开后从当前姿态重新开始计算差值
+                self._last.pop(sid, None)
+
+    def forget(self, sid):
+        """Drop a connection's last sample (disconnect, stall) so resuming does not jump."""
+        with self._lock:
+            self._last.pop(sid, None)
+            self._clutched.discard(sid)
+
+    def get_stats(self):
+        return {'samples': self.samples, 'active': len(self._last), 'clutched': len(self._clutched)}
+
+
+if __name__ == '__main__':
+    # 自检：以 60 Hz 送入匀速转动，分别用不同输出频率累积，总位移应与输入一致
+    class _Counter:
+        def __init__(self):
+            self.x = 0
+            self.y = 0
+
+        def move(self, dx, dy):
+            self.x += dx
+            self.y += dy
+
+    for rate_ticks in (1, 3, 7):
+        counter = _Counter()
+        output = PointerOutput(lambda: counter)
+        mouse = GyroMouse(output, {'sensitivity': 7.3})
+        for i in range(600):
+            mouse.feed('phone', {'alpha': (350.0 + i * 0.37) % 360.0, 'beta': 10.0 - i * 0.11}, i / 60.0)
+            if i % rate_ticks == 0:
+                output.tick()
+        output.tick()
+        expected_x = -599 * 0.37 * 7.3
+        expected_y = 599 * 0.11 * 7.3
+        print(f"[GYRO_MOUSE] 每 {rate_ticks} 个样本输出一次: dx={counter.x} (期望 {expected_x:.2f}), "
+              f"dy={counter.y} (期望 {expected_y:.2f})")
+        assert abs(counter.x - expected_x) < 1.0 and abs(counter.y - expected_y) < 1.0
@@ -1,123 +1,844 @@
-import time
-import threading
-
-# Try to import pynput, but handle cases where it's not available
-try:
-    from pynput.keyboard import Key, Controller
-    keyboard = Controller()
-    HAS_PYNPUT = True
-except ImportError as e:
-    print(f"Warning: pynput not available: {e}")
-    HAS_PYNPUT = False
-    keyboard = None
-    Key = None
-
-# Key mapping dictionary for easier maintenance (only populated if pynput is available)
-KEY_MAP = {}
-if HAS_PYNPUT:
-    KEY_MAP = {
-        # Modifier keys
-        'ctrl': Key.ctrl,
-        'ctrl_l': Key.ctrl_l,
-        'ctrl_r': Key.ctrl_r,
-        'shift': Key.shift,
-        'shift_l': Key.shift_l,
-        'shift_r': Key.shift_r,
-        'alt': Key.alt,
-        'alt_l': Key.alt_l,
-        'alt_r': Key.alt_r,
-        'alt_gr': Key.alt_gr,
-        'cmd': Key.cmd,
-        'cmd_l': Key.cmd_l,
-        'cmd_r': Key.cmd_r,
-        'win': Key.cmd,  # Alias for Windows key
-        
-        # Navigation keys
-        'enter': Key.enter,
-        'return': Key.enter,
-        'esc': Key.esc,
-        'escape': Key.esc,
-        'space': Key.space,
-        'tab': Key.tab,
-        'backspace': Key.backspace,
-        'delete': Key.delete,
-        'insert': Key.insert,
-        'home': Key.home,
-        'end': Key.end,
-        'pageup': Key.page_up,
-        'page_up': Key.page_up,
-        'pagedown': Key.page_down,
-        'page_down': Key.page_down,
-        
-        # Arrow keys
-        'up': Key.up,
-        'down': Key.down,
-        'left': Key.left,
-        'right': Key.right,
-        
-        # Function keys
-        'f1': Key.f1,
-        'f2': Key.f2,
-        'f3': Key.f3,
-        'f4': Key.f4,
-        'f5': Key.f5,
-        'f6': Key.f6,
-        'f7': Key.f7,
-        'f8': Key.f8,
-        'f9': Key.f9,
-        'f10': Key.f10,
-        'f11': Key.f11,
-        'f12': Key.f12,
-        
-        # Lock keys
-        'capslock': Key.caps_lock,
-        'caps_lock': Key.caps_lock,
-        'numlock': Key.num_lock,
-        'num_lock': Key.num_lock,
-        'scrolllock': Key.scroll_lock,
-        'scroll_lock': Key.scroll_lock,
-        
-        # Other keys
-        'pause': Key.pause,
-        'print_screen': Key.print_screen,
-        'printscreen': Key.print_screen,
-        'menu': Key.menu,
-    }
-
-def parse_key(k):
-    """Parse a key string and return the corresponding pynput Key or character."""
-    k = k.lower().strip()
-    
-    # Check if it's a special key
-    if k in KEY_MAP:
-        return KEY_MAP[k]
-    
-    # If it's a single character, return it as-is
-    if len(k) == 1:
-        return k
-    
-    # Unknown key, return as-is
-    return k
-
-def execute_combination(keys):
-    """
-    依次按下按键、保持，然后按相反顺序释放。
-    或者一次性按下所有按键再全部释放。
-    """
-    if not HAS_PYNPUT:
-        print(f"[Simulated] Executing: {keys}")
-        return
-    
-    parsed_keys = [parse_key(k) for k in keys]
-    
-    print(f"Executing: {keys}")
-    
-    # Press all
-    for k in parsed_keys:
-        keyboard.press(k)
-    
-    time.sleep(0.1) # Short hold
-    
-    # Release all
-    for k in parsed_keys:
-        keyboard.release(k)
+import os
+import sys
+import time
+import heapq
+import threading
+import collections
+
+# 将配置目录加入路径以便导入（app.py 在导入本模块之后才设置路径）
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+try:
+    from config import config
+    HAS_CONFIG = True
+except Exception:
+    HAS_CONFIG = False
+    config = None
+
+# pynput 在首次使用时（或由 app.py 在后台）加载，避免拖慢服务器启动
+HAS_PYNPUT = False
+keyboard = None
+Key = None
+_pynput_loaded = False
+_backend_lock = threading.Lock()
+
+# 当前按键注入后端，见 load_backend()
+_keyboard_backend = None
+# 当前鼠标（相对移动）后端，见 load_mouse_backend()
+_mouse_backend = None
+
+# Key mapping dictionary for easier maintenance (only populated if pynput is available)
+KEY_MAP = {}
+
+
+def _build_key_map():
+    return {
+        # Modifier keys
+        'ctrl': Key.ctrl,
+        'ctrl_l': Key.ctrl_l,
+        'ctrl_r': Key.ctrl_r,
+        'shift': Key.shift,
+        'shift_l': Key.shift_l,
+        'shift_r': Key.shift_r,
+        'alt': Key.alt,
+        'alt_l': Key.alt_l,
+        'alt_r': Key.alt_r,
+        'alt_gr': Key.alt_gr,
+        'cmd': Key.cmd,
+        'cmd_l': Key.cmd_l,
+        'cmd_r': Key.cmd_r,
+        'win': Key.cmd,  # Alias for Windows key
+        
+        # Navigation keys
+        'enter': Key.enter,
+        'return': Key.enter,
+        'esc': Key.esc,
+        'escape': Key.esc,
+        'space': Key.space,
+        'tab': Key.tab,
+        'backspace': Key.backspace,
+        'delete': Key.delete,
+        'insert': Key.insert,
+        'home': Key.home,
+        'end': Key.end,
+        'pageup': Key.page_up,
+        'page_up': Key.page_up,
+        'pagedown': Key.page_down,
+        'page_down': Key.page_down,
+        
+        # Arrow keys
+        'up': Key.up,
+        'down': Key.down,
+        'left': Key.left,
+        'right': Key.right,
+        
+        # Function keys
+        'f1': Key.f1,
+        'f2': Key.f2,
+        'f3': Key.f3,
+        'f4': Key.f4,
+        'f5': Key.f5,
+        'f6': Key.f6,
+        'f7': Key.f7,
+        'f8': Key.f8,
+        'f9': Key.f9,
+        'f10': Key.f10,
+        'f11': Key.f11,
+        'f12': Key.f12,
+        
+        # Lock keys
+        'capslock': Key.caps_lock,
+        'caps_lock': Key.caps_lock,
+        'numlock': Key.num_lock,
+        'num_lock': Key.num_lock,
+        'scrolllock': Key.scroll_lock,
+        'scroll_lock': Key.scroll_lock,
+        
+        # Other keys
+        'pause': Key.pause,
+        'print_screen': Key.print_screen,
+        'printscreen': Key.print_screen,
+        'menu': Key.menu,
+    }
+
+
+def _load_pynput():
+    """Import pynput and build KEY_MAP. Returns True if pynput is available."""
+    global HAS_PYNPUT, keyboard, Key, KEY_MAP, _pynput_loaded
+    if _pynput_loaded:
+        return HAS_PYNPUT
+    # Try to import pynput, but handle cases where it's not available
+    try:
+        from pynput.keyboard import Key as _Key, Controller
+        Key = _Key
+        keyboard = Controller()
+        KEY_MAP = _build_key_map()
+        HAS_PYNPUT = True
+    except Exception as e:
+        # 无 X 显示时 pynput 可能抛出非 ImportError 的异常
+        print(f"Warning: pynput not available: {e}")
+        HAS_PYNPUT = False
+        keyboard = None
+        Key = None
+    _pynput_loaded = True
+    return HAS_PYNPUT
+
+
+# ---- 按键注入后端 ----
+
+# linux/input-event-codes.h 中的键码
+EVDEV_KEYCODES = {
+    'esc': 1, 'escape': 1,
+    '1': 2, '2': 3, '3': 4, '4': 5, '5': 6, '6': 7, '7': 8, '8': 9, '9': 10, '0': 11,
+    '-': 12, '=': 13,
+    'backspace': 14, 'tab': 15,
+    'q': 16, 'w': 17, 'e': 18, 'r': 19, 't': 20, 'y': 21, 'u': 22, 'i': 23, 'o': 24, 'p': 25,
+    '[': 26, ']': 27,
+    'enter': 28, 'return': 28,
+    'ctrl': 29, 'ctrl_l': 29,
+    'a': 30, 's': 31, 'd': 32, 'f': 33, 'g': 34, 'h': 35, 'j': 36, 'k': 37, 'l': 38,
+    ';': 39, "'": 40, '`': 41,
+    'shift': 42, 'shift_l': 42,
+    '\\': 43,
+    'z': 44, 'x': 45, 'c': 46, 'v': 47, 'b': 48, 'n': 49, 'm': 50,
+    ',': 51, '.': 52, '/': 53,
+    'shift_r': 54,
+    'alt': 56, 'alt_l': 56,
+    'space': 57, ' ': 57,
+    'capslock': 58, 'caps_lock': 58,
+    'f1': 59, 'f2': 60, 'f3': 61, 'f4': 62, 'f5': 63,
+    'f6': 64, 'f7': 65, 'f8': 66, 'f9': 67, 'f10': 68,
+    'numlock': 69, 'num_lock': 69,
+    'scrolllock': 70, 'scroll_lock': 70,
+    'f11': 87, 'f12': 88,
+    'ctrl_r': 97,
+    'print_screen': 99, 'printscreen': 99,
+    'alt_r': 100, 'alt_gr': 100,
+    'home': 102, 'up': 103, 'pageup': 104, 'page_up': 104,
+    'left': 105, 'right': 106,
+    'end': 107, 'down': 108, 'pagedown': 109, 'page_down': 109,
+    'insert': 110, 'delete': 111,
+    'pause': 119,
+    'cmd': 125, 'cmd_l': 125, 'win': 125,
+    'cmd_r': 126,
+    'menu': 127,
+}
+
+# 需要配合 Shift 输入的字符 -> 对应的未按 Shift 的按键
+EVDEV_SHIFTED = {
+    '!': '1', '@': '2', '#': '3', '$': '4', '%': '5', '^': '6', '&': '7', '*': '8',
+    '(': '9', ')': '0', '_': '-', '+': '=', '{': '[', '}': ']', ':': ';', '"': "'",
+    '~': '`', '|': '\\', '<': ',', '>': '.', '?': '/',
+}
+
+
+class KeyboardBackend:
+    """Base class for key injection backends."""
+
+    name = 'base'
+
+    def press(self, keys):
+        raise NotImplementedError
+
+    def release(self, keys):
+        raise NotImplementedError
+
+    def execute(self, keys, hold=0.1):
+        """Press all keys, hold, then release all keys."""
+        self.press(keys)
+        time.sleep(hold)
+        self.release(keys)
+
+    def close(self):
+        pass
+
+
+class NullKeyboard(KeyboardBackend):
+    """Only logs the keys; used when no injection backend is available."""
+
+    name = 'null'
+
+    def press(self, keys):
+        print(f"[Simulated] Press: {keys}")
+
+    def release(self, keys):
+        print(f"[Simulated] Release: {keys}")
+
+    def execute(self, keys, hold=0.1):
+        print(f"[Simulated] Executing: {keys}")
+
+
+class PynputKeyboard(KeyboardBackend):
+    """Inject keys through pynput (X11/XTest, Win32 SendInput, Quartz)."""
+
+    name = 'pynput'
+
+    def __init__(self):
+        if not _load_pynput():
+            raise RuntimeError("pynput not available")
+
+    def press(self, keys):
+        for k in keys:
+            keyboard.press(parse_key(k))
+
+    def release(self, keys):
+        for k in keys:
+            keyboard.release(parse_key(k))
+
+
+class UinputKeyboard(KeyboardBackend):
+    """Inject keys through a /dev/uinput virtual keyboard.
+
+    A whole combination is written as one frame of presses followed by one
+    frame of releases, each frame being a single writev.
+    """
+
+    name = 'uinput'
+
+    def __init__(self, fd=None):
+        from uinput_device import UinputDevice, EV_KEY, pack_event
+        codes = sorted(set(EVDEV_KEYCODES.values()))
+        self.device = UinputDevice('wtxrc virtual keyboard', keys=codes, fd=fd,
+                                   vendor=0x0000, product=0x0000)
+        self._press = {code: pack_event(EV_KEY, code, 1) for code in codes}
+        self._release = {code: pack_event(EV_KEY, code, 0) for code in codes}
+
+    @staticmethod
+    def keycodes(keys):
+        """Translate key names into evdev keycodes (adding Shift for shifted characters)."""
+        codes = []
+        for k in keys:
+            name = k.strip() if len(k.strip()) == 1 else k.lower().strip()
+            if name in EVDEV_SHIFTED:
+                names = ('shift', EVDEV_SHIFTED[name])
+            elif len(name) == 1 and name.isupper():
+                names = ('shift', name.lower())
+            else:
+                names = (name,)
+            for n in names:
+                code = EVDEV_KEYCODES.get(n)
+                if code is None:
+                    print(f"[Input] 未知按键: {k}")
+                elif code not in codes:
+                    codes.append(code)
+        return codes
+
+    def press(self, keys):
+        self.device.write_frames([[self._press[c] for c in self.keycodes(keys)]])
+
+    def release(self, keys):
+        self.device.write_frames([[self._release[c] for c in reversed(self.keycodes(keys))]])
+
+    def execute(self, keys, hold=0.1):
+        codes = self.keycodes(keys)
+        presses = [self._press[c] for c in codes]
+        releases = [self._release[c] for c in reversed(codes)]
+        if hold > 0:
+            self.device.write_frames([presses])
+            time.sleep(hold)
+            self.device.write_frames([releases])
+        else:
+            self.device.write_frames([presses, releases])
+
+    def close(self):
+        self.device.close()
+
+
+def _create_backend(name):
+    if name == 'uinput':
+        return UinputKeyboard()
+    if name == 'pynput':
+        return PynputKeyboard()
+    if name == 'null':
+        return NullKeyboard()
+    raise ValueError(f"unknown keyboard backend: {name}")
+
+
+def load_backend():
+    """Create the key injection backend selected by ``config.KEYBOARD_BACKEND``.
+
+    "auto" tries uinput on Linux and then pynput; an explicitly configured
+    backend falls back to pynput if it cannot be created. When nothing works
+    keys are only logged (NullKeyboard). Safe to call repeatedly and from any thread.
+    """
+    global _keyboard_backend
+    if _keyboard_backend is not None:
+        return _keyboard_backend
+    with _backend_lock:
+        if _keyboard_backend is not None:
+            return _keyboard_backend
+        requested = getattr(config, 'KEYBOARD_BACKEND', 'auto') if HAS_CONFIG else 'auto'
+        if requested == 'auto':
+            candidates = ['uinput', 'pynput'] if sys.platform.startswith('linux') else ['pynput']
+        else:
+            candidates = [requested, 'pynput']
+        backend = None
+        for name in candidates:
+            try:
+                backend = _create_backend(name)
+                break
+            except Exception as e:
+                print(f"Warning: keyboard backend '{name}' not available: {e}")
+        _keyboard_backend = backend or NullKeyboard()
+    return _keyboard_backend
+
+
+def get_backend_name():
+    return _keyboard_backend.name if _keyboard_backend is not None else None
+
+
+# ---- 鼠标（相对移动）后端 ----
+
+class MouseBackend:
+    """Base class for relative pointer backends."""
+
+    name = 'base'
+
+    def move(self, dx, dy):
+        """Move the pointer by whole pixels."""
+        raise NotImplementedError
+
+    def scroll(self, dx, dy):
+        """Scroll by whole wheel notches; positive dy scrolls up, positive dx right."""
+        raise NotImplementedError
+
+    def button(self, name, pressed):
+        """Press or release 'left' / 'right' / 'middle'."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class NullMouse(MouseBackend):
+    """Only counts motion; used when no pointer backend is available."""
+
+    name = 'null'
+
+    def __init__(self):
+        self.total_dx = 0
+        self.total_dy = 0
+        self.total_scroll = 0
+        self.clicks = 0
+
+    def move(self, dx, dy):
+        self.total_dx += dx
+        self.total_dy += dy
+
+    def scroll(self, dx, dy):
+        self.total_scroll += dy
+
+    def button(self, name, pressed):
+        if pressed:
+            self.clicks += 1
+
+
+class PynputMouse(MouseBackend):
+    """Move the pointer through pynput's mouse controller."""
+
+    name = 'pynput'
+
+    def __init__(self):
+        from pynput.mouse import Button, Controller
+        self.controller = Controller()
+        self.buttons = {'left': Button.left, 'right': Button.right, 'middle': Button.middle}
+
+    def move(self, dx, dy):
+        self.controller.move(dx, dy)
+
+    def scroll(self, dx, dy):
+        self.controller.scroll(dx, dy)
+
+    def button(self, name, pressed):
+        if pressed:
+            self.controller.press(self.buttons[name])
+        else:
+            self.controller.release(self.buttons[name])
+
+
+class UinputMouse(MouseBackend):
+    """Relative pointer device on /dev/uinput; each call is one writev (events + SYN)."""
+
+    name = 'uinput'
+
+    def __init__(self, fd=None):
+        from uinput_device import (UinputDevice, EV_KEY, EV_REL, REL_X, REL_Y, REL_WHEEL, REL_HWHEEL,
+                                   BTN_LEFT, BTN_RIGHT, BTN_MIDDLE)
+        self._ev_key = EV_KEY
+        self._ev_rel = EV_REL
+        self._rel_x = REL_X
+        self._rel_y = REL_Y
+        self._rel_wheel = REL_WHEEL
+        self._rel_hwheel = REL_HWHEEL
+        self.buttons = {'left': BTN_LEFT, 'right': BTN_RIGHT, 'middle': BTN_MIDDLE}
+        # 没有 BTN_LEFT 的相对设备不会被 libinput 识别为鼠标
+        self.device = UinputDevice('wtxrc virtual mouse', keys=(BTN_LEFT, BTN_RIGHT, BTN_MIDDLE),
+                                   rels=(REL_X, REL_Y, REL_WHEEL, REL_HWHEEL), fd=fd,
+                                   vendor=0x0000, product=0x0000)
+
+    def move(self, dx, dy):
+        if dx:
+            self.device.stage(self._ev_rel, self._rel_x, dx)
+        if dy:
+            self.device.stage(self._ev_rel, self._rel_y, dy)
+        self.device.flush()
+
+    def scroll(self, dx, dy):
+        if dy:
+            self.device.stage(self._ev_rel, self._rel_wheel, dy)
+        if dx:
+            self.device.stage(self._ev_rel, self._rel_hwheel, dx)
+        self.device.flush()
+
+    def button(self, name, pressed):
+        # 按下与抬起各自一个 SYN 帧，否则应用会把同一帧内的按下+抬起合并掉
+        self.device.stage(self._ev_key, self.buttons[name], 1 if pressed else 0)
+        self.device.flush()
+
+    def close(self):
+        self.device.close()
+
+
+def _create_mouse_backend(name):
+    if name == 'uinput':
+        return UinputMouse()
+    if name == 'pynput':
+        return PynputMouse()
+    if name == 'null':
+        return NullMouse()
+    raise ValueError(f"unknown mouse backend: {name}")
+
+
+def load_mouse_backend():
+    """Create the pointer backend selected by ``config.MOUSE_BACKEND`` (same rules as load_backend)."""
+    global _mouse_backend
+    if _mouse_backend is not None:
+        return _mouse_backend
+    with _backend_lock:
+        if _mouse_backend is not None:
+            return _mouse_backend
+        requested = getattr(config, 'MOUSE_BACKEND', 'auto') if HAS_CONFIG else 'auto'
+        if requested == 'auto':
+            candidates = ['uinput', 'pynput'] if sys.platform.startswith('linux') else ['pynput']
+        else:
+            candidates = [requested, 'pynput']
+        backend = None
+        for name in candidates:
+            try:
+                backend = _create_mouse_backend(name)
+                break
+            except Exception as e:
+                print(f"Warning: mouse backend '{name}' not available: {e}")
+        _mouse_backend = backend or NullMouse()
+    return _mouse_backend
+
+
+def parse_key(k):
+    """Parse a key string and return the corresponding pynput Key or character."""
+    k = k.lower().strip()
+    
+    # Check if it's a special key
+    if k in KEY_MAP:
+        return KEY_MAP[k]
+    
+    # If it's a single character, return it as-is
+    if len(k) == 1:
+        return k
+    
+    # Unknown key, return as-is
+    return k
+
+def execute_combination(keys):
+    """
+    依次按下按键、保持，然后按相反顺序释放。
+    或者一次性按下所有按键再全部释放。
+    """
+    backend = load_backend()
+    if backend.name != 'null':
+        print(f"Executing: {keys}")
+    backend.execute(keys, hold=0.1) # Short hold
+
+
+# ---- 宏 / 按键序列 ----
+#
+# 宏脚本每行（或用 ';' 分隔）一个步骤，按键用 '+' 连接，时间单位为毫秒：
+#
+#     tap down+right 16     按下后保持 16ms 再松开（省略 tap 也可以: "down+right 16"）
+#     press shift           按下（保持到 release 或宏结束）
+#     release shift         松开
+#     wait 50               等待
+#
+# 宏由 MacroEngine 的调度线程按单调时钟执行：距离截止时间较远时睡眠，
+# 最后 spin_threshold 秒内自旋等待，以获得亚毫秒级的时间精度。
+
+DEFAULT_MACRO_CONFIG = {
+    # 最后多少秒内改为自旋等待（0 为只睡眠）
+    'spin_threshold': 0.002,
+    # tap 未写时间时的保持时间（秒）
+    'default_hold': 0.03,
+    # 计算时间误差统计时保留的最近步骤数
+    'stats_window': 2000,
+}
+
+
+def parse_macro(script, default_hold=0.03):
+    """Compile a macro script into a timeline of ``(offset_seconds, pressed, keys)``.
+
+    Returns ``(timeline, duration)``; raises ValueError on a malformed step.
+    """
+    timeline = []
+    cursor = 0.0
+    steps = [s.strip() for line in script.splitlines() for s in line.split(';')]
+    for step in steps:
+        if not step or step.startswith('#'):
+            continue
+        parts = step.split()
+        op = parts[0].lower()
+        if op == 'wait':
+            if len(parts) != 2:
+                raise ValueError(f"wait 需要一个时间: {step}")
+            cursor += float(parts[1]) / 1000.0
+            continue
+        if op not in ('tap', 'press', 'release'):
+            op, parts = 'tap', ['tap'] + parts
+        if len(parts) < 2:
+            raise ValueError(f"缺少按键: {step}")
+        keys = tuple(k for k in parts[1].split('+') if k)
+        if op == 'press':
+            timeline.append((cursor, True, keys))
+        elif op == 'release':
+            timeline.append((cursor, False, keys))
+        else:
+            hold = float(parts[2]) / 1000.0 if len(parts) > 2 else default_hold
+            timeline.append((cursor, True, keys))
+            cursor += hold
+            timeline.append((cursor, False, keys))
+    # 稳定排序：同一时刻的步骤保持书写顺序
+    timeline.sort(key=lambda event: event[0])
+    return timeline, cursor
+
+
+class MacroRun:
+    """One running instance of a macro (one button press)."""
+
+    __slots__ = ('key', 'timeline', 'period', 'repeat', 'cancel_on_release', 'start',
+                 'iteration', 'index', 'pressed', 'held', 'generation', 'parked')
+
+    def __init__(self, key, timeline, period, repeat, cancel_on_release, start):
+        self.key = key
+        self.timeline = timeline
+        self.period = period
+        self.repeat = repeat
+        self.cancel_on_release = cancel_on_release
+        self.start = start
+        self.iteration = 0
+        self.index = 0
+        # 由本次运行按下且尚未松开的按键（取消时全部松开）
+        self.pressed = []
+        # 触发按钮是否仍按住
+        self.held = True
+        # 每次取消 / 重新调度加一，堆中过期的条目据此跳过
+        self.generation = 0
+        # 时间线已执行完，等待按钮松开
+        self.parked = False
+
+    def deadline(self):
+        return self.start + self.iteration * self.period + self.timeline[self.index][0]
+
+
+class MacroEngine:
+    """Run timed key sequences concurrently from one scheduler thread.
+
+    ``start(key, macro)`` on button_down, ``release(key)`` on button_up; ``key``
+    identifies the press, e.g. ``(sid, button_id)``. ``macro`` is a button's
+    ``macro`` dict: ``script`` (see :func:`parse_macro`), ``repeat`` (turbo:
+    restart every ``interval`` seconds while held) and ``cancel_on_release``.
+    Every backend call happens on the scheduler thread, in deadline order.
+
+    Args:
+        get_backend: returns a KeyboardBackend (see load_backend)
+        settings: overrides for :data:`DEFAULT_MACRO_CONFIG`
+        clock: monotonic clock in seconds
+    """
+
+    def __init__(self, get_backend, settings=None, clock=time.perf_counter):
+        cfg = dict(DEFAULT_MACRO_CONFIG)
+        cfg.update(settings or {})
+        self.get_backend = get_backend
+        self.clock = clock
+        self.spin_threshold = max(0.0, float(cfg['spin_threshold']))
+        self.default_hold = float(cfg['default_hold'])
+        self.running = False
+        self._thread = None
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = 0
+        self._runs = {}
+        # 已取消、松开按键尚未执行的宏（stop 等待其清空）
+        self._releasing = set()
+        self._compiled = {}
+        # 统计：每个步骤实际执行时间与计划时间之差（秒）
+        self._errors = collections.deque(maxlen=int(cfg['stats_window']))
+        self.steps = 0
+        self.max_error = 0.0
+
+    # ---- 控制 ----
+
+    def compile(self, script):
+        """Parse (and cache) a macro script; raises ValueError when malformed."""
+        compiled = self._compiled.get(script)
+        if compiled is None:
+            compiled = self._compiled[script] = parse_macro(script, self.default_hold)
+        return compiled
+
+    def start(self, key, macro):
+        """Start a macro for ``key``, restarting it if it is already running."""
+        timeline, duration = self.compile(macro.get('script', ''))
+        if not timeline:
+            return None
+        repeat = bool(macro.get('repeat', False))
+        period = max(duration, float(macro.get('interval', 0.1))) if repeat else duration
+        # 连发默认在松开时停止，单次宏默认执行完整个序列
+        cancel_on_release = bool(macro.get('cancel_on_release', repeat))
+        self._ensure_thread()
+        with self._cond:
+            previous = self._runs.get(key)
+            if previous is not None:
+                self._cancel(previous)
+            run = MacroRun(key, timeline, period, repeat, cancel_on_release, self.clock())
+            self._runs[key] = run
+            self._schedule(run, run.deadline())
+        return run
+
+    def release(self, key):
+        """The trigger button was released: stop turbo, cancel or let the sequence finish."""
+        with self._cond:
+            run = self._runs.get(key)
+            if run is None:
+                return
+            run.held = False
+            if run.cancel_on_release or run.parked:
+                self._cancel(run)
+
+    def cancel(self, key):
+        with self._cond:
+            run = self._runs.get(key)
+            if run is not None:
+                self._cancel(run)
+
+    def cancel_owner(self, owner):
+        """Cancel every macro whose key is ``(owner, ...)`` (disconnect, stall)."""
+        with self._cond:
+            for key, run in list(self._runs.items()):
+                if isinstance(key, tuple) and key and key[0] == owner:
+                    self._cancel(run)
+
+    def stop(self):
+        with self._cond:
+            for run in list(self._runs.values()):
+                self._cancel(run)
+            # 让调度线程先松开被取消的宏按下的按键（堆中其余的过期条目不必等待）
+            if self._thread is not None and self._thread.is_alive():
+                self._cond.wait_for(lambda: not self._releasing, timeout=0.5)
+            self.running = False
+            self._cond.notify_all()
+
+    def _cancel(self, run):
+        # 调用者持有锁；松开按键由调度线程立即执行
+        run.generation += 1
+        run.parked = False
+        run.index = len(run.timeline)
+        self._releasing.add(run)
+        self._schedule(run, self.clock())
+
+    def _schedule(self, run, deadline):
+        self._seq += 1
+        heapq.heappush(self._heap, (deadline, self._seq, run, run.generation))
+        # stop() 也可能在等待这个条件变量，notify() 可能只唤醒它而漏掉调度线程
+        self._cond.notify_all()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self.running = True
+            self._thread = threading.Thread(target=self._loop, name='macro-scheduler', daemon=True)
+            self._thread.start()
+
+    # ---- 调度线程 ----
+
+    def _loop(self):
+        clock = self.clock
+        while True:
+            with self._cond:
+                while self.running and not self._heap:
+                    self._cond.wait()
+                if not self.running:
+                    return
+                deadline = self._heap[0][0]
+                remaining = deadline - clock()
+                if remaining > self.spin_threshold:
+                    # 睡到截止前 spin_threshold；新的更早的宏会唤醒并重新判断
+                    self._cond.wait(remaining - self.spin_threshold)
+                    continue
+            # 最后一段自旋（不持有锁；sleep(0) 让出 GIL，不阻塞 socket 处理线程）
+            while clock() < deadline:
+                time.sleep(0)
+            with self._cond:
+                now = clock()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+            for entry in due:
+                try:
+                    self._dispatch(entry)
+                except Exception as e:
+                    print(f"[MACRO] 执行失败: {e}")
+
+    def _dispatch(self, entry):
+        deadline, _, run, generation = entry
+        with self._cond:
+            if generation != run.generation:
+                return
+            if run.index >= len(run.timeline):
+                # 取消或结束：松开仍按住的按键
+                keys = run.pressed
+                run.pressed = []
+                if self._runs.get(run.key) is run:
+                    del self._runs[run.key]
+                action = (False, keys, False, run)
+            else:
+                _, pressed, keys = run.timeline[run.index]
+                if pressed:
+                    run.pressed.extend(k for k in keys if k not in run.pressed)
+                else:
+                    run.pressed = [k for k in run.pressed if k not in keys]
+                run.index += 1
+                if run.index >= len(run.timeline):
+                    if run.repeat and run.held:
+                        run.iteration += 1
+                        run.index = 0
+                        self._schedule(run, run.deadline())
+                    elif run.held and run.pressed:
+                        # 序列执行完但按钮仍按住：press 后未 release 的按键保持到松开
+                        run.parked = True
+                    else:
+                        self._schedule(run, self.clock())
+                else:
+                    self._schedule(run, run.deadline())
+                action = (pressed, list(keys), True, None)
+        pressed, keys, timed, finished = action
+        if timed:
+            error = self.clock() - deadline
+            self._errors.append(error)
+            self.steps += 1
+            if error > self.max_error:
+                self.max_error = error
+        try:
+            if keys:
+                backend = self.get_backend()
+                if pressed:
+                    backend.press(keys)
+                else:
+                    backend.release(list(reversed(keys)))
+        finally:
+            if finished is not None:
+                with self._cond:
+                    if finished in self._releasing:
+                        self._releasing.discard(finished)
+                        self._cond.notify_all()
+
+    def backlog(self):
+        """Number of scheduled macro steps not yet executed."""
+        return len(self._heap)
+
+    def get_stats(self):
+        """Per-step timing error (actual - scheduled) over the recent window, in microseconds."""
+        errors = sorted(self._errors)
+        stats = {'running': len(self._runs), 'steps': self.steps,
+                 'max_error_us': round(self.max_error * 1e6, 1)}
+        if errors:
+            stats['mean_error_us'] = round(sum(errors) / len(errors) * 1e6, 1)
+            stats['p50_error_us'] = round(errors[len(errors) // 2] * 1e6, 1)
+            stats['p99_error_us'] = round(errors[min(len(errors) - 1, int(len(errors) * 0.99))] * 1e6, 1)
+        return stats
+
+
+if __name__ == '__main__':
+    # 自检：并发运行多个连发宏与格斗游戏搓招序列，报告每一步的时间误差
+    class _Recorder(KeyboardBackend):
+        name = 'recorder'
+
+        def __init__(self):
+            self.events = []
+            self.lock = threading.Lock()
+
+        def press(self, keys):
+            with self.lock:
+                self.events.append(('press', tuple(keys)))
+
+        def release(self, keys):
+            with self.lock:
+                self.events.append(('release', tuple(keys)))
+
+    recorder = _Recorder()
+    engine = MacroEngine(lambda: recorder)
+    hadouken = 'tap down 16; tap down+right 16; tap right+j 33'
+    for i in range(8):
+        engine.start(('bench', f'turbo{i}'), {'script': f'tap {chr(97 + i)} 5', 'repeat': True, 'interval': 0.011})
+    for i in range(20):
+        engine.start(('bench', f'combo{i}'), {'script': hadouken})
+        time.sleep(0.05)
+    for i in range(8):
+        engine.release(('bench', f'turbo{i}'))
+    time.sleep(0.1)
+    held = set()
+    for op, keys in recorder.events:
+        if op == 'press':
+            held.update(keys)
+        else:
+            held.difference_update(keys)
+    print(f"[MACRO] {engine.get_stats()}")
+    print(f"[MACRO] 结束后仍按住的按键: {sorted(held) or '无'}")
+    engine.stop()
@@ -0,0 +1,703 @@
+"""
+输入录制与确定性回放。
+
+录制：:class:`InputRecorder` 把收到的 ``gyro_data``、``motion_data``、
+``gyro_batch``、``slider_value``、``stick_value``、``gamepad_delta``、``touchpad_delta``、
+``touchpad_tap``、``button_down``、``button_up`` 事件（以及影响输出的 ``set_main_device``、
+``switch_profile``、``set_gyro_mouse``、``set_player_profile``、``latency_report``、
+``client_hidden`` 和断开连接）连同接收时间追加到二进制日志中。日志由
+定长记录组成（:data:`RECORD`，48 字节），字符串（按钮 id、标签、档案名）
+第一次出现时写入一条字符串记录，之后按编号引用；变长数据（``gyro_batch`` 的
+样本行、``set_player_profile`` 的轴配置 JSON）写成紧接在事件记录之前的续记录。
+
+读取：:class:`RecordingReader` 用 mmap 映射日志文件，按下标直接解包记录，
+不需要把文件读入内存。
+
+回放：:func:`replay` 通过 Flask-SocketIO 的测试客户端把事件送回 app.py 中
+的事件处理函数（每个录制的连接对应一个测试客户端），可以按原速、加速或
+尽可能快地回放。虚拟手柄换成 :class:`RecordingJoystick`，它记录每一帧写入
+设备的量化值（``real=True`` 时同时写入真实设备），``set_player_profile``
+只替换内存中的档案、不写配置文件，按键注入换成
+:class:`RecordingKeyboard`，鼠标换成 :class:`RecordingMouse`（每个事件之后
+执行一次鼠标输出周期，触控板与陀螺仪瞄准的输出也按事件对齐）。输出流按事件序号对齐，保存为 JSON Lines，
+用 :func:`diff_outputs` 比较两次构建的结果::
+
+    python server/input_recorder.py info recordings/session.rec
+    python server/input_recorder.py replay recordings/session.rec --speed 0 --out a.jsonl
+    python server/input_recorder.py diff a.jsonl b.jsonl
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from joystick_manager import VirtualJoystick
+import input_manager
+
+MAGIC = b'WTXRCREC'
+FORMAT_VERSION = 1
+
+# 接收时间（秒）、类型、保留、连接编号、字符串引用 ×2、4 个数值
+RECORD = struct.Struct('<dBxHHH4d')
+# 头部与字符串记录：数值部分换成 32 字节的 UTF-8 文本
+STRING_RECORD = struct.Struct('<dBxHHH32s')
+assert RECORD.size == STRING_RECORD.size == 48
+
+KIND_HEADER = 0
+KIND_STRING = 1
+KIND_MAIN = 2
+KIND_DISCONNECT = 3
+KIND_GYRO = 4
+KIND_SLIDER = 5
+KIND_BUTTON_DOWN = 6
+KIND_BUTTON_UP = 7
+KIND_PROFILE = 8
+KIND_MOTION = 9
+# motion_data 附带的参考姿态，紧接在同一连接的 KIND_MOTION 记录之前
+KIND_MOTION_REF = 10
+KIND_STICK = 11
+KIND_TOUCHPAD_DELTA = 12
+KIND_TOUCHPAD_TAP = 13
+# gamepad_delta：v0 为 reset；轴 / 按键的 [下标, 值] 对放在紧接其前的续记录中，每条两对
+KIND_GAMEPAD = 14
+KIND_GAMEPAD_AXES = 15
+KIND_GAMEPAD_BUTTONS = 16
+# latency_report：v0 为往返延迟（毫秒）
+KIND_LATENCY = 17
+KIND_HIDDEN = 18
+KIND_GYRO_MOUSE = 19
+# set_player_profile：轴配置的 JSON 按 32 字节分段写入之前的 KIND_BLOB 记录（字符串记录格式）
+KIND_PLAYER_PROFILE = 20
+KIND_BLOB = 21
+# gyro_batch：每个样本行一条 KIND_GYRO_BATCH_ROW（ref 为该行的长度），之后是 KIND_GYRO_BATCH
+KIND_GYRO_BATCH = 22
+KIND_GYRO_BATCH_ROW = 23
+
+EVENT_KINDS = {
+    'set_main_device': KIND_MAIN,
+    'disconnect': KIND_DISCONNECT,
+    'gyro_data': KIND_GYRO,
+    'gyro_batch': KIND_GYRO_BATCH,
+    'motion_data': KIND_MOTION,
+    'slider_value': KIND_SLIDER,
+    'stick_value': KIND_STICK,
+    'gamepad_delta': KIND_GAMEPAD,
+    'touchpad_delta': KIND_TOUCHPAD_DELTA,
+    'touchpad_tap': KIND_TOUCHPAD_TAP,
+    'button_down': KIND_BUTTON_DOWN,
+    'button_up': KIND_BUTTON_UP,
+    'switch_profile': KIND_PROFILE,
+    'latency_report': KIND_LATENCY,
+    'client_hidden': KIND_HIDDEN,
+    'set_gyro_mouse': KIND_GYRO_MOUSE,
+    'set_player_profile': KIND_PLAYER_PROFILE,
+}
+KIND_EVENTS = {kind: event for event, kind in EVENT_KINDS.items()}
+
+_NAN = float('nan')
+
+ReplayEvent = namedtuple('ReplayEvent', 'index t session event data')
+
+
+def _num(value):
+    """Float for a numeric payload field, NaN when missing (restored as a missing key)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return _NAN
+
+
+class InputRecorder:
+    """Append incoming input events to a fixed-record binary log.
+
+    ``record()`` is called from the socket handlers; it is a no-op while no
+    recording is active, otherwise a lock, one struct pack and a buffered write.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.active = False
+        self.records = 0
+        self.events = 0
+        self._file = None
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._strings = {}
+
+    def start(self, path, main_sids=(), profile=None, latencies=None, gyro_mouse=()):
+        """Start a new log at ``path``; already connected main devices are recorded first.
+
+        ``latencies`` ({sid: rtt in ms}) and ``gyro_mouse`` (sids aiming with the gyro)
+        restore the prediction horizon and gyro mode of connections that existed before.
+        """
+        with self._lock:
+            if self.active:
+                raise RuntimeError(f"已经在录制: {self.path}")
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, 'wb', buffering=1 << 16)
+            self._sessions = {}
+            self._strings = {}
+            self.records = 0
+            self.events = 0
+            self.path = path
+            self._file.write(STRING_RECORD.pack(time.time(), KIND_HEADER, 0, FORMAT_VERSION, 0, MAGIC))
+            self.records += 1
+            now = time.monotonic()
+            # 回放从这里开始：先恢复当前档案和已有的主设备
+            if profile is not None:
+                self._write(now, KIND_PROFILE, 0, self._intern(profile, now), 0)
+            for sid in main_sids:
+                self._write(now, KIND_MAIN, self._session(sid), 0, 0, 1.0)
+            for sid in gyro_mouse:
+                self._write(now, KIND_GYRO_MOUSE, self._session(sid), 0, 0, 1.0)
+            for sid, rtt in (latencies or {}).items():
+                self._write(now, KIND_LATENCY, self._session(sid), 0, 0, _num(rtt))
+            self.active = True
+        print(f"[RECORD] 开始录制: {path}")
+
+    def stop(self):
+        """Close the log; returns its stats."""
+        with self._lock:
+            if not self.active:
+                return None
+            self.active = False
+            self._file.close()
+            self._file = None
+        stats = self.get_stats()
+        print(f"[RECORD] 录制结束: {self.path} ({self.events} 个事件)")
+        return stats
+
+    def record(self, event, sid, data=None):
+        """Record one event received from ``sid`` (hot path)."""
+        if not self.active:
+            return
+        kind = EVENT_KINDS.get(event)
+        if kind is None:
+            return
+        data = data or {}
+        now = time.monotonic()
+        with self._lock:
+            if not self.active:
+                return
+            session = self._session(sid)
+            if kind == KIND_GYRO:
+                self._write(now, kind, session, 0, 0, _num(data.get('alpha')), _num(data.get('beta')),
+                            _num(data.get('gamma')), _num(data.get('t')))
+            elif kind == KIND_MOTION:
+                if 'alpha' in data:
+                    self._write(now, KIND_MOTION_REF, session, 0, 0, _num(data.get('alpha')), _num(data.get('beta')),
+                                _num(data.get('gamma')))
+                self._write(now, kind, session, 0, 0, _num(data.get('rate_alpha')), _num(data.get('rate_beta')),
+                            _num(data.get('rate_gamma')), _num(data.get('t')))
+            elif kind == KIND_SLIDER:
+                self._write(now, kind, session, self._intern(data.get('id'), now), 0, _num(data.get('value')))
+            elif kind == KIND_STICK:
+                self._write(now, kind, session, self._intern(data.get('id'), now), 0,
+                            _num(data.get('x')), _num(data.get('y')))
+            elif kind == KIND_GAMEPAD:
+                self._write_pairs(now, KIND_GAMEPAD_AXES, session, data.get('a'))
+                self._write_pairs(now, KIND_GAMEPAD_BUTTONS, session, data.get('b'))
+                self._write(now, kind, session, 0, 0, 1.0 if data.get('reset') else 0.0)
+            elif kind == KIND_GYRO_BATCH:
+                rows = data.get('samples')
+                rows = rows if isinstance(rows, (list, tuple)) else ()
+                for row in rows:
+                    row = list(row) if isinstance(row, (list, tuple)) else []
+                    values = [_num(v) for v in row[:4]] + [_NAN] * (4 - min(4, len(row)))
+                    self._write(now, KIND_GYRO_BATCH_ROW, session, min(len(row), 4), 0, *values)
+                self._write(now, kind, session, 0, 0, float(len(rows)))
+            elif kind == KIND_LATENCY:
+                self._write(now, kind, session, 0, 0, _num(data.get('rtt')))
+            elif kind == KIND_GYRO_MOUSE:
+                self._write(now, kind, session, 0, 0, 1.0 if data.get('enabled') else 0.0)
+            elif kind == KIND_PLAYER_PROFILE:
+                blob = json.dumps(data.get('axis_config') or None, ensure_ascii=False).encode('utf-8')
+                size = STRING_RECORD.size - 16
+                for i in range(0, len(blob), size):
+                    self._file.write(STRING_RECORD.pack(now, KIND_BLOB, session, 0, 0, blob[i:i + size]))
+                    self.records += 1
+                self._write(now, kind, session, 0, 0, float(len(blob)))
+            elif kind == KIND_TOUCHPAD_DELTA:
+                self._write(now, kind, session, self._intern(data.get('id'), now), 0, _num(data.get('dx')),
+                            _num(data.get('dy')), _num(data.get('sx')), _num(data.get('sy')))
+            elif kind == KIND_TOUCHPAD_TAP:
+                self._write(now, kind, session, self._intern(data.get('id'), now),
+                            self._intern(data.get('button'), now))
+            elif kind == KIND_BUTTON_DOWN:
+                self._write(now, kind, session, self._intern(data.get('id'), now),
+                            self._intern(data.get('label'), now))
+            elif kind == KIND_BUTTON_UP:
+                self._write(now, kind, session, self._intern(data.get('id'), now), 0)
+            elif kind == KIND_MAIN:
+                self._write(now, kind, session, 0, 0, 1.0 if data.get('is_main') else 0.0)
+            elif kind == KIND_PROFILE:
+                self._write(now, kind, session, self._intern(data.get('name'), now), 0)
+            else:
+                self._write(now, kind, session, 0, 0)
+            self.events += 1
+
+    def get_stats(self):
+        return {'active': self.active, 'path': self.path, 'events': self.events,
+                'bytes': self.records * RECORD.size, 'sessions': len(self._sessions)}
+
+    # ---- 内部（调用者持有锁）----
+
+    def _write(self, t, kind, session, ref, ref2, v0=0.0, v1=0.0, v2=0.0, v3=0.0):
+        self._file.write(RECORD.pack(t, kind, session, ref, ref2, v0, v1, v2, v3))
+        self.records += 1
+
+    def _write_pairs(self, t, kind, session, values):
+        """Flat [index, value, ...] list as continuation records of two pairs each."""
+        values = list(values or ())
+        for i in range(0, len(values) - 1, 4):
+            chunk = [_num(v) for v in values[i:i + 4]]
+            chunk += [_NAN] * (4 - len(chunk))
+            self._write(t, kind, session, 0, 0, *chunk)
+
+    def _session(self, sid):
+        index = self._sessions.get(sid)
+        if index is None:
+            index = self._sessions[sid] = len(self._sessions)
+        return index
+
+    def _intern(self, text, t):
+        """String -> table index (0 means None); new strings get a string record first."""
+        if text is None:
+            return 0
+        text = str(text)
+        index = self._strings.get(text)
+        if index is None:
+            index = self._strings[text] = len(self._strings) + 1
+            encoded = text.encode('utf-8')
+            if len(encoded) > STRING_RECORD.size - 16:
+                # 截断到 32 字节以内的完整字符
+                encoded = encoded[:STRING_RECORD.size - 16].decode('utf-8', 'ignore').encode('utf-8')
+            self._file.write(STRING_RECORD.pack(t, KIND_STRING, 0, index, 0, encoded))
+            self.records += 1
+        return index
+
+
+class RecordingReader:
+    """Memory-mapped reader for a recording; records are unpacked on access."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < RECORD.size or size % RECORD.size:
+            self._file.close()
+            raise ValueError(f"不是有效的录制文件（大小 {size} 不是 {RECORD.size} 的整数倍）: {path}")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        wall_time, kind, _, version, _, magic = STRING_RECORD.unpack_from(self._map, 0)
+        if kind != KIND_HEADER or magic.rstrip(b'\0') != MAGIC:
+            self.close()
+            raise ValueError(f"不是 wtxrc 录制文件: {path}")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"不支持的录制格式版本 {version}: {path}")
+        self.started = wall_time
+
+    def __len__(self):
+        return len(self._map) // RECORD.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, i):
+        """Raw record tuple at index ``i``: (t, kind, session, ref, ref2, v0, v1, v2, v3)."""
+        return RECORD.unpack_from(self._map, i * RECORD.size)
+
+    def __iter__(self):
+        """Yield :class:`ReplayEvent` in recording order (string records are resolved)."""
+        strings = {0: None}
+        references = {}
+        # 连接 -> ([轴对], [按键对])，由后面的 KIND_GAMEPAD 记录取走
+        gamepad_pairs = {}
+        # 连接 -> 样本行 / JSON 分段，由后面的 KIND_GYRO_BATCH / KIND_PLAYER_PROFILE 取走
+        batch_rows = {}
+        blobs = {}
+        index = 0
+        for offset in range(RECORD.size, len(self._map), RECORD.size):
+            t, kind, session, ref, ref2, v0, v1, v2, v3 = RECORD.unpack_from(self._map, offset)
+            if kind == KIND_STRING:
+                text = STRING_RECORD.unpack_from(self._map, offset)[5]
+                strings[ref] = text.rstrip(b'\0').decode('utf-8')
+                continue
+            if kind == KIND_MOTION_REF:
+                references[session] = (v0, v1, v2)
+                continue
+            if kind == KIND_GYRO_BATCH_ROW:
+                batch_rows.setdefault(session, []).append([v0, v1, v2, v3][:ref])
+                continue
+            if kind == KIND_BLOB:
+                blobs.setdefault(session, []).append(STRING_RECORD.unpack_from(self._map, offset)[5])
+                continue
+            if kind == KIND_GAMEPAD_AXES or kind == KIND_GAMEPAD_BUTTONS:
+                pairs = gamepad_pairs.setdefault(session, ([], []))[kind == KIND_GAMEPAD_BUTTONS]
+                for i, value in ((v0, v1), (v2, v3)):
+                    if not math.isnan(i):
+                        pairs.extend((int(i), 0.0 if math.isnan(value) else value))
+                continue
+            event = KIND_EVENTS.get(kind)
+            if event is None:
+                continue
+            if kind == KIND_GYRO:
+                data = {name: value for name, value in (('alpha', v0), ('beta', v1), ('gamma', v2), ('t', v3))
+                        if not math.isnan(value)}
+            elif kind == KIND_MOTION:
+                data = {name: value for name, value in (('rate_alpha', v0), ('rate_beta', v1), ('rate_gamma', v2),
+                                                        ('t', v3)) if not math.isnan(value)}
+                reference = references.pop(session, None)
+                if reference is not None:
+                    data.update(zip(('alpha', 'beta', 'gamma'), reference))
+            elif kind == KIND_SLIDER:
+                data = {'id': strings.get(ref), 'value': 0.0 if math.isnan(v0) else v0}
+            elif kind == KIND_STICK:
+                data = {'id': strings.get(ref), 'x': 0.0 if math.isnan(v0) else v0, 'y': 0.0 if math.isnan(v1) else v1}
+            elif kind == KIND_GAMEPAD:
+                axes, buttons = gamepad_pairs.pop(session, ([], []))
+                data = {'a': axes, 'b': buttons}
+                if v0 != 0.0:
+                    data['reset'] = True
+            elif kind == KIND_GYRO_BATCH:
+                data = {'samples': batch_rows.pop(session, [])}
+            elif kind == KIND_LATENCY:
+                data = {'rtt': 0.0 if math.isnan(v0) else v0}
+            elif kind == KIND_HIDDEN:
+                data = None
+            elif kind == KIND_GYRO_MOUSE:
+                data = {'enabled': v0 != 0.0}
+            elif kind == KIND_PLAYER_PROFILE:
+                # 分段以 \0 填充到 32 字节，按记录的总长度截取
+                blob = b''.join(blobs.pop(session, []))[:int(v0)]
+                data = {'axis_config': json.loads(blob.decode('utf-8')) if blob else None}
+            elif kind == KIND_TOUCHPAD_DELTA:
+                data = {name: value for name, value in (('dx', v0), ('dy', v1), ('sx', v2), ('sy', v3))
+                        if not math.isnan(value)}
+                data['id'] = strings.get(ref)
+            elif kind == KIND_TOUCHPAD_TAP:
+                data = {'id': strings.get(ref), 'button': strings.get(ref2)}
+            elif kind == KIND_BUTTON_DOWN:
+                data = {'id': strings.get(ref), 'label': strings.get(ref2)}
+            elif kind == KIND_BUTTON_UP:
+                data = {'id': strings.get(ref)}
+            elif kind == KIND_MAIN:
+                data = {'is_main': v0 != 0.0}
+            elif kind == KIND_PROFILE:
+                data = {'name': strings.get(ref)}
+            else:
+                data = None
+            yield ReplayEvent(index, t, session, event, data)
+            index += 1
+
+    def info(self):
+        counts = {}
+        sessions = set()
+        first = last = None
+        for event in self:
+            counts[event.event] = counts.get(event.event, 0) + 1
+            sessions.add(event.session)
+            first = event.t if first is None else first
+            last = event.t
+        return {
+            'path': self.path,
+            'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'records': len(self),
+            'bytes': len(self._map),
+            'sessions': len(sessions),
+            'duration': round(last - first, 3) if first is not None else 0.0,
+            'events': counts,
+        }
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+# ---- 回放 ----
+
+class RecordingJoystick(VirtualJoystick):
+    """VirtualJoystick that logs every flushed frame as quantized device values.
+
+    With ``real=False`` no device is created (backend 'record'); with
+    ``real=True`` the normal backend is initialized and still receives every frame.
+
+    Args:
+        output: list that receives ``{'i', 'dev', 'axes', 'buttons'}`` dicts
+        clock: returns the index of the event being replayed
+    """
+
+    def __init__(self, output, clock, name='replay', real=False):
+        self.output = output
+        self.clock = clock
+        self.real = real
+        super().__init__(name=name, monitor=False)
+
+    def _init_gamepad(self):
+        if self.real:
+            super()._init_gamepad()
+            return
+        self.backend = 'record'
+        self.initialized = True
+
+    def quantize(self, axis_name, value):
+        if self.backend != 'record':
+            return super().quantize(axis_name, value)
+        if 'trigger' in axis_name:
+            return int(round(value * 255))
+        return int(round(value * 32767))
+
+    def _flush(self):
+        if self._pending_axes or self._pending_buttons:
+            self.output.append({
+                'i': self.clock(),
+                'dev': self.name,
+                'axes': {axis: self.quantize(axis, value) for axis, value in sorted(self._pending_axes.items())},
+                'buttons': dict(sorted(self._pending_buttons.items())),
+            })
+        super()._flush()
+
+    def reset(self):
+        if self.initialized:
+            self.output.append({'i': self.clock(), 'dev': self.name, 'reset': True})
+        super().reset()
+
+
+class RecordingKeyboard(input_manager.KeyboardBackend):
+    """Keyboard backend that logs key output; forwards to ``forward`` when given."""
+
+    name = 'record'
+
+    def __init__(self, output, clock, forward=None):
+        self.output = output
+        self.clock = clock
+        self.forward = forward
+
+    def _log(self, op, keys):
+        self.output.append({'i': self.clock(), 'dev': 'keyboard', op: list(keys)})
+
+    def press(self, keys):
+        self._log('press', keys)
+        if self.forward is not None:
+            self.forward.press(keys)
+
+    def release(self, keys):
+        self._log('release', keys)
+        if self.forward is not None:
+            self.forward.release(keys)
+
+    def execute(self, keys, hold=0.1):
+        # 回放时不保持按键（不阻塞回放），真实设备仍按原来的保持时间
+        self._log('execute', keys)
+        if self.forward is not None:
+            self.forward.execute(keys, hold)
+
+
+class RecordingMouse(input_manager.MouseBackend):
+    """Mouse backend that logs pointer output; forwards to ``forward`` when given."""
+
+    name = 'record'
+
+    def __init__(self, output, clock, forward=None):
+        self.output = output
+        self.clock = clock
+        self.forward = forward
+
+    def move(self, dx, dy):
+        self.output.append({'i': self.clock(), 'dev': 'mouse', 'move': [dx, dy]})
+        if self.forward is not None:
+            self.forward.move(dx, dy)
+
+    def scroll(self, dx, dy):
+        self.output.append({'i': self.clock(), 'dev': 'mouse', 'scroll': [dx, dy]})
+        if self.forward is not None:
+            self.forward.scroll(dx, dy)
+
+    def button(self, name, pressed):
+        self.output.append({'i': self.clock(), 'dev': 'mouse', 'button': [name, pressed]})
+        if self.forward is not None:
+            self.forward.button(name, pressed)
+
+
+def replay(path, speed=0.0, real=False, quiet=True):
+    """Feed a recording through the app.py socket handlers and return the device output stream.
+
+    Args:
+        path: recording file
+        speed: 1.0 replays in real time, >1 accelerated, 0 as fast as possible
+        real: also drive the real virtual gamepad / keyboard backends
+        quiet: silence config.DEBUG logging while replaying
+    """
+    import app
+
+    output = []
+    current = [-1]
+    clock = lambda: current[0]
+    debug = app.config.DEBUG
+    saved = (app.virtual_joystick, app.gamepad_pool.factory, input_manager._keyboard_backend,
+             input_manager._mouse_backend, app.load_config, app.save_config)
+    replaced = set()
+
+    # set_player_profile 等保存配置的事件只替换内存中的档案，回放结束后从文件恢复
+    def load_config():
+        return json.loads(json.dumps(app.profiles.active.data))
+
+    def save_config(data):
+        name = app.profiles.active.name
+        replaced.add(name)
+        app._profile_replaced(*app.profiles.replace(name, data))
+
+    def make_joystick(slot):
+        return RecordingJoystick(output, clock, name=f"player{slot + 1}", real=real)
+
+    forward = input_manager.load_backend() if real else None
+    input_manager._keyboard_backend = RecordingKeyboard(output, clock, forward)
+    forward_mouse = input_manager.load_mouse_backend() if real else None
+    input_manager._mouse_backend = RecordingMouse(output, clock, forward_mouse)
+    app.pointer_output.reset()
+    app.load_config, app.save_config = load_config, save_config
+    app.virtual_joystick = make_joystick(0)
+    app.gamepad_pool.set_joystick(0, app.virtual_joystick)
+    app.gamepad_pool.factory = make_joystick
+    if quiet:
+        app.config.DEBUG = False
+
+    clients = {}
+    reader = RecordingReader(path)
+    start = time.perf_counter()
+    first_t = None
+    events = 0
+    try:
+        for event in reader:
+            if first_t is None:
+                first_t = event.t
+            if speed > 0:
+                delay = start + (event.t - first_t) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            current[0] = event.index
+            events += 1
+            client = clients.get(event.session)
+            if event.event == 'disconnect':
+                if client is not None:
+                    client.disconnect()
+                    del clients[event.session]
+                continue
+            if client is None:
+                client = clients[event.session] = app.socketio.test_client(app.app)
+            if event.data is None:
+                client.emit(event.event)
+            else:
+                client.emit(event.event, event.data)
+            # 鼠标输出循环不在回放中运行：每个事件之后输出一次累积的位移和点击
+            app.pointer_output.tick()
+        # 等待宏等异步输出完成
+        app.macro_engine.stop()
+        current[0] = -1
+    finally:
+        for client in clients.values():
+            client.disconnect()
+        reader.close()
+        app.config.DEBUG = debug
+        (app.virtual_joystick, app.gamepad_pool.factory, input_manager._keyboard_backend,
+         input_manager._mouse_backend, app.load_config, app.save_config) = saved
+        for name in replaced:
+            app._profile_replaced(*app.profiles.reload(name))
+        app.gamepad_pool.set_joystick(0, app.virtual_joystick)
+    elapsed = time.perf_counter() - start
+    print(f"[REPLAY] {path}: {events} 个事件 -> {len(output)} 帧输出, 用时 {elapsed:.3f} s", file=sys.stderr)
+    return output
+
+
+def save_outputs(output, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for frame in output:
+            f.write(json.dumps(frame, ensure_ascii=False, sort_keys=True) + '\n')
+
+
+def load_outputs(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def diff_outputs(a, b, limit=20):
+    """Compare two output streams event by event; returns a list of human-readable differences.
+
+    Frames are grouped by the index of the event that produced them, so one
+    extra or missing frame does not shift every later comparison.
+    """
+    def by_event(stream):
+        grouped = {}
+        for frame in stream:
+            grouped.setdefault(frame.get('i'), []).append({k: v for k, v in frame.items() if k != 'i'})
+        return grouped
+
+    left = by_event(a)
+    right = by_event(b)
+    differences = []
+    for index in sorted(set(left) | set(right)):
+        if left.get(index) != right.get(index):
+            differences.append(f"事件 #{index}: {json.dumps(left.get(index), ensure_ascii=False)} != "
+                               f"{json.dumps(right.get(index), ensure_ascii=False)}")
+            if len(differences) >= limit:
+                break
+    return differences
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='wtxrc 输入录制回放工具')
+    commands = parser.add_subparsers(dest='command', required=True)
+    info_cmd = commands.add_parser('info', help='显示录制文件概况')
+    info_cmd.add_argument('recording')
+    replay_cmd = commands.add_parser('replay', help='回放录制并输出设备输出流')
+    replay_cmd.add_argument('recording')
+    replay_cmd.add_argument('--speed', type=float, default=0.0, help='1 为原速，>1 加速，0 为尽可能快（默认）')
+    replay_cmd.add_argument('--real', action='store_true', help='同时写入真实的虚拟手柄和键盘')
+    replay_cmd.add_argument('--out', help='保存输出流（JSON Lines），默认打印到标准输出')
+    replay_cmd.add_argument('--against', help='与之前保存的输出流比较，不同则返回 1')
+    diff_cmd = commands.add_parser('diff', help='比较两次回放的输出流')
+    diff_cmd.add_argument('a')
+    diff_cmd.add_argument('b')
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        with RecordingReader(args.recording) as reader:
+            print(json.dumps(reader.info(), ensure_ascii=False, indent=2))
+        return 0
+    if args.command == 'replay':
+        output = replay(args.recording, speed=args.speed, real=args.real)
+        if args.out:
+            save_outputs(output, args.out)
+        elif not args.against:
+            for frame in output:
+                print(json.dumps(frame, ensure_ascii=False, sort_keys=True))
+        if args.against:
+            return _report(diff_outputs(load_outputs(args.against), output), args.against, 'replay')
+        return 0
+    return _report(diff_outputs(load_outputs(args.a), load_outputs(args.b)), args.a, args.b)
+
+
+def _report(differences, a, b):
+    if not differences:
+        print(f"[REPLAY] 输出一致: {a} == {b}")
+        return 0
+    print(f"[REPLAY] 输出不同: {a} != {b}")
+    for line in differences:
+        print(f"  {line}")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
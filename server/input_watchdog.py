@@ -0,0 +1,152 @@
+"""
+输入看门狗：输入源停止更新或断开时，把它驱动的轴归中。
+
+每个输入源（例如某台主设备的陀螺仪、某个拖动条）在每次输入时调用
+``touch()``，只记录时间戳，开销很小。后台循环按固定间隔检查：
+持续输出的源（陀螺仪）超过 ``timeout`` 秒没有更新即视为停滞；
+任何源在连接断开时通过 ``drop()`` 立即停滞。停滞后它驱动的轴
+按 ``recenter`` 设置直接归零（snap）或在 ``ramp_time`` 内线性回零（ramp），
+并调用 ``on_stall`` 回调（app.py 用它释放按住的按钮并通知客户端）。
+
+多个虚拟手柄时，``touch(..., device=joystick)`` 记录源所驱动的手柄；
+未指定时使用 ``get_joystick()`` 返回的默认手柄。
+"""
+
+import time
+
+
+class InputWatchdog:
+    """Track the last input time per source and recenter stalled axes."""
+
+    def __init__(self, get_joystick, timeout=0.5, recenter='ramp', ramp_time=0.2,
+                 interval=0.05, on_stall=None):
+        self.get_joystick = get_joystick
+        self.timeout = timeout
+        self.recenter = recenter
+        self.ramp_time = ramp_time
+        self.interval = interval
+        self.on_stall = on_stall
+        self.running = False
+        # source -> 最近一次输入时间（monotonic）
+        self._last = {}
+        # source -> 该源驱动的轴
+        self._axes = {}
+        # source -> 拥有该源的连接 sid
+        self._owner = {}
+        # source -> 该源驱动的虚拟手柄（未记录时使用 get_joystick()）
+        self._devices = {}
+        # 只在断开时停滞的源（例如拖动条：按住不动时不会持续发送）
+        self._event_sources = set()
+        self._stalled = set()
+        # (joystick, axis) -> (起始值, 起始时间)
+        self._ramps = {}
+        self.stall_count = 0
+
+    def touch(self, source, axes=(), owner=None, streaming=True, device=None):
+        """Record input from a source (hot path: a few dict writes)."""
+        self._last[source] = time.monotonic()
+        if device is not None:
+            self._devices[source] = device
+        if axes:
+            self._axes[source] = axes
+            if self._ramps:
+                joystick = self._device(source)
+                for axis in axes:
+                    self._ramps.pop((joystick, axis), None)
+        if owner is not None:
+            self._owner[source] = owner
+        if not streaming:
+            self._event_sources.add(source)
+        if source in self._stalled:
+            self._stalled.discard(source)
+
+    def drop(self, source, reason='disconnect'):
+        """Stall a source immediately (its connection went away)."""
+        if source in self._last and source not in self._stalled:
+            self._stall(source, reason)
+        self._last.pop(source, None)
+        self._axes.pop(source, None)
+        self._owner.pop(source, None)
+        self._devices.pop(source, None)
+        self._event_sources.discard(source)
+        self._stalled.discard(source)
+
+    def drop_owner(self, owner, reason='disconnect'):
+        """Stall every source owned by a connection."""
+        for source, sid in list(self._owner.items()):
+            if sid == owner:
+                self.drop(source, reason)
+
+    def _device(self, source):
+        joystick = self._devices.get(source)
+        return joystick if joystick is not None else self.get_joystick()
+
+    def sources(self):
+        """Return {source: seconds since last input} for diagnostics."""
+        now = time.monotonic()
+        return {source: round(now - t, 3) for source, t in list(self._last.items())}
+
+    def check(self, now=None):
+        """Stall streaming sources that have not updated within ``timeout``."""
+        now = time.monotonic() if now is None else now
+        deadline = now - self.timeout
+        for source, last in list(self._last.items()):
+            if last < deadline and source not in self._stalled and source not in self._event_sources:
+                self._stall(source, 'timeout')
+
+    def _stall(self, source, reason):
+        self._stalled.add(source)
+        self.stall_count += 1
+        axes = self._axes.get(source, ())
+        joystick = self._device(source)
+        if axes and joystick is not None and joystick.initialized:
+            if self.recenter == 'ramp' and self.ramp_time > 0:
+                now = time.monotonic()
+                for axis in axes:
+                    start = joystick.get_axis(axis)
+                    if start != 0.0:
+                        self._ramps[(joystick, axis)] = (start, now)
+            else:
+                with joystick.frame():
+                    for axis in axes:
+                        joystick.set_axis(axis, 0.0)
+        if self.on_stall is not None:
+            try:
+                self.on_stall(source, reason, list(axes), self._owner.get(source))
+            except Exception as e:
+                print(f"[WATCHDOG] 停滞回调失败: {e}")
+
+    def step(self, now=None):
+        """Advance recenter ramps by one tick."""
+        if not self._ramps:
+            return
+        now = time.monotonic() if now is None else now
+        by_device = {}
+        for (joystick, axis), ramp in list(self._ramps.items()):
+            by_device.setdefault(joystick, []).append((axis, ramp))
+        for joystick, ramps in by_device.items():
+            if not joystick.initialized:
+                for axis, _ in ramps:
+                    self._ramps.pop((joystick, axis), None)
+                continue
+            with joystick.frame():
+                for axis, (start, t0) in ramps:
+                    progress = (now - t0) / self.ramp_time
+                    if progress >= 1.0:
+                        joystick.set_axis(axis, 0.0)
+                        self._ramps.pop((joystick, axis), None)
+                    else:
+                        joystick.set_axis(axis, start * (1.0 - progress))
+
+    def run(self, sleep=time.sleep):
+        """Watchdog loop; ``sleep`` should be socketio.sleep when run as a background task."""
+        self.running = True
+        while self.running:
+            now = time.monotonic()
+            self.check(now)
+            self.step(now)
+            # 归中过程中提高刷新频率，使回零更平滑
+            sleep(min(self.interval, 0.01) if self._ramps else self.interval)
+
+    def stop(self):
+        self.running = False
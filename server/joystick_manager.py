@@ -2,13 +2,16 @@
 wtxrc 的虚拟摇杆管理器。
 
 该模块为驾驶模式提供虚拟摇杆功能。
-It uses vgamepad on Windows or uinput on Linux to create a virtual game controller.
+It uses vgamepad on Windows, or /dev/uinput (directly or through python-uinput)
+on Linux, to create a virtual game controller.
 """
 
 import platform
 import threading
+import time
 import sys
 import os
+from contextlib import contextmanager
 
 # 导入监视器
 sys.path.insert(0, os.path.dirname(__file__))
@@ -19,26 +22,106 @@ except:
     HAS_CONFIG = False
     config = None
 
-try:
-    from joystick_monitor import get_monitor, start_monitor
+# 监视器（tkinter）按需导入，见 _load_monitor()
+HAS_MONITOR = False
+_monitor_update = None
+
+
+def _load_monitor():
+    """Import joystick_monitor lazily so importing this module stays cheap."""
+    global HAS_MONITOR, _monitor_update
+    try:
+        from joystick_monitor import start_monitor, update_axis
+    except ImportError:
+        print("Warning: joystick_monitor not available")
+        return None
     HAS_MONITOR = True
-except ImportError:
-    HAS_MONITOR = False
-    print("Warning: joystick_monitor not available")
+    _monitor_update = update_axis
+    return start_monitor
+
+
+# 各后端支持的轴与按键
+VGAMEPAD_AXES = ('left_x', 'left_y', 'right_x', 'right_y', 'left_trigger', 'right_trigger')
+VGAMEPAD_BUTTONS = {
+    'a': 'XUSB_GAMEPAD_A',
+    'b': 'XUSB_GAMEPAD_B',
+    'x': 'XUSB_GAMEPAD_X',
+    'y': 'XUSB_GAMEPAD_Y',
+    'lb': 'XUSB_GAMEPAD_LEFT_SHOULDER',
+    'rb': 'XUSB_GAMEPAD_RIGHT_SHOULDER',
+    'back': 'XUSB_GAMEPAD_BACK',
+    'start': 'XUSB_GAMEPAD_START',
+    'guide': 'XUSB_GAMEPAD_GUIDE',
+    'ls': 'XUSB_GAMEPAD_LEFT_THUMB',
+    'rs': 'XUSB_GAMEPAD_RIGHT_THUMB',
+    'dpad_up': 'XUSB_GAMEPAD_DPAD_UP',
+    'dpad_down': 'XUSB_GAMEPAD_DPAD_DOWN',
+    'dpad_left': 'XUSB_GAMEPAD_DPAD_LEFT',
+    'dpad_right': 'XUSB_GAMEPAD_DPAD_RIGHT',
+}
+# 摇杆名 -> (x 轴, y 轴)
+STICK_AXES = {
+    'left': ('left_x', 'left_y'),
+    'right': ('right_x', 'right_y'),
+}
+PYTHON_UINPUT_AXES = {
+    'left_x': 'ABS_X',
+    'left_y': 'ABS_Y',
+    'right_x': 'ABS_RX',
+    'right_y': 'ABS_RY',
+}
+PYTHON_UINPUT_BUTTONS = {
+    'a': 'BTN_A',
+    'b': 'BTN_B',
+    'x': 'BTN_X',
+    'y': 'BTN_Y',
+}
 
 
 class VirtualJoystick:
-    """Virtual joystick abstraction layer."""
+    """Virtual joystick abstraction layer.
+
+    Backends: ``vgamepad`` (Windows), ``raw`` (direct /dev/uinput writes, see
+    uinput_device.py) or ``python-uinput`` (Linux). The Linux backend is chosen
+    by ``JOYSTICK_CONFIG['linux_backend']``.
+
+    Args:
+        name: device name (Linux backends); defaults to ``JOYSTICK_CONFIG['name']``
+        monitor: show this device in the joystick monitor window
+    """
     
-    def __init__(self):
+    def __init__(self, name=None, monitor=True):
         self.system = platform.system()
+        self.name = name
+        self.monitor = monitor
         self.gamepad = None
+        self.backend = None
         self.initialized = False
+        self._lock = threading.RLock()
+        self._frame_depth = 0
+        # 最近一次写入设备的值：浮点值用于组合摇杆两轴，整数值用于去重
+        self._axis_values = {}
+        self._emitted = {}
+        self._buttons = {}
+        # 当前帧中待写入的变化
+        self._pending_axes = {}
+        self._pending_buttons = {}
+        # 写入统计
+        self.writes_requested = 0
+        self.writes_suppressed = 0
+        # 写入当前后端不支持的轴 / 按键（不计入 writes_requested）
+        self.writes_unsupported = 0
+        self.frames_flushed = 0
+        # 共享内存遥测槽位（telemetry.SlotWriter），见 attach_telemetry()
+        self.telemetry = None
+        # 当前帧的输入开始处理的时间（最外层 begin_frame）
+        self._input_time = None
         self._init_gamepad()
         
         # 启动监视器（如果配置允许）
-        if HAS_CONFIG and HAS_MONITOR and hasattr(config, 'SHOW_JOYSTICK_MONITOR'):
-            if config.SHOW_JOYSTICK_MONITOR:
+        if monitor and HAS_CONFIG and getattr(config, 'SHOW_JOYSTICK_MONITOR', False):
+            start_monitor = _load_monitor()
+            if start_monitor:
                 start_monitor()
     
     def _init_gamepad(self):
@@ -47,6 +130,7 @@ class VirtualJoystick:
             try:
                 import vgamepad as vg
                 self.gamepad = vg.VX360Gamepad()
+                self.backend = 'vgamepad'
                 self.initialized = True
                 print("Virtual Xbox 360 gamepad initialized (Windows)")
             except ImportError:
@@ -55,37 +139,194 @@ class VirtualJoystick:
             except Exception as e:
                 print(f"在 Windows 上初始化虚拟手柄失败：{e}")
         elif self.system == 'Linux':
-            try:
-                import uinput
-            except ImportError:
-                print("python-uinput not installed. Install with: pip install python-uinput")
-                return
-                
-            try:
-                self.gamepad = uinput.Device([
-                    uinput.ABS_X + (0, 32767, 0, 0),
-                    uinput.ABS_Y + (0, 32767, 0, 0),
-                    uinput.ABS_RX + (0, 32767, 0, 0),
-                    uinput.ABS_RY + (0, 32767, 0, 0),
-                    uinput.BTN_A,
-                    uinput.BTN_B,
-                    uinput.BTN_X,
-                    uinput.BTN_Y,
-                ])
-                self.initialized = True
-                print("Virtual gamepad initialized (Linux)")
-            except PermissionError:
-                print("权限被拒绝。请使用 sudo 运行或添加 uinput 权限。")
-                print("You may need to: sudo modprobe uinput")
-                print("或者将自己加入 input 组：sudo usermod -a -G input $USER")
-            except OSError as e:
-                print(f"创建 uinput 设备失败：{e}")
-                print("Make sure uinput kernel module is loaded: sudo modprobe uinput")
-            except Exception as e:
-                print(f"在 Linux 上初始化虚拟手柄失败：{e}")
+            joystick_config = config.JOYSTICK_CONFIG if HAS_CONFIG else {}
+            linux_backend = joystick_config.get('linux_backend', 'auto')
+            if linux_backend in ('auto', 'raw'):
+                if self._init_raw_uinput() or linux_backend == 'raw':
+                    return
+            self._init_python_uinput()
         else:
             print(f"Virtual joystick not supported on {self.system}")
     
+    def _init_raw_uinput(self):
+        """Create the gamepad by writing /dev/uinput directly."""
+        try:
+            from uinput_device import UinputGamepad, GAMEPAD_AXES, GAMEPAD_BUTTONS
+            self.gamepad = UinputGamepad(name=self.name)
+            self.gamepad_axes = GAMEPAD_AXES
+            self.gamepad_buttons = GAMEPAD_BUTTONS
+            self.backend = 'raw'
+            self.initialized = True
+            print("Virtual gamepad initialized (Linux, /dev/uinput)")
+            return True
+        except PermissionError:
+            print("无法打开 /dev/uinput：权限被拒绝。请使用 sudo 运行或添加 uinput 权限。")
+            print("或者将自己加入 input 组：sudo usermod -a -G input $USER")
+        except OSError as e:
+            print(f"直接创建 uinput 设备失败：{e}")
+            print("Make sure uinput kernel module is loaded: sudo modprobe uinput")
+        return False
+    
+    def _init_python_uinput(self):
+        """Create the gamepad through python-uinput."""
+        try:
+            import uinput
+        except ImportError:
+            print("python-uinput not installed. Install with: pip install python-uinput")
+            return
+            
+        try:
+            self.gamepad = uinput.Device([
+                uinput.ABS_X + (0, 32767, 0, 0),
+                uinput.ABS_Y + (0, 32767, 0, 0),
+                uinput.ABS_RX + (0, 32767, 0, 0),
+                uinput.ABS_RY + (0, 32767, 0, 0),
+                uinput.BTN_A,
+                uinput.BTN_B,
+                uinput.BTN_X,
+                uinput.BTN_Y,
+            ], name=self.name or 'python-uinput')
+            self.backend = 'python-uinput'
+            self.initialized = True
+            print("Virtual gamepad initialized (Linux)")
+        except PermissionError:
+            print("权限被拒绝。请使用 sudo 运行或添加 uinput 权限。")
+            print("You may need to: sudo modprobe uinput")
+            print("或者将自己加入 input 组：sudo usermod -a -G input $USER")
+        except OSError as e:
+            print(f"创建 uinput 设备失败：{e}")
+            print("Make sure uinput kernel module is loaded: sudo modprobe uinput")
+        except Exception as e:
+            print(f"在 Linux 上初始化虚拟手柄失败：{e}")
+    
+    # ---- 量化与去重 ----
+    
+    def quantize(self, axis_name, value):
+        """Map a clamped float axis value to the integer the backend will emit."""
+        if self.backend == 'raw':
+            return self.gamepad.scale(axis_name, value)
+        if self.backend == 'vgamepad':
+            # vgamepad: 摇杆为 -32768..32767 的 short，扳机为 0..255 的 byte
+            if 'trigger' in axis_name:
+                return int(round(value * 255))
+            return int(round(value * 32767))
+        # python-uinput: -1.0~1.0 映射到 0~32767
+        return int((value + 1.0) * 16383.5)
+    
+    @contextmanager
+    def frame(self):
+        """Batch every axis/button change made inside the block into one device frame."""
+        self.begin_frame()
+        try:
+            yield self
+        finally:
+            self.end_frame()
+    
+    def begin_frame(self):
+        with self._lock:
+            if self._frame_depth == 0:
+                self._input_time = time.time()
+            self._frame_depth += 1
+    
+    def end_frame(self):
+        with self._lock:
+            self._frame_depth -= 1
+            if self._frame_depth <= 0:
+                self._frame_depth = 0
+                self._flush()
+                self._input_time = None
+    
+    def get_stats(self):
+        """Return write counters; suppressed_ratio is the share of supported writes dropped as unchanged."""
+        with self._lock:
+            requested = self.writes_requested
+            suppressed = self.writes_suppressed
+            return {
+                'backend': self.backend,
+                'writes_requested': requested,
+                'writes_suppressed': suppressed,
+                'suppressed_ratio': round(suppressed / requested, 4) if requested else 0.0,
+                'writes_unsupported': self.writes_unsupported,
+                'frames_flushed': self.frames_flushed,
+            }
+    
+    def attach_telemetry(self, slot_writer):
+        """Publish every frame written to the device to a telemetry.SlotWriter (None to detach)."""
+        with self._lock:
+            self.telemetry = slot_writer
+            if slot_writer is not None and self.initialized:
+                slot_writer.publish(self._axis_values, self._buttons, self.frames_flushed)
+    
+    def _publish(self):
+        """Copy the state just written to the telemetry slot (caller holds the lock)."""
+        input_time = self._input_time
+        self._input_time = None
+        if self.telemetry is not None:
+            self.telemetry.publish(self._axis_values, self._buttons, self.frames_flushed, input_time)
+    
+    def _flush(self):
+        """Send pending changes to the device as one frame (caller holds the lock)."""
+        if not self._pending_axes and not self._pending_buttons:
+            return
+        axes = self._pending_axes
+        buttons = self._pending_buttons
+        self._pending_axes = {}
+        self._pending_buttons = {}
+        self.frames_flushed += 1
+        
+        if self.backend == 'vgamepad':
+            import vgamepad as vg
+            values = self._axis_values
+            if 'left_x' in axes or 'left_y' in axes:
+                self.gamepad.left_joystick_float(x_value_float=values.get('left_x', 0.0),
+                                                 y_value_float=values.get('left_y', 0.0))
+            if 'right_x' in axes or 'right_y' in axes:
+                self.gamepad.right_joystick_float(x_value_float=values.get('right_x', 0.0),
+                                                  y_value_float=values.get('right_y', 0.0))
+            if 'left_trigger' in axes:
+                self.gamepad.left_trigger_float(value_float=axes['left_trigger'])
+            if 'right_trigger' in axes:
+                self.gamepad.right_trigger_float(value_float=axes['right_trigger'])
+            for button, pressed in buttons.items():
+                xusb = getattr(vg.XUSB_BUTTON, VGAMEPAD_BUTTONS[button])
+                if pressed:
+                    self.gamepad.press_button(button=xusb)
+                else:
+                    self.gamepad.release_button(button=xusb)
+            self.gamepad.update()
+        elif self.backend == 'raw':
+            for axis_name, value in axes.items():
+                self.gamepad.set_axis(axis_name, value)
+            for button, pressed in buttons.items():
+                self.gamepad.set_button(button, pressed)
+            self.gamepad.flush()
+        elif self.backend == 'python-uinput':
+            import uinput
+            for axis_name, value in axes.items():
+                self.gamepad.emit(getattr(uinput, PYTHON_UINPUT_AXES[axis_name]),
+                                  self.quantize(axis_name, value), syn=False)
+            for button, pressed in buttons.items():
+                self.gamepad.emit(getattr(uinput, PYTHON_UINPUT_BUTTONS[button]),
+                                  1 if pressed else 0, syn=False)
+            self.gamepad.syn()
+        self._publish()
+    
+    def _supports_axis(self, axis_name):
+        if self.backend == 'python-uinput':
+            return axis_name in PYTHON_UINPUT_AXES
+        if self.backend == 'raw':
+            return axis_name in self.gamepad_axes
+        return axis_name in VGAMEPAD_AXES
+    
+    def _supports_button(self, button):
+        if self.backend == 'python-uinput':
+            return button in PYTHON_UINPUT_BUTTONS
+        if self.backend == 'raw':
+            return button in self.gamepad_buttons
+        return button in VGAMEPAD_BUTTONS
+    
+    # ---- 公共接口 ----
+    
     def set_steering(self, value):
         """
         Set the steering axis value.
@@ -93,25 +334,15 @@ class VirtualJoystick:
         Args:
             value: Float from -1.0 (full left) to 1.0 (full right)
         """
-        if not self.initialized:
-            return
-        
-        # Clamp value
-        value = max(-1.0, min(1.0, value))
-        
-        if self.system == 'Windows':
-            # vgamepad uses -1.0 to 1.0 range
-            self.gamepad.left_joystick_float(x_value_float=value, y_value_float=0.0)
-            self.gamepad.update()
-        elif self.system == 'Linux':
-            # uinput uses integer range
-            int_value = int((value + 1.0) * 16383.5)  # Map to 0-32767
-            self.gamepad.emit(uinput.ABS_X, int_value, syn=True)
+        self.set_axis('left_x', value)
     
     def set_axis(self, axis_name, value):
         """
         Set a specific gamepad axis value.
         
+        Writes whose quantized device value did not change are suppressed.
+        Outside of a frame() block the change is flushed immediately.
+        
         Args:
             axis_name: Axis name - "left_x", "left_y", "right_x", "right_y", "left_trigger", "right_trigger"
             value: Float from -1.0 to 1.0 (for joysticks) or 0.0 to 1.0 (for triggers)
@@ -125,68 +356,93 @@ class VirtualJoystick:
         else:
             value = max(-1.0, min(1.0, value))
         
+        with self._lock:
+            if not self._supports_axis(axis_name):
+                self.writes_unsupported += 1
+                return
+            self.writes_requested += 1
+            quantized = self.quantize(axis_name, value)
+            if self._emitted.get(axis_name) == quantized:
+                self.writes_suppressed += 1
+                return
+            self._emitted[axis_name] = quantized
+            self._axis_values[axis_name] = value
+            self._pending_axes[axis_name] = value
+            if self._frame_depth == 0:
+                self._flush()
+        
         # 更新监视器
-        if HAS_MONITOR:
+        if self.monitor and _monitor_update is not None:
             try:
-                from joystick_monitor import update_axis
-                update_axis(axis_name, value)
-            except:
+                _monitor_update(axis_name, value)
+            except Exception:
                 pass
-        
-        if self.system == 'Windows':
-            if axis_name == 'left_x':
-                current_y = getattr(self, '_left_y', 0.0)
-                self.gamepad.left_joystick_float(x_value_float=value, y_value_float=current_y)
-                self._left_x = value
-            elif axis_name == 'left_y':
-                current_x = getattr(self, '_left_x', 0.0)
-                self.gamepad.left_joystick_float(x_value_float=current_x, y_value_float=value)
-                self._left_y = value
-            elif axis_name == 'right_x':
-                current_y = getattr(self, '_right_y', 0.0)
-                self.gamepad.right_joystick_float(x_value_float=value, y_value_float=current_y)
-                self._right_x = value
-            elif axis_name == 'right_y':
-                current_x = getattr(self, '_right_x', 0.0)
-                self.gamepad.right_joystick_float(x_value_float=current_x, y_value_float=value)
-                self._right_y = value
-            elif axis_name == 'left_trigger':
-                self.gamepad.left_trigger_float(value_float=value)
-            elif axis_name == 'right_trigger':
-                self.gamepad.right_trigger_float(value_float=value)
-            self.gamepad.update()
-        elif self.system == 'Linux':
-            import uinput
-            axis_map = {
-                'left_x': uinput.ABS_X,
-                'left_y': uinput.ABS_Y,
-                'right_x': uinput.ABS_RX,
-                'right_y': uinput.ABS_RY,
-            }
-            if axis_name in axis_map:
-                int_value = int((value + 1.0) * 16383.5)  # Map -1.0~1.0 to 0-32767
-                self.gamepad.emit(axis_map[axis_name], int_value, syn=True)
     
-    def set_throttle(self, value):
+    def set_stick(self, stick, x, y):
         """
-        Set the throttle value.
+        Set both axes of a stick as one atomic update.
+        
+        Both values are committed under one lock and flushed as a single frame
+        (or joined to the enclosing frame() block), so a diagonal never reaches
+        the device as two half-updates. Counts as one write request.
         
         Args:
-            value: Float from 0.0 (no throttle) to 1.0 (full throttle)
+            stick: "left" or "right"
+            x: Float from -1.0 (left) to 1.0 (right)
+            y: Float from -1.0 (down) to 1.0 (up)
         """
         if not self.initialized:
             return
+        axis_x, axis_y = STICK_AXES[stick]
+        x = max(-1.0, min(1.0, x))
+        y = max(-1.0, min(1.0, y))
         
-        # Clamp value
-        value = max(0.0, min(1.0, value))
+        changed = []
+        with self._lock:
+            axes = [(axis_name, value) for axis_name, value in ((axis_x, x), (axis_y, y))
+                    if self._supports_axis(axis_name)]
+            if not axes:
+                self.writes_unsupported += 1
+                return
+            self.writes_requested += 1
+            for axis_name, value in axes:
+                quantized = self.quantize(axis_name, value)
+                if self._emitted.get(axis_name) == quantized:
+                    continue
+                self._emitted[axis_name] = quantized
+                self._axis_values[axis_name] = value
+                self._pending_axes[axis_name] = value
+                changed.append((axis_name, value))
+            if not changed:
+                self.writes_suppressed += 1
+                return
+            if self._frame_depth == 0:
+                self._flush()
         
-        if self.system == 'Windows':
-            # Map to right trigger (0.0 to 1.0)
-            self.gamepad.right_trigger_float(value_float=value)
-            self.gamepad.update()
-        elif self.system == 'Linux':
-            int_value = int(value * 32767)
-            self.gamepad.emit(uinput.ABS_RY, int_value, syn=True)
+        if self.monitor and _monitor_update is not None:
+            for axis_name, value in changed:
+                try:
+                    _monitor_update(axis_name, value)
+                except Exception:
+                    pass
+    
+    def state(self):
+        """(axis values last written, sorted pressed buttons); axes never written are absent."""
+        with self._lock:
+            return dict(self._axis_values), sorted(b for b, pressed in self._buttons.items() if pressed)
+    
+    def get_axis(self, axis_name):
+        """Return the last value written to an axis (0.0 if never set)."""
+        return self._axis_values.get(axis_name, 0.0)
+    
+    def set_throttle(self, value):
+        """
+        Set the throttle value.
+        
+        Args:
+            value: Float from 0.0 (no throttle) to 1.0 (full throttle)
+        """
+        self.set_axis('right_trigger', value)
     
     def set_brake(self, value):
         """
@@ -195,95 +451,73 @@ class VirtualJoystick:
         Args:
             value: Float from 0.0 (no brake) to 1.0 (full brake)
         """
+        self.set_axis('left_trigger', value)
+    
+    def set_button(self, button, pressed):
+        """Set a gamepad button state; unchanged states are suppressed."""
         if not self.initialized:
             return
-        
-        # Clamp value
-        value = max(0.0, min(1.0, value))
-        
-        if self.system == 'Windows':
-            # Map to left trigger (0.0 to 1.0)
-            self.gamepad.left_trigger_float(value_float=value)
-            self.gamepad.update()
-        elif self.system == 'Linux':
-            int_value = int(value * 32767)
-            self.gamepad.emit(uinput.ABS_RX, int_value, syn=True)
+        button = button.lower()
+        pressed = bool(pressed)
+        with self._lock:
+            if not self._supports_button(button):
+                self.writes_unsupported += 1
+                return
+            self.writes_requested += 1
+            if self._buttons.get(button, False) == pressed:
+                self.writes_suppressed += 1
+                return
+            self._buttons[button] = pressed
+            self._pending_buttons[button] = pressed
+            if self._frame_depth == 0:
+                self._flush()
     
     def press_button(self, button):
         """Press a gamepad button."""
-        if not self.initialized:
-            return
-        
-        if self.system == 'Windows':
-            import vgamepad as vg
-            button_map = {
-                'a': vg.XUSB_BUTTON.XUSB_GAMEPAD_A,
-                'b': vg.XUSB_BUTTON.XUSB_GAMEPAD_B,
-                'x': vg.XUSB_BUTTON.XUSB_GAMEPAD_X,
-                'y': vg.XUSB_BUTTON.XUSB_GAMEPAD_Y,
-            }
-            if button.lower() in button_map:
-                self.gamepad.press_button(button=button_map[button.lower()])
-                self.gamepad.update()
-        elif self.system == 'Linux':
-            import uinput
-            button_map = {
-                'a': uinput.BTN_A,
-                'b': uinput.BTN_B,
-                'x': uinput.BTN_X,
-                'y': uinput.BTN_Y,
-            }
-            if button.lower() in button_map:
-                self.gamepad.emit(button_map[button.lower()], 1, syn=True)
+        self.set_button(button, True)
     
     def release_button(self, button):
         """Release a gamepad button."""
-        if not self.initialized:
-            return
-        
-        if self.system == 'Windows':
-            import vgamepad as vg
-            button_map = {
-                'a': vg.XUSB_BUTTON.XUSB_GAMEPAD_A,
-                'b': vg.XUSB_BUTTON.XUSB_GAMEPAD_B,
-                'x': vg.XUSB_BUTTON.XUSB_GAMEPAD_X,
-                'y': vg.XUSB_BUTTON.XUSB_GAMEPAD_Y,
-            }
-            if button.lower() in button_map:
-                self.gamepad.release_button(button=button_map[button.lower()])
-                self.gamepad.update()
-        elif self.system == 'Linux':
-            import uinput
-            button_map = {
-                'a': uinput.BTN_A,
-                'b': uinput.BTN_B,
-                'x': uinput.BTN_X,
-                'y': uinput.BTN_Y,
-            }
-            if button.lower() in button_map:
-                self.gamepad.emit(button_map[button.lower()], 0, syn=True)
+        self.set_button(button, False)
+    
+    def pressed_buttons(self):
+        """Return the names of buttons currently held down."""
+        return [button for button, pressed in self._buttons.items() if pressed]
     
     def reset(self):
         """Reset all inputs to neutral."""
         if not self.initialized:
             return
         
-        if self.system == 'Windows':
-            self.gamepad.reset()
-            self.gamepad.update()
-        elif self.system == 'Linux':
-            import uinput
-            self.gamepad.emit(uinput.ABS_X, 16383, syn=False)
-            self.gamepad.emit(uinput.ABS_Y, 16383, syn=False)
-            self.gamepad.emit(uinput.ABS_RX, 0, syn=False)
-            self.gamepad.emit(uinput.ABS_RY, 0, syn=True)
+        with self._lock:
+            self._pending_axes = {}
+            self._pending_buttons = {}
+            if self.backend == 'vgamepad':
+                self.gamepad.reset()
+                self.gamepad.update()
+            elif self.backend == 'raw':
+                self.gamepad.reset()
+                self.gamepad.flush()
+            elif self.backend == 'python-uinput':
+                import uinput
+                self.gamepad.emit(uinput.ABS_X, 16383, syn=False)
+                self.gamepad.emit(uinput.ABS_Y, 16383, syn=False)
+                self.gamepad.emit(uinput.ABS_RX, 16383, syn=False)
+                self.gamepad.emit(uinput.ABS_RY, 16383, syn=True)
+            self.frames_flushed += 1
+            self._axis_values = {}
+            self._buttons = {}
+            self._emitted = {}
+            self._publish()
     
     def close(self):
         """Clean up resources."""
         if self.initialized:
             self.reset()
-            if self.system == 'Linux' and self.gamepad:
+            if self.backend == 'python-uinput' and self.gamepad:
                 self.gamepad.destroy()
+            elif self.backend == 'raw' and self.gamepad:
+                self.gamepad.close()
             self.gamepad = None
             self.initialized = False
 
@@ -0,0 +1,644 @@
+"""
+Socket.IO 服务器压力测试：多少台平板、多大的事件速率之后按钮延迟开始变差？
+
+本脚本在一个子进程中启动 app.py 的服务器（``--serve``），使用空的输入后端
+（NullKeyboard / NullMouse 和不创建设备的虚拟手柄），因此可以在没有显示器、
+没有 /dev/uinput 的 Linux 机器上运行；配置文件复制到临时目录，保存布局不会
+改动 config/ 下的文件。服务器端额外统计：
+
+- 每种事件处理函数的调用次数与耗时分布（吞吐量）
+- 事件循环延迟：后台任务每 ``LAG_INTERVAL`` 秒醒来一次，实际多睡的时间
+  （asgi 模式下由事件循环上的协程测量）
+
+``--modes threading,asgi`` 依次以两种运行模式（见 config.SERVER_MODE）启动
+服务器并跑同一组负载，最后并列比较吞吐量和尾延迟；asgi 模式需要
+``pip install uvicorn a2wsgi``。
+
+客户端由若干工作进程产生（每个进程若干个 python-socketio 客户端，经回环
+连接），每个客户端按角色产生事件：
+
+- ``main``：主设备，按 ``gyro_rate`` 持续发送 ``gyro_data``
+- ``player``：按 ``tap_rate`` 点击按钮（``button_down`` + ``button_up``）
+- ``editor``：每 ``save_interval`` 秒保存一次布局（``save_layout``）
+
+客户端对按钮和保存事件（以及每 ``ack_every`` 个陀螺仪事件中的一个）请求
+确认，记录从发送到收到确认的端到端延迟。按客户端数 × 速率倍数逐级增加
+负载，最后输出饱和报告：确认延迟 p99 超过 ``latency_budget`` 或服务器处理的
+事件数明显少于发送数时，该级别标记为饱和。
+
+需要 python-socketio 的客户端依赖::
+
+    pip install "python-socketio[client]"
+    python server/load_test.py --clients 1,4,16,32 --rates 1,2 --duration 10
+    python server/load_test.py --clients 8 --mix main=1,player=6,editor=1 --json report.json
+    python server/load_test.py --clients 4,16,32 --modes threading,asgi
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+# 事件循环延迟采样间隔（秒）
+LAG_INTERVAL = 0.005
+# 每种事件保留的最近耗时样本数
+SAMPLE_WINDOW = 20000
+
+DEFAULT_MIX = {'main': 1, 'player': 6, 'editor': 1}
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list (None when empty)."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(values, scale=1000.0):
+    """count / p50 / p95 / p99 / max of a list of seconds, in milliseconds."""
+    ordered = sorted(values)
+    if not ordered:
+        return {'count': 0}
+    return {
+        'count': len(ordered),
+        'p50': round(percentile(ordered, 50) * scale, 3),
+        'p95': round(percentile(ordered, 95) * scale, 3),
+        'p99': round(percentile(ordered, 99) * scale, 3),
+        'max': round(ordered[-1] * scale, 3),
+    }
+
+
+# ---- 服务器端（--serve）----
+
+class HandlerStats:
+    """Per-event call counts and durations plus event-loop lag, reset between load steps."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self.calls = {}
+            self.durations = {}
+            self.lag = deque(maxlen=SAMPLE_WINDOW)
+
+    def add(self, event, duration):
+        with self._lock:
+            self.calls[event] = self.calls.get(event, 0) + 1
+            samples = self.durations.get(event)
+            if samples is None:
+                samples = self.durations[event] = deque(maxlen=SAMPLE_WINDOW)
+            samples.append(duration)
+
+    def add_lag(self, lag):
+        self.lag.append(lag)
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            events = {
+                event: dict(summarize(list(self.durations[event])), calls=calls,
+                            rate=round(calls / elapsed, 1) if elapsed > 0 else 0.0)
+                for event, calls in self.calls.items()
+            }
+            lag = list(self.lag)
+        return {'elapsed': round(elapsed, 3), 'events': events, 'loop_lag': summarize(lag),
+                'threads': threading.active_count()}
+
+
+def _instrument(socketio, stats):
+    """Wrap every registered Socket.IO handler to time it."""
+    handlers = socketio.server.handlers['/']
+    for event, handler in list(handlers.items()):
+        def timed(*args, _event=event, _handler=handler):
+            start = time.perf_counter()
+            try:
+                return _handler(*args)
+            finally:
+                stats.add(_event, time.perf_counter() - start)
+        handlers[event] = timed
+
+
+def _monitor_loop_lag(socketio, stats):
+    """Background task: how late does a LAG_INTERVAL sleep wake up?"""
+    while True:
+        start = time.perf_counter()
+        socketio.sleep(LAG_INTERVAL)
+        stats.add_lag(max(0.0, time.perf_counter() - start - LAG_INTERVAL))
+
+
+async def _monitor_asyncio_lag(stats):
+    """ASGI mode: the same measurement as a coroutine on the event loop itself."""
+    import asyncio
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        stats.add_lag(max(0.0, time.perf_counter() - start - LAG_INTERVAL))
+
+
+def serve(port, mode='threading'):
+    """Run app.py's server with null input backends and load-test instrumentation."""
+    import app
+    import input_manager
+    from joystick_manager import VirtualJoystick
+    from profiles import ProfileStore
+
+    class NullJoystick(VirtualJoystick):
+        """Virtual gamepad that goes through the full write path but creates no device."""
+
+        def _init_gamepad(self):
+            self.backend = 'null'
+            self.initialized = True
+
+    app.config.DEBUG = False
+    input_manager._keyboard_backend = input_manager.NullKeyboard()
+    input_manager._mouse_backend = input_manager.NullMouse()
+    app.virtual_joystick = NullJoystick(name='load test', monitor=False)
+    app.gamepad_pool.set_joystick(0, app.virtual_joystick)
+    app.gamepad_pool.factory = lambda slot: NullJoystick(name=f'load test {slot + 1}', monitor=False)
+
+    # 保存布局写入临时目录中的副本
+    workdir = tempfile.mkdtemp(prefix='wtxrc-load-')
+    config_path = os.path.join(workdir, 'buttons.json')
+    if os.path.exists(app.CONFIG_PATH):
+        shutil.copy(app.CONFIG_PATH, config_path)
+    profiles_dir = os.path.join(workdir, 'profiles')
+    if os.path.isdir(app.PROFILES_DIR):
+        shutil.copytree(app.PROFILES_DIR, profiles_dir)
+    app.profiles = ProfileStore(config_path, profiles_dir, app.config.MODE, compile=app._compile_profile)
+    app.profiles.load_all(app.profiles.active.name if app.profiles.active else 'default')
+
+    stats = HandlerStats()
+    application = None
+    if mode == 'asgi':
+        import asgi_server
+        application = asgi_server.install(app.app, app.socketio,
+                                          workers=app.config.ASGI_CONFIG.get('workers', asgi_server.DEFAULT_WORKERS),
+                                          loop_tasks=(lambda: _monitor_asyncio_lag(stats),))
+    _instrument(app.socketio, stats)
+
+    @app.socketio.on('loadtest_stats')
+    def handle_loadtest_stats(data=None):
+        snapshot = stats.snapshot()
+        if data and data.get('reset'):
+            stats.reset()
+        return snapshot
+
+    @app.socketio.on('loadtest_buttons')
+    def handle_loadtest_buttons(data=None):
+        profile = app.profiles.active
+        return {'mode': profile.mode, 'buttons': profile.data.get('buttons', []), 'server_mode': mode}
+
+    if application is None:
+        app.socketio.start_background_task(_monitor_loop_lag, app.socketio, stats)
+    app.socketio.start_background_task(app.watchdog.run, app.socketio.sleep)
+    app.socketio.start_background_task(app.pointer_output.run, app.socketio.sleep)
+    print(f"[LOAD] 服务器就绪: 127.0.0.1:{port}（{mode} 模式，空输入后端，配置副本 {workdir}）", flush=True)
+    try:
+        if application is not None:
+            asgi_server.serve(application, '127.0.0.1', port)
+        else:
+            app.socketio.run(app.app, host='127.0.0.1', port=port, allow_unsafe_werkzeug=True, log_output=False)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ---- 客户端 ----
+
+class ClientResult:
+    """Measurements collected by one worker process."""
+
+    def __init__(self):
+        self.sent = {}
+        self.acked = {}
+        self.latency = {}
+        self.send_lag = []
+        self.errors = []
+
+    def to_dict(self):
+        return {'sent': self.sent, 'acked': self.acked, 'latency': self.latency,
+                'send_lag': self.send_lag, 'errors': self.errors}
+
+
+class SimulatedClient:
+    """One tablet/phone: a python-socketio client running one role on its own thread."""
+
+    def __init__(self, url, role, rates, buttons, result, lock, stop_at, seed):
+        import socketio
+        self.url = url
+        self.role = role
+        self.rates = rates
+        self.buttons = buttons
+        self.result = result
+        self.lock = lock
+        self.stop_at = stop_at
+        self.random = random.Random(seed)
+        self.sio = socketio.Client(reconnection=False)
+        self.thread = threading.Thread(target=self.run, name=f'{role}-{seed}', daemon=True)
+
+    def _emit(self, event, data, ack=True):
+        sent = time.perf_counter()
+        with self.lock:
+            self.result.sent[event] = self.result.sent.get(event, 0) + 1
+        if not ack:
+            self.sio.emit(event, data)
+            return
+
+        def on_ack(*_):
+            latency = time.perf_counter() - sent
+            with self.lock:
+                self.result.acked[event] = self.result.acked.get(event, 0) + 1
+                self.result.latency.setdefault(event, []).append(latency)
+        self.sio.emit(event, data, callback=on_ack)
+
+    def _pace(self, period, next_time):
+        """Sleep until ``next_time``; returns the following slot and records how late we were."""
+        now = time.perf_counter()
+        if next_time > now:
+            time.sleep(next_time - now)
+        else:
+            with self.lock:
+                self.result.send_lag.append(now - next_time)
+        return max(next_time + period, time.perf_counter() - period)
+
+    def run(self):
+        try:
+            self.sio.connect(self.url, transports=['websocket'], wait_timeout=10)
+            getattr(self, f'run_{self.role}')()
+        except Exception as e:
+            with self.lock:
+                self.result.errors.append(f"{self.role}: {e!r}")
+        finally:
+            try:
+                self.sio.disconnect()
+            except Exception:
+                pass
+
+    def run_main(self):
+        self.sio.emit('set_main_device', {'is_main': True})
+        period = 1.0 / self.rates['gyro_rate']
+        ack_every = self.rates['ack_every']
+        phase = self.random.uniform(0, 6.28)
+        n = 0
+        next_time = time.perf_counter()
+        while time.perf_counter() < self.stop_at:
+            t = time.perf_counter()
+            self._emit('gyro_data', {
+                'alpha': (t * 20.0) % 360.0,
+                'beta': 20.0 * math.sin(t + phase),
+                'gamma': 40.0 * math.sin(t * 0.7 + phase),
+                't': t * 1000.0,
+            }, ack=n % ack_every == 0)
+            n += 1
+            next_time = self._pace(period, next_time)
+
+    def run_player(self):
+        keys = [b for b in self.buttons if b.get('type') not in ('slider', 'thumbstick', 'touchpad')]
+        if not keys:
+            keys = [{'id': 'load-test', 'label': 'load test'}]
+        period = 1.0 / self.rates['tap_rate']
+        hold = min(0.05, period / 2)
+        next_time = time.perf_counter() + self.random.uniform(0, period)
+        while time.perf_counter() < self.stop_at:
+            next_time = self._pace(period, next_time)
+            btn = self.random.choice(keys)
+            self._emit('button_down', {'id': btn['id'], 'label': btn.get('label')})
+            time.sleep(hold)
+            self._emit('button_up', {'id': btn['id']})
+
+    def run_editor(self):
+        period = self.rates['save_interval']
+        next_time = time.perf_counter() + self.random.uniform(0, period)
+        while time.perf_counter() < self.stop_at:
+            next_time = self._pace(period, next_time)
+            if time.perf_counter() >= self.stop_at:
+                break
+            layout = [dict(b) for b in self.buttons]
+            for b in layout:
+                if 'x' in b:
+                    b['x'] = b['x'] + self.random.choice((-1, 1))
+            self._emit('save_layout', layout)
+
+
+def _worker(url, roles, rates, buttons, start_at, duration, seed, queue):
+    """Worker process: run its share of simulated clients for one load step."""
+    result = ClientResult()
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + max(0.0, start_at - time.time()) + duration
+    clients = [SimulatedClient(url, role, rates, buttons, result, lock, stop_at, seed * 1000 + i)
+               for i, role in enumerate(roles)]
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    for client in clients:
+        client.thread.start()
+    for client in clients:
+        client.thread.join(duration + 15)
+    # 等待最后的确认
+    time.sleep(0.5)
+    with lock:
+        queue.put(result.to_dict())
+
+
+def assign_roles(count, mix):
+    """Spread ``count`` clients over the roles in proportion to ``mix`` (at least one main if any)."""
+    total = sum(mix.values())
+    roles = []
+    for role, weight in mix.items():
+        roles.extend([role] * int(count * weight / total))
+    order = sorted(mix, key=lambda r: -mix[r])
+    i = 0
+    while len(roles) < count:
+        roles.append(order[i % len(order)])
+        i += 1
+    return roles
+
+
+def _control(url):
+    import socketio
+    sio = socketio.Client(reconnection=False)
+    sio.connect(url, transports=['websocket'], wait_timeout=10)
+    return sio
+
+
+def run_step(url, count, scale, args, buttons):
+    """Run one load level and return its measurements."""
+    rates = {
+        'gyro_rate': args.gyro_rate * scale,
+        'tap_rate': args.tap_rate * scale,
+        'save_interval': args.save_interval / scale,
+        'ack_every': args.ack_every,
+    }
+    roles = assign_roles(count, args.mix)
+    workers = max(1, min(args.workers, len(roles)))
+    shares = [roles[i::workers] for i in range(workers)]
+
+    control = _control(url)
+    control.call('loadtest_stats', {'reset': True}, timeout=10)
+    queue = multiprocessing.Queue()
+    start_at = time.time() + 1.0
+    processes = [
+        multiprocessing.Process(target=_worker, args=(url, share, rates, buttons, start_at, args.duration,
+                                                      i + 1, queue), daemon=True)
+        for i, share in enumerate(shares) if share
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get(timeout=args.duration + 60) for _ in processes]
+    for process in processes:
+        process.join(5)
+    server = control.call('loadtest_stats', timeout=10)
+    control.disconnect()
+
+    sent, acked, latency, send_lag, errors = {}, {}, {}, [], []
+    for result in results:
+        for event, n in result['sent'].items():
+            sent[event] = sent.get(event, 0) + n
+        for event, n in result['acked'].items():
+            acked[event] = acked.get(event, 0) + n
+        for event, values in result['latency'].items():
+            latency.setdefault(event, []).extend(values)
+        send_lag.extend(result['send_lag'])
+        errors.extend(result['errors'])
+
+    offered = sum(sent.values())
+    handled = sum(server['events'].get(event, {}).get('calls', 0) for event in sent)
+    ack_latency = {event: summarize(values) for event, values in latency.items()}
+    button = ack_latency.get('button_down', {})
+    worst_p99 = max((s.get('p99') or 0.0 for s in ack_latency.values()), default=0.0)
+    reasons = []
+    if button.get('p99') is not None and button['p99'] > args.latency_budget:
+        reasons.append(f"按钮确认 p99 {button['p99']} ms > {args.latency_budget} ms")
+    if offered and handled < offered * 0.95:
+        reasons.append(f"服务器只处理了 {handled}/{offered} 个事件")
+    lost = sum(sent.get(e, 0) for e in ('button_down', 'button_up', 'save_layout')) - \
+        sum(acked.get(e, 0) for e in ('button_down', 'button_up', 'save_layout'))
+    if lost > 0:
+        reasons.append(f"{lost} 个按钮/保存事件未收到确认")
+    if errors:
+        reasons.append(f"{len(errors)} 个客户端出错")
+    generator_lag = summarize(send_lag)
+    return {
+        'clients': count,
+        'rate_scale': scale,
+        'roles': {role: roles.count(role) for role in args.mix},
+        'rates': rates,
+        'offered_rate': round(offered / args.duration, 1),
+        'handled_rate': round(handled / server['elapsed'], 1) if server['elapsed'] else 0.0,
+        'sent': sent,
+        'acked': acked,
+        'ack_latency': ack_latency,
+        'worst_ack_p99': worst_p99,
+        'server': server,
+        'generator_lag': generator_lag,
+        # 发送端自己跟不上时，测到的是负载生成器而不是服务器的极限
+        'generator_limited': (generator_lag.get('p99') or 0.0) > 5.0,
+        'errors': errors[:20],
+        'saturated': bool(reasons),
+        'reasons': reasons,
+    }
+
+
+def print_report(steps, args, mode=None):
+    print()
+    print("=" * 100)
+    print(f"饱和报告{f'（{mode} 模式）' if mode else ''}（每级 {args.duration}s，延迟预算 {args.latency_budget} ms，"
+          f"gyro {args.gyro_rate} Hz / 点击 {args.tap_rate} 次每秒 / 保存每 {args.save_interval}s，乘以速率倍数）")
+    print("=" * 100)
+    header = (f"{'客户端':>6} {'倍数':>4} {'发送/s':>8} {'处理/s':>8} {'按钮p50':>8} {'按钮p99':>8} "
+              f"{'陀螺p99':>8} {'处理p99':>8} {'循环延迟p99':>11} {'发送滞后p99':>11}  结果")
+    print(header)
+    for step in steps:
+        ack = step['ack_latency']
+        events = step['server']['events']
+        handler_p99 = max((s.get('p99') or 0.0 for s in events.values()), default=0.0)
+        status = '饱和: ' + '; '.join(step['reasons']) if step['saturated'] else 'OK'
+        if step['generator_limited']:
+            status += '（负载生成器跟不上，增加 --workers）'
+        print(f"{step['clients']:>6} {step['rate_scale']:>4g} {step['offered_rate']:>8} {step['handled_rate']:>8} "
+              f"{_fmt(ack.get('button_down', {}).get('p50')):>8} {_fmt(ack.get('button_down', {}).get('p99')):>8} "
+              f"{_fmt(ack.get('gyro_data', {}).get('p99')):>8} {_fmt(handler_p99):>8} "
+              f"{_fmt(step['server']['loop_lag'].get('p99')):>11} {_fmt(step['generator_lag'].get('p99')):>11}  {status}")
+    ok = [s for s in steps if not s['saturated']]
+    first_bad = next((s for s in steps if s['saturated']), None)
+    print()
+    if first_bad is None:
+        print(f"[LOAD] 所有级别均未饱和，最高 {steps[-1]['offered_rate']} 事件/秒")
+    else:
+        best = max(ok, key=lambda s: s['offered_rate']) if ok else None
+        if best:
+            print(f"[LOAD] 未饱和的最高负载: {best['clients']} 个客户端 × {best['rate_scale']:g}，"
+                  f"{best['offered_rate']} 事件/秒")
+        print(f"[LOAD] 从 {first_bad['clients']} 个客户端 × {first_bad['rate_scale']:g} 开始饱和: "
+              f"{'; '.join(first_bad['reasons'])}")
+
+
+def print_comparison(results):
+    """Side-by-side throughput and tail latency of the same load steps under each server mode."""
+    modes = list(results)
+    print()
+    print("=" * 100)
+    print(f"运行模式比较: {' / '.join(modes)}（处理/s、按钮确认 p99、陀螺确认 p99，毫秒）")
+    print("=" * 100)
+    print(f"{'客户端':>6} {'倍数':>4} {'发送/s':>8}  " + '  '.join(f"{mode:^28}" for mode in modes))
+    for row in zip(*results.values()):
+        first = row[0]
+        cells = []
+        for step in row:
+            ack = step['ack_latency']
+            mark = '*' if step['saturated'] else ' '
+            cells.append(f"{step['handled_rate']:>8} {_fmt(ack.get('button_down', {}).get('p99')):>9} "
+                         f"{_fmt(ack.get('gyro_data', {}).get('p99')):>9}{mark}")
+        print(f"{first['clients']:>6} {first['rate_scale']:>4g} {first['offered_rate']:>8}  " + '  '.join(cells))
+    print("（* 表示该级别饱和）")
+
+
+def _fmt(value):
+    return '-' if value is None else f"{value:.2f}"
+
+
+def _parse_list(text, cast):
+    return [cast(part) for part in text.split(',') if part.strip()]
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        role, _, weight = part.partition('=')
+        role = role.strip()
+        if role not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"未知角色: {role}（可选 {', '.join(DEFAULT_MIX)}）")
+        mix[role] = float(weight or 1)
+    return mix
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务器进程退出（返回码 {process.returncode}）")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"等待服务器监听 {port} 超时")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='wtxrc Socket.IO 服务器压力测试')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', default='threading', help=argparse.SUPPRESS)
+    parser.add_argument('--modes', type=lambda t: _parse_list(t, str.strip), default=['threading'],
+                        help='依次测试的服务器运行模式，例如 threading,asgi（--url 时忽略）')
+    parser.add_argument('--port', type=int, default=0, help='服务器端口（默认随机）')
+    parser.add_argument('--url', help='测试已经运行的 load_test --serve 服务器，而不是启动新的')
+    parser.add_argument('--clients', type=lambda t: _parse_list(t, int), default=[1, 2, 4, 8, 16, 32],
+                        help='逐级的客户端数，例如 1,4,16')
+    parser.add_argument('--rates', type=lambda t: _parse_list(t, float), default=[1.0],
+                        help='逐级的速率倍数，例如 1,2,4')
+    parser.add_argument('--mix', type=_parse_mix, default=dict(DEFAULT_MIX), help='角色比例，例如 main=1,player=6,editor=1')
+    parser.add_argument('--duration', type=float, default=10.0, help='每级持续时间（秒）')
+    parser.add_argument('--gyro-rate', type=float, default=60.0, help='主设备陀螺仪频率（Hz）')
+    parser.add_argument('--tap-rate', type=float, default=4.0, help='每个玩家每秒点击次数')
+    parser.add_argument('--save-interval', type=float, default=5.0, help='编辑者保存布局的间隔（秒）')
+    parser.add_argument('--ack-every', type=int, default=10, help='每多少个陀螺仪事件请求一次确认')
+    parser.add_argument('--latency-budget', type=float, default=50.0, help='按钮确认延迟 p99 上限（毫秒）')
+    parser.add_argument('--workers', type=int, default=max(1, min(4, (os.cpu_count() or 2) - 1)),
+                        help='产生客户端的工作进程数')
+    parser.add_argument('--json', help='把完整结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.port, args.mode)
+        return 0
+
+    try:
+        import socketio  # noqa: F401
+        import websocket  # noqa: F401  websocket-client，客户端的 websocket 传输
+    except ImportError:
+        print('[LOAD] 需要 python-socketio 客户端: pip install "python-socketio[client]"')
+        return 2
+    if args.url is None and 'asgi' in args.modes:
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            print('[LOAD] asgi 模式需要 uvicorn 与 a2wsgi: pip install uvicorn a2wsgi')
+            return 2
+
+    results = {}
+    for mode in ([None] if args.url else args.modes):
+        mode, steps = run_mode(mode, args)
+        results[mode] = steps
+        print_report(steps, args, mode)
+    if len(results) > 1:
+        print_comparison(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': {k: v for k, v in vars(args).items() if k not in ('serve', 'mode')},
+                       'steps': [step for steps in results.values() for step in steps]},
+                      f, ensure_ascii=False, indent=2)
+        print(f"[LOAD] 完整结果已写入 {args.json}")
+    return 0
+
+
+def run_mode(mode, args):
+    """Start a server in ``mode`` (or use ``--url``) and run every load step against it."""
+    server = None
+    url = args.url
+    if url is None:
+        port = args.port or _free_port()
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port),
+                                   '--mode', mode], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        url = f'http://127.0.0.1:{port}'
+    try:
+        if server is not None:
+            _wait_for_port(port, server)
+        control = _control(url)
+        layout = control.call('loadtest_buttons', timeout=10)
+        control.disconnect()
+        mode = layout.get('server_mode', mode or 'threading')
+        buttons = layout.get('buttons', [])
+        if layout.get('mode') != 'driving' and args.mix.get('main'):
+            print("[LOAD] 注意: 当前档案不是驾驶模式，主设备的陀螺仪事件不会驱动虚拟手柄")
+
+        steps = []
+        for scale in args.rates:
+            for count in args.clients:
+                print(f"[LOAD] [{mode}] {count} 个客户端 × 速率 {scale:g} ...", flush=True)
+                step = run_step(url, count, scale, args, buttons)
+                step['mode'] = mode
+                steps.append(step)
+                print(f"[LOAD]   发送 {step['offered_rate']}/s, 处理 {step['handled_rate']}/s, "
+                      f"{'饱和' if step['saturated'] else 'OK'}", flush=True)
+        return mode, steps
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
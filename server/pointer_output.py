@@ -0,0 +1,200 @@
+"""
+鼠标输出线程：所有相对指针输入（陀螺仪瞄准、触控板）的唯一注入路径。
+
+socket 事件处理函数只调用 ``add_motion()`` / ``add_scroll()`` / ``click()``，
+把位移累加到待输出量或把按键事件放入队列后立即返回，从不直接调用后端。
+后台循环以 ``output_rate`` 的频率调用 ``tick()``：先一次性输出累积的整数
+像素（小数部分留到下一次，即亚像素余量），再输出滚轮与按键事件。
+
+因此无论一个输出周期内到达多少个 pointermove / 传感器样本，后端每个周期
+最多只被调用一次移动、一次滚动，运动也不会丢失或重复；后端阻塞时只会
+推迟输出，不会拖慢 socket 处理。
+"""
+
+import threading
+import time
+
+DEFAULT_OUTPUT_RATE = 250
+
+MOUSE_BUTTONS = ('left', 'right', 'middle')
+
+
+class _Accumulator:
+    """Pending float motion plus the sub-unit remainder left over from the last tick."""
+
+    __slots__ = ('pending_x', 'pending_y', 'remainder_x', 'remainder_y')
+
+    def __init__(self):
+        self.pending_x = 0.0
+        self.pending_y = 0.0
+        self.remainder_x = 0.0
+        self.remainder_y = 0.0
+
+    def add(self, dx, dy):
+        self.pending_x += dx
+        self.pending_y += dy
+
+    def take(self):
+        """Return the whole units to emit and keep the fractions."""
+        total_x = self.pending_x + self.remainder_x
+        total_y = self.pending_y + self.remainder_y
+        self.pending_x = 0.0
+        self.pending_y = 0.0
+        dx = int(total_x)
+        dy = int(total_y)
+        self.remainder_x = total_x - dx
+        self.remainder_y = total_y - dy
+        return dx, dy
+
+    def clear(self):
+        self.pending_x = self.pending_y = 0.0
+        self.remainder_x = self.remainder_y = 0.0
+
+
+class PointerOutput:
+    """Coalesce relative pointer input from any thread and inject it from one output loop.
+
+    Args:
+        get_backend: returns a MouseBackend (see input_manager.load_mouse_backend)
+        output_rate: ticks per second
+    """
+
+    def __init__(self, get_backend, output_rate=DEFAULT_OUTPUT_RATE):
+        self.get_backend = get_backend
+        self.interval = 1.0 / max(1.0, float(output_rate))
+        self.running = False
+        self._lock = threading.Lock()
+        self._motion = _Accumulator()
+        self._scroll = _Accumulator()
+        # 按键事件按到达顺序输出: [(button, pressed)]
+        self._buttons = []
+        # 统计
+        self.events = 0
+        self.ticks = 0
+        self.moves = 0
+        self.scrolls = 0
+        self.clicks = 0
+
+    def add_motion(self, dx, dy):
+        """Queue relative motion in (fractional) pixels."""
+        with self._lock:
+            self.events += 1
+            self._motion.add(dx, dy)
+
+    def add_scroll(self, dx, dy):
+        """Queue wheel motion in (fractional) notches; positive dy scrolls up."""
+        with self._lock:
+            self.events += 1
+            self._scroll.add(dx, dy)
+
+    def click(self, button='left'):
+        """Queue a press + release of ``button`` ('left' / 'right' / 'middle')."""
+        if button not in MOUSE_BUTTONS:
+            raise ValueError(f"unknown mouse button: {button}")
+        with self._lock:
+            self.events += 1
+            self._buttons.append((button, True))
+            self._buttons.append((button, False))
+
+    def reset(self):
+        """Discard everything not yet emitted (e.g. when the mouse backend changes)."""
+        with self._lock:
+            self._motion.clear()
+            self._scroll.clear()
+            self._buttons = []
+
+    def tick(self):
+        """Emit the accumulated motion, wheel and button events; returns (dx, dy)."""
+        with self._lock:
+            self.ticks += 1
+            dx, dy = self._motion.take()
+            sx, sy = self._scroll.take()
+            buttons = self._buttons
+            if buttons:
+                self._buttons = []
+        if not (dx or dy or sx or sy or buttons):
+            return dx, dy
+        backend = self.get_backend()
+        # 先移动再点击：同一周期内的轻触落在移动后的位置
+        if dx or dy:
+            self.moves += 1
+            backend.move(dx, dy)
+        if sx or sy:
+            self.scrolls += 1
+            backend.scroll(sx, sy)
+        for button, pressed in buttons:
+            if pressed:
+                self.clicks += 1
+            backend.button(button, pressed)
+        return dx, dy
+
+    def backlog(self):
+        """Number of outputs waiting for the next tick (motion and wheel count as one each)."""
+        with self._lock:
+            pending = len(self._buttons)
+            if self._motion.pending_x or self._motion.pending_y:
+                pending += 1
+            if self._scroll.pending_x or self._scroll.pending_y:
+                pending += 1
+        return pending
+
+    def get_stats(self):
+        return {'events': self.events, 'ticks': self.ticks, 'moves': self.moves,
+                'scrolls': self.scrolls, 'clicks': self.clicks,
+                'output_rate': round(1.0 / self.interval)}
+
+    def run(self, sleep=time.sleep):
+        """Output loop; ``sleep`` should be socketio.sleep when run as a background task."""
+        self.running = True
+        next_tick = time.monotonic()
+        while self.running:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[POINTER] 鼠标输出失败: {e}")
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # 落后太多时不补发，重新对齐
+                next_tick = time.monotonic()
+                delay = 0
+            sleep(delay)
+
+    def stop(self):
+        self.running = False
+
+
+if __name__ == '__main__':
+    # 自检：大量小位移与滚动在任意输出频率下累积，总量应与输入一致，按键顺序保持不变
+    class _Counter:
+        def __init__(self):
+            self.x = self.y = 0
+            self.wheel_x = self.wheel_y = 0
+            self.buttons = []
+
+        def move(self, dx, dy):
+            self.x += dx
+            self.y += dy
+
+        def scroll(self, dx, dy):
+            self.wheel_x += dx
+            self.wheel_y += dy
+
+        def button(self, name, pressed):
+            self.buttons.append((name, pressed))
+
+    for every in (1, 4, 16):
+        counter = _Counter()
+        output = PointerOutput(lambda: counter)
+        for i in range(1000):
+            output.add_motion(0.37, -0.73)
+            output.add_scroll(0.0, 0.013)
+            if i == 500:
+                output.click('left')
+            if i % every == 0:
+                output.tick()
+        output.tick()
+        print(f"[POINTER] 每 {every} 个事件输出一次: dx={counter.x} dy={counter.y} "
+              f"wheel={counter.wheel_y} buttons={counter.buttons}, {output.get_stats()}")
+        assert abs(counter.x - 370) <= 1 and abs(counter.y + 730) <= 1 and abs(counter.wheel_y - 13) <= 1
+        assert counter.buttons == [('left', True), ('left', False)]
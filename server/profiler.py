@@ -0,0 +1,312 @@
+"""
+按需采样分析器：用户报告卡顿时，直接对运行中的服务器采样。
+
+:meth:`SamplingProfiler.start` 启动一个采样线程，每 ``interval`` 秒调用一次
+``sys._current_frames()``，记录每个线程（Socket.IO 处理线程、Tk 监视器、
+鼠标输出循环、宏调度线程……）当前的调用栈。
+
+协程模式（eventlet/gevent）下 ``sys._current_frames()`` 只能看到各线程上
+正在运行的 greenlet，挂起的 Socket.IO 处理 greenlet 不会出现。已导入
+greenlet 时，采样线程每 ``GREENLET_RESCAN`` 秒用 ``gc.get_objects()`` 找出
+所有存活的 greenlet（只保存弱引用），每次采样再记录每个挂起 greenlet 的
+``gr_frame`` 栈，线程名记为 ``greenlet``；正在运行的 greenlet 仍由线程栈给出。
+
+- 不采样时没有任何开销：没有线程、没有 ``sys.setprofile`` / ``settrace`` 钩子
+- 采样时只在采样线程里遍历帧对象，栈以 code 对象元组计数，函数名等字符串
+  在结束后才生成；每次采样的耗时记录在结果中（``sample_cost``），用来确认
+  没有影响输入
+- 同一时间只允许一次采样，时长有上限
+
+采样按墙钟时间进行：等待中的线程（``Condition.wait``、``sleep``）同样被计数，
+卡顿时看的是哪个线程的栈偏离了平常的等待位置。
+
+结果为 flamegraph.pl / speedscope 可直接读取的折叠栈格式
+（``线程;模块:函数;模块:函数 次数``），以及按自身/累计采样数排序的热点函数。
+"""
+
+import gc
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005
+MAX_DURATION = 60.0
+# 重新扫描 greenlet 列表的间隔（秒）；gc.get_objects() 较慢，不在每次采样时执行
+GREENLET_RESCAN = 0.25
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already running."""
+
+
+class ProfileSession:
+    """One sampling run: raw stack counts plus summary helpers."""
+
+    def __init__(self, duration, interval):
+        self.duration = duration
+        self.interval = interval
+        self.started = None
+        self.finished = None
+        self.samples = 0
+        # (线程名, (code, code, ...)) -> 次数，栈从外到内
+        self.stacks = Counter()
+        self.sample_cost = []
+        # 是否同时采样挂起的 greenlet，以及最近一次扫描到的数量
+        self.greenlets = False
+        self.greenlet_count = 0
+        self.done = threading.Event()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def _labels(self):
+        cache = {}
+
+        def label(code):
+            text = cache.get(code)
+            if text is None:
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                name = getattr(code, 'co_qualname', code.co_name)
+                text = cache[code] = f"{module}:{name}"
+            return text
+        return label
+
+    def collapsed(self):
+        """Folded stacks, one ``thread;frame;frame count`` line per distinct stack."""
+        label = self._labels()
+        lines = []
+        for (thread, codes), count in self.stacks.most_common():
+            frames = ';'.join([thread.replace(';', '_').replace(' ', '_')] +
+                              [label(code).replace(';', '_') for code in codes])
+            lines.append(f"{frames} {count}")
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def top(self, n=20):
+        """Hottest functions by self samples (leaf frame) and total samples (anywhere on the stack)."""
+        label = self._labels()
+        own = Counter()
+        total = Counter()
+        stack_count = 0
+        for (thread, codes), count in self.stacks.items():
+            stack_count += count
+            if not codes:
+                continue
+            own[codes[-1]] += count
+            for code in set(codes):
+                total[code] += count
+
+        def rows(counter):
+            return [{
+                'function': label(code),
+                'file': code.co_filename,
+                'line': code.co_firstlineno,
+                'samples': count,
+                'percent': round(100.0 * count / stack_count, 2) if stack_count else 0.0,
+            } for code, count in counter.most_common(n)]
+        return {'self': rows(own), 'total': rows(total)}
+
+    def threads(self):
+        counts = Counter()
+        for (thread, _), count in self.stacks.items():
+            counts[thread] += count
+        return dict(counts.most_common())
+
+    def summary(self, top=20):
+        costs = sorted(self.sample_cost)
+        cost = {}
+        if costs:
+            cost = {
+                'mean_us': round(sum(costs) / len(costs) * 1e6, 1),
+                'p99_us': round(costs[min(len(costs) - 1, int(len(costs) * 0.99))] * 1e6, 1),
+                'max_us': round(costs[-1] * 1e6, 1),
+            }
+        return {
+            'duration': round(self.elapsed, 3),
+            'interval': self.interval,
+            'samples': self.samples,
+            'greenlets': self.greenlet_count if self.greenlets else None,
+            'threads': self.threads(),
+            'sample_cost': cost,
+            'top': self.top(top),
+        }
+
+
+class SamplingProfiler:
+    """Statistical profiler over all threads, started on demand.
+
+    Args:
+        max_duration: upper bound for one run, in seconds
+        max_depth: frames kept per stack (innermost ones)
+        greenlets: also sample suspended greenlets; None enables it when greenlet is imported
+    """
+
+    def __init__(self, max_duration=MAX_DURATION, max_depth=128, greenlets=None):
+        self.max_duration = max_duration
+        self.max_depth = max_depth
+        self.greenlets = greenlets
+        self._lock = threading.Lock()
+        self._session = None
+        self.last = None
+
+    @property
+    def running(self):
+        session = self._session
+        return session is not None and not session.done.is_set()
+
+    def start(self, duration, interval=DEFAULT_INTERVAL):
+        """Start sampling in a background thread; raises ProfilerBusy if a run is in progress."""
+        duration = max(0.1, min(float(duration), self.max_duration))
+        interval = max(0.001, float(interval))
+        with self._lock:
+            if self.running:
+                raise ProfilerBusy("profiler already running")
+            session = self._session = ProfileSession(duration, interval)
+        greenlets = self.greenlets
+        session.greenlets = 'greenlet' in sys.modules if greenlets is None else bool(greenlets)
+        thread = threading.Thread(target=self._sample, args=(session,), name='sampling-profiler', daemon=True)
+        thread.start()
+        return session
+
+    def profile(self, duration, interval=DEFAULT_INTERVAL, sleep=time.sleep):
+        """Run one profile and wait for it; ``sleep`` should be socketio.sleep inside the server."""
+        session = self.start(duration, interval)
+        while not session.done.is_set():
+            sleep(0.05)
+        return session
+
+    @staticmethod
+    def _scan_greenlets():
+        """Weak references to every live greenlet (empty when greenlet is not imported)."""
+        module = sys.modules.get('greenlet')
+        if module is None:
+            return []
+        kind = module.greenlet
+        return [weakref.ref(obj) for obj in gc.get_objects() if isinstance(obj, kind) and not obj.dead]
+
+    def _stack(self, frame):
+        codes = []
+        while frame is not None and len(codes) < self.max_depth:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        return tuple(codes)
+
+    def _sample(self, session):
+        own = threading.get_ident()
+        max_depth = self.max_depth
+        current_frames = sys._current_frames
+        clock = time.perf_counter
+        stacks = session.stacks
+        costs = session.sample_cost
+        names = {}
+        session.started = clock()
+        deadline = session.started + session.duration
+        next_sample = session.started
+        greenlets = []
+        next_scan = session.started
+        try:
+            while True:
+                start = clock()
+                if start >= deadline:
+                    break
+                frames = current_frames()
+                frame = None
+                if len(names) != len(frames) or any(ident not in names for ident in frames):
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    codes = []
+                    while frame is not None and len(codes) < max_depth:
+                        codes.append(frame.f_code)
+                        frame = frame.f_back
+                    codes.reverse()
+                    stacks[(names.get(ident, str(ident)), tuple(codes))] += 1
+                del frames, frame
+                if session.greenlets:
+                    if start >= next_scan:
+                        greenlets = self._scan_greenlets()
+                        session.greenlet_count = len(greenlets)
+                        next_scan = start + GREENLET_RESCAN
+                    glet = None
+                    for ref in greenlets:
+                        glet = ref()
+                        # 正在运行（gr_frame 为 None）的 greenlet 已经在线程栈中
+                        frame = glet.gr_frame if glet is not None else None
+                        if frame is not None:
+                            stacks[('greenlet', self._stack(frame))] += 1
+                    del glet, frame
+                session.samples += 1
+                costs.append(clock() - start)
+                next_sample += session.interval
+                delay = next_sample - clock()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_sample = clock()
+        except Exception as e:
+            print(f"[PROFILER] 采样失败: {e}")
+        finally:
+            session.finished = clock()
+            self.last = session
+            session.done.set()
+
+
+if __name__ == '__main__':
+    # 自检：一个忙线程和一个空闲线程，热点应当是忙线程里的函数
+    def busy_leaf(n):
+        total = 0
+        for i in range(n):
+            total += i * i
+        return total
+
+    def busy_worker(stop):
+        while not stop.is_set():
+            busy_leaf(20000)
+
+    stop = threading.Event()
+    threading.Thread(target=busy_worker, args=(stop,), name='busy', daemon=True).start()
+    threading.Thread(target=stop.wait, name='idle', daemon=True).start()
+    profiler = SamplingProfiler()
+    session = profiler.profile(1.0, 0.005)
+    stop.set()
+    summary = session.summary(top=5)
+    print(f"[PROFILER] {summary['samples']} 次采样, 每次 {summary['sample_cost']}")
+    print(f"[PROFILER] 线程: {summary['threads']}")
+    for row in summary['top']['self']:
+        print(f"  {row['percent']:6.2f}%  {row['function']}")
+    print(session.collapsed().splitlines()[0])
+    busy = [row for row in summary['top']['self'] if row['function'].endswith('busy_leaf')]
+    assert busy and busy[0]['samples'] >= summary['samples'] * 0.8, busy
+    first = None
+    try:
+        first = profiler.start(1.0)
+        profiler.start(1.0)
+    except ProfilerBusy:
+        pass
+    else:
+        raise AssertionError("second start should be rejected")
+    first.done.wait()
+
+    try:
+        import greenlet
+    except ImportError:
+        greenlet = None
+    if greenlet is not None:
+        # 协程模式：挂起的 greenlet（等待中的 Socket.IO 处理函数）也应出现在采样中
+        def parked_handler():
+            greenlet.getcurrent().parent.switch()
+
+        parked = [greenlet.greenlet(parked_handler) for _ in range(3)]
+        for glet in parked:
+            glet.switch()
+        session = profiler.profile(0.3, 0.005)
+        summary = session.summary(top=50)
+        print(f"[PROFILER] greenlet: 扫描到 {summary['greenlets']} 个, 线程: {summary['threads']}")
+        assert any(row['function'].endswith('parked_handler') for row in summary['top']['self'])
@@ -0,0 +1,205 @@
+"""
+按游戏区分的配置档案（profile），启动时全部预加载到内存。
+
+每个档案就是一份与 ``config/buttons.json`` 格式相同的 JSON（按钮布局、
+``driving_config``），可选的 ``mode`` 字段指定该档案使用的模式（缺省为
+``config.MODE``）、``title`` 为显示名称：
+
+- ``default``：``config/buttons.json``（原有配置，保持兼容）
+- 其它档案：``config/profiles/<name>.json``
+
+:class:`ProfileStore` 在启动时读取并编译所有档案（按钮 id 索引，以及通过
+``compile`` 回调预编译轴曲线表、宏脚本等），切换档案只是替换一次
+``active`` 引用：输入事件处理函数每个事件读取一次 ``store.active``，
+因此总是看到完整的旧档案或完整的新档案，切换过程中没有文件 I/O。
+保存某个档案后只重新读取、编译这一个（:meth:`ProfileStore.reload`），同样
+整体替换引用。
+"""
+
+import glob
+import json
+import os
+import threading
+
+DEFAULT_PROFILE = 'default'
+
+
+class Profile:
+    """One preloaded configuration: the raw JSON dict plus lookups compiled from it."""
+
+    __slots__ = ('name', 'path', 'data', 'mode', 'title', 'buttons', 'compiled')
+
+    def __init__(self, name, path, data, default_mode):
+        self.name = name
+        self.path = path
+        self.data = data
+        self.mode = data.get('mode') or default_mode
+        self.title = data.get('title') or ('默认' if name == DEFAULT_PROFILE else name)
+        # 按钮 id -> 按钮配置（热路径一次字典查找，替代逐个比较）
+        self.buttons = {btn['id']: btn for btn in data.get('buttons', []) if 'id' in btn}
+        # compile 回调的结果，随档案一起保存（保持被编译对象存活）
+        self.compiled = None
+
+    def button(self, btn_id):
+        return self.buttons.get(btn_id)
+
+    def info(self):
+        return {'name': self.name, 'title': self.title, 'mode': self.mode}
+
+
+class ProfileStore:
+    """Load every profile at startup and switch between them without touching the disk.
+
+    Args:
+        default_path: path of the ``default`` profile (config/buttons.json)
+        directory: directory holding the other ``<name>.json`` profiles
+        default_mode: mode for profiles that do not set ``mode``
+        compile: ``compile(profile) -> object`` run once per (re)loaded profile
+    """
+
+    def __init__(self, default_path, directory, default_mode='custom_keys', compile=None):
+        self.default_path = default_path
+        self.directory = directory
+        self.default_mode = default_mode
+        self.compile = compile
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self.active = None
+
+    def path_for(self, name):
+        if name == DEFAULT_PROFILE:
+            return self.default_path
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _build(self, name, data):
+        profile = Profile(name, self.path_for(name), data, self.default_mode)
+        if self.compile is not None:
+            profile.compiled = self.compile(profile)
+        return profile
+
+    def _read(self, name):
+        path = self.path_for(name)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            data = {"buttons": []}
+        return self._build(name, data)
+
+    def _scan(self):
+        names = [DEFAULT_PROFILE]
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.json'))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            if name != DEFAULT_PROFILE:
+                names.append(name)
+        return names
+
+    def _install(self, profile):
+        """Swap one compiled profile in (copy-on-write); returns the profile it replaced, or None."""
+        with self._lock:
+            profiles = dict(self._profiles)
+            previous = profiles.get(profile.name)
+            profiles[profile.name] = profile
+            self._profiles = profiles
+            if self.active is None or self.active.name == profile.name:
+                self.active = profile
+        return previous
+
+    def reload(self, name):
+        """Re-read and recompile one profile after it was saved; returns (previous, new)."""
+        profile = self._read(name)
+        return self._install(profile), profile
+
+    def replace(self, name, data):
+        """Install ``data`` as profile ``name`` without touching the disk; returns (previous, new)."""
+        profile = self._build(name, data)
+        return self._install(profile), profile
+
+    def load_new(self):
+        """Load profiles added to the directory since the last scan; returns their names."""
+        added = []
+        for name in self._scan():
+            if name in self._profiles:
+                continue
+            try:
+                self._install(self._read(name))
+            except (OSError, ValueError) as e:
+                print(f"[PROFILE] 无法加载档案 {name}: {e}")
+                continue
+            added.append(name)
+        return added
+
+    def load_all(self, active=DEFAULT_PROFILE):
+        """(Re)load the default profile and every ``<directory>/*.json``; returns the profile names."""
+        names = self._scan()
+        profiles = {}
+        for name in names:
+            try:
+                profiles[name] = self._read(name)
+            except (OSError, ValueError) as e:
+                print(f"[PROFILE] 无法加载档案 {name}: {e}")
+        if DEFAULT_PROFILE not in profiles:
+            profiles[DEFAULT_PROFILE] = Profile(DEFAULT_PROFILE, self.default_path, {"buttons": []},
+                                                self.default_mode)
+        with self._lock:
+            self._profiles = profiles
+            current = self.active.name if self.active is not None else active
+            self.active = profiles.get(current) or profiles[DEFAULT_PROFILE]
+        return list(profiles)
+
+    def get(self, name):
+        return self._profiles.get(name)
+
+    def names(self):
+        return list(self._profiles)
+
+    def list(self):
+        return [profile.info() for profile in self._profiles.values()]
+
+    def has_mode(self, mode):
+        return any(profile.mode == mode for profile in self._profiles.values())
+
+    def switch(self, name):
+        """Make a preloaded profile active; returns (previous, new). Raises KeyError if unknown."""
+        with self._lock:
+            profile = self._profiles.get(name)
+            if profile is None:
+                raise KeyError(name)
+            previous = self.active
+            self.active = profile
+        return previous, profile
+
+
+if __name__ == '__main__':
+    # 自检：生成若干档案，测量预加载与切换耗时
+    import shutil
+    import tempfile
+    import time
+
+    root = tempfile.mkdtemp()
+    try:
+        directory = os.path.join(root, 'profiles')
+        os.makedirs(directory)
+        default_path = os.path.join(root, 'buttons.json')
+        with open(default_path, 'w', encoding='utf-8') as f:
+            json.dump({'buttons': [{'id': 'btn1', 'keys': ['a']}]}, f)
+        for i in range(48):
+            buttons = [{'id': f'btn{j}', 'keys': ['ctrl', chr(97 + j % 26)]} for j in range(40)]
+            with open(os.path.join(directory, f'game{i:02d}.json'), 'w', encoding='utf-8') as f:
+                json.dump({'mode': 'driving' if i % 2 else 'custom_keys', 'buttons': buttons}, f)
+
+        store = ProfileStore(default_path, directory)
+        start = time.perf_counter()
+        names = store.load_all()
+        load_time = time.perf_counter() - start
+        rounds = 10000
+        start = time.perf_counter()
+        for i in range(rounds):
+            store.switch(names[i % len(names)])
+        switch_time = (time.perf_counter() - start) / rounds
+        print(f"[PROFILE] 预加载 {len(names)} 个档案: {load_time * 1e3:.1f} ms, "
+              f"切换: {switch_time * 1e6:.2f} us/次")
+        assert store.active.name == names[(rounds - 1) % len(names)]
+        assert store.get('game03').button('btn5')['keys'] == ['ctrl', 'f']
+    finally:
+        shutil.rmtree(root)
@@ -0,0 +1,106 @@
+"""
+wtxrc 启动阶段计时与输入后端就绪状态。
+
+服务器启动被拆分为若干阶段：先让 HTTP/Socket.IO 监听起来，
+再在后台加载 pynput、vgamepad/uinput、Tk 监视器和 overlay 进程。
+本模块记录每个阶段的耗时，并维护各后端的就绪状态，
+状态变化时通知已注册的监听器（app.py 用它向客户端广播）。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# 后端状态
+STATE_PENDING = 'pending'
+STATE_LOADING = 'loading'
+STATE_READY = 'ready'
+STATE_FAILED = 'failed'
+STATE_DISABLED = 'disabled'
+
+
+class StartupTracker:
+    """Record startup phase timings and backend readiness."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases = []  # [(name, start_offset, duration)]
+        self.backends = {}  # name -> {'state', 'detail', 'elapsed'}
+        self.lock = threading.Lock()
+        self._listeners = []
+
+    @contextmanager
+    def phase(self, name):
+        """计时一个启动阶段（上下文管理器）。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.phases.append((name, start - self.t0, end - start))
+
+    def mark(self, name):
+        """记录一个瞬时里程碑（例如开始监听）。"""
+        with self.lock:
+            self.phases.append((name, time.perf_counter() - self.t0, 0.0))
+
+    def register_backend(self, name, state=STATE_PENDING, detail=None):
+        with self.lock:
+            self.backends[name] = {'state': state, 'detail': detail, 'elapsed': None}
+        self._notify()
+
+    def set_backend(self, name, state, detail=None):
+        """更新后端状态并通知监听器。"""
+        with self.lock:
+            entry = self.backends.setdefault(name, {'state': STATE_PENDING, 'detail': None, 'elapsed': None})
+            entry['state'] = state
+            entry['detail'] = detail
+            if state in (STATE_READY, STATE_FAILED, STATE_DISABLED):
+                entry['elapsed'] = round(time.perf_counter() - self.t0, 4)
+        self._notify()
+
+    def is_ready(self, name):
+        with self.lock:
+            entry = self.backends.get(name)
+            return entry is not None and entry['state'] == STATE_READY
+
+    def add_listener(self, callback):
+        """注册状态变化回调，回调参数为 snapshot()。"""
+        self._listeners.append(callback)
+
+    def _notify(self):
+        snapshot = self.snapshot()
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"[STARTUP] 状态回调失败: {e}")
+
+    def snapshot(self):
+        """返回可 JSON 序列化的当前状态。"""
+        with self.lock:
+            return {
+                'uptime': round(time.perf_counter() - self.t0, 4),
+                'backends': {name: dict(entry) for name, entry in self.backends.items()},
+                'phases': [
+                    {'name': name, 'start': round(start, 4), 'duration': round(duration, 4)}
+                    for name, start, duration in self.phases
+                ],
+            }
+
+    def report(self):
+        """生成按阶段排列的启动耗时报告文本。"""
+        snap = self.snapshot()
+        lines = ["[STARTUP] 启动阶段耗时:"]
+        for p in sorted(snap['phases'], key=lambda p: p['start']):
+            lines.append(f"[STARTUP]   +{p['start'] * 1000:8.1f} ms  {p['name']:<24} {p['duration'] * 1000:8.1f} ms")
+        for name, entry in snap['backends'].items():
+            elapsed = f"{entry['elapsed'] * 1000:.1f} ms" if entry['elapsed'] is not None else '-'
+            detail = f" ({entry['detail']})" if entry['detail'] else ''
+            lines.append(f"[STARTUP]   后端 {name:<12} {entry['state']:<9} @ {elapsed}{detail}")
+        return "\n".join(lines)
+
+
+# 全局启动跟踪器
+tracker = StartupTracker()
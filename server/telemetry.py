@@ -0,0 +1,346 @@
+"""
+共享内存遥测：把虚拟手柄的状态发布到一个定长布局的内存映射文件。
+
+外部工具（按键显示、录像标注、自己写的分析脚本……）不必连接 Socket.IO 或
+轮询 HTTP：服务器每写入一帧设备（``VirtualJoystick._flush``），就把该玩家
+手柄的轴值、按键、主设备和时间戳写进自己的槽位；读取方映射同一个文件，直接
+从共享内存取值，没有系统调用也没有序列化。
+
+文件默认在 ``/dev/shm/wtxrc-telemetry``（Linux 上即 POSIX 共享内存），没有
+``/dev/shm`` 时放在系统临时目录；服务器退出后文件保留（写入进程 ID 清零），
+下次启动时整体替换。所有字段为小端序::
+
+    头部（64 字节）
+      0   8s   magic          b'WTXRCTEL'
+      8   u32  version        1
+      12  u32  header_size    64
+      16  u32  slot_size      128
+      20  u32  slot_count     槽位数（MAX_GAMEPADS，槽位 i 即玩家 i+1）
+      24  f64  created        创建时间（Unix 秒）
+      32  u32  writer_pid     写入进程 ID；服务器正常退出后为 0
+
+    槽位 i（位于 header_size + i * slot_size，128 字节）
+      0   u32  seq            序列锁：写入期间为奇数，每次写入加 2
+      4   u32  flags          bit0 = 已有虚拟手柄，bit1 = 有主设备绑定此槽位
+      8   u64  frame          该手柄写入设备的帧计数
+      16  f64  write_time     写入设备的时间（Unix 秒）
+      24  f64  input_time     产生这一帧的输入开始处理的时间（Unix 秒）
+      32  8×f32 axes          TELEMETRY_AXES 顺序，摇杆 -1..1、扳机 0..1、方向键 -1/0/1
+      64  u32  buttons        按下的按键位掩码，bit n 对应 TELEMETRY_BUTTONS[n]
+      68  u16  player         玩家编号（无主设备时为 0）
+      70  u16  reserved
+      72  32s  device         主设备的连接 ID（UTF-8，\\0 填充）
+
+读取一个槽位：读 ``seq``，为奇数则重试；读取其余字段；再读一次 ``seq``，
+与第一次相同则这份数据是完整的一帧，否则重试。写入方从不等待读取方。C/C++
+等语言的读取方需要用 acquire 语义读取 ``seq``，并在第二次读取前加读屏障。
+:class:`TelemetryReader` 是 Python 的读取实现；本模块不依赖项目中的其他
+文件，可以直接复制到外部工具中使用::
+
+    python server/telemetry.py            # 实时显示各玩家的状态
+    python server/telemetry.py --once     # 输出一份 JSON 快照
+"""
+
+import os
+import mmap
+import struct
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+MAGIC = b'WTXRCTEL'
+VERSION = 1
+HEADER_SIZE = 64
+SLOT_SIZE = 128
+
+TELEMETRY_AXES = ('left_x', 'left_y', 'right_x', 'right_y', 'left_trigger', 'right_trigger', 'dpad_x', 'dpad_y')
+TELEMETRY_BUTTONS = ('a', 'b', 'x', 'y', 'lb', 'rb', 'back', 'start', 'guide', 'ls', 'rs',
+                     'dpad_up', 'dpad_down', 'dpad_left', 'dpad_right')
+BUTTON_BITS = {button: 1 << bit for bit, button in enumerate(TELEMETRY_BUTTONS)}
+
+FLAG_DEVICE = 1
+FLAG_MAIN = 2
+
+DEVICE_ID_SIZE = 32
+
+_HEADER = struct.Struct('<8sIIIIdI')
+_SEQ = struct.Struct('<I')
+# 槽位中 seq 之后的字段
+_BODY = struct.Struct(f'<IQdd{len(TELEMETRY_AXES)}fIHH{DEVICE_ID_SIZE}s')
+_BODY_OFFSET = _SEQ.size
+_PID_OFFSET = 32
+
+assert _HEADER.size <= HEADER_SIZE and _BODY_OFFSET + _BODY.size <= SLOT_SIZE
+
+SlotState = namedtuple('SlotState', 'slot frame write_time input_time axes buttons player device has_device has_main')
+
+
+def default_path():
+    """``/dev/shm/wtxrc-telemetry`` where POSIX shared memory is mounted, else the temp directory."""
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm/wtxrc-telemetry'
+    return os.path.join(tempfile.gettempdir(), 'wtxrc-telemetry')
+
+
+class SlotWriter:
+    """Seqlock-protected writer for one slot; every call writes the whole slot."""
+
+    def __init__(self, writer, offset):
+        self._writer = writer
+        self._offset = offset
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._flags = 0
+        self._frame = 0
+        self._write_time = 0.0
+        self._input_time = 0.0
+        self._axes = (0.0,) * len(TELEMETRY_AXES)
+        self._buttons = 0
+        self._player = 0
+        self._device = b''
+
+    def publish(self, axes, buttons, frame, input_time=None):
+        """Write a device frame: ``axes`` {name: value}, ``buttons`` {name: pressed}."""
+        values = tuple(axes.get(name, 0.0) for name in TELEMETRY_AXES)
+        mask = 0
+        for button, pressed in buttons.items():
+            if pressed:
+                mask |= BUTTON_BITS.get(button, 0)
+        now = time.time()
+        with self._lock:
+            self._flags |= FLAG_DEVICE
+            self._axes = values
+            self._buttons = mask
+            self._frame = frame
+            self._write_time = now
+            self._input_time = now if input_time is None else input_time
+            self._write()
+
+    def set_owner(self, player, device):
+        """Record the main device bound to this slot (``device`` None when the slot is free)."""
+        with self._lock:
+            if device:
+                self._flags |= FLAG_MAIN
+                self._player = player
+                self._device = str(device).encode('utf-8')[:DEVICE_ID_SIZE]
+            else:
+                self._flags &= ~FLAG_MAIN
+                self._player = 0
+                self._device = b''
+            self._write()
+
+    def _write(self):
+        """Seqlock write (caller holds the slot lock)."""
+        buf = self._writer.buf
+        if buf is None:
+            return
+        offset = self._offset
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        _SEQ.pack_into(buf, offset, self._seq)
+        _BODY.pack_into(buf, offset + _BODY_OFFSET, self._flags, self._frame, self._write_time, self._input_time,
+                        *self._axes, self._buttons, self._player, 0, self._device)
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        _SEQ.pack_into(buf, offset, self._seq)
+
+
+class TelemetryWriter:
+    """Create the telemetry file and map it; ``slot(i)`` returns the writer of slot ``i``.
+
+    The file is built under a temporary name and renamed into place, so readers
+    never see a half-written header.
+
+    Args:
+        path: file to create (``default_path()`` when None)
+        slots: number of slots (gamepads)
+    """
+
+    def __init__(self, path=None, slots=1):
+        self.path = path or default_path()
+        self.slot_count = max(1, int(slots))
+        size = HEADER_SIZE + self.slot_count * SLOT_SIZE
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w+b') as f:
+            f.truncate(size)
+            self.buf = mmap.mmap(f.fileno(), size)
+        _HEADER.pack_into(self.buf, 0, MAGIC, VERSION, HEADER_SIZE, SLOT_SIZE, self.slot_count,
+                          time.time(), os.getpid())
+        try:
+            os.replace(tmp_path, self.path)
+        except OSError:
+            self.buf.close()
+            os.unlink(tmp_path)
+            raise
+        self._slots = [SlotWriter(self, HEADER_SIZE + i * SLOT_SIZE) for i in range(self.slot_count)]
+
+    def slot(self, index):
+        return self._slots[index]
+
+    def close(self):
+        """Mark the file as no longer written (writer_pid = 0) and unmap it; the file stays."""
+        buf = self.buf
+        if buf is None:
+            return
+        for slot in self._slots:
+            slot._lock.acquire()
+        try:
+            self.buf = None
+            struct.pack_into('<I', buf, _PID_OFFSET, 0)
+            buf.close()
+        finally:
+            for slot in self._slots:
+                slot._lock.release()
+
+
+class TelemetryReader:
+    """Read-only mapping of a telemetry file; ``read(slot)`` returns a consistent :data:`SlotState`.
+
+    Args:
+        path: telemetry file (``default_path()`` when None)
+    """
+
+    def __init__(self, path=None, spin=1000):
+        self.path = path or default_path()
+        self.spin = spin
+        with open(self.path, 'rb') as f:
+            self._ino = os.fstat(f.fileno()).st_ino
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.buf) < HEADER_SIZE:
+            self.buf.close()
+            raise ValueError(f"{self.path}: 文件过短，不是 wtxrc 遥测文件")
+        magic, version, header_size, slot_size, slot_count, created, _ = _HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.buf.close()
+            raise ValueError(f"{self.path}: 不支持的遥测文件（magic={magic!r}, version={version}）")
+        self.header_size = header_size
+        self.slot_size = slot_size
+        self.slot_count = slot_count
+        self.created = created
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.buf.close()
+
+    @property
+    def writer_pid(self):
+        return struct.unpack_from('<I', self.buf, _PID_OFFSET)[0]
+
+    def stale(self):
+        """True once the server closed this file or a restarted server replaced it."""
+        if self.writer_pid == 0:
+            return True
+        try:
+            return os.stat(self.path).st_ino != self._ino
+        except OSError:
+            return True
+
+    def read_raw(self, slot):
+        """(seq, flags, frame, write_time, input_time, *axes, buttons, player, reserved, device), or None.
+
+        None means the writer stayed mid-write for ``spin`` attempts (it died while writing).
+        """
+        buf = self.buf
+        offset = self.header_size + slot * self.slot_size
+        for attempt in range(self.spin):
+            seq = _SEQ.unpack_from(buf, offset)[0]
+            if not seq & 1:
+                body = _BODY.unpack_from(buf, offset + _BODY_OFFSET)
+                if _SEQ.unpack_from(buf, offset)[0] == seq:
+                    return (seq,) + body
+            if attempt % 64 == 63:
+                time.sleep(0)
+        return None
+
+    def read(self, slot):
+        """Decoded state of one slot, or None (see :meth:`read_raw`)."""
+        raw = self.read_raw(slot)
+        if raw is None:
+            return None
+        flags, frame, write_time, input_time = raw[1:5]
+        n = len(TELEMETRY_AXES)
+        axes = dict(zip(TELEMETRY_AXES, raw[5:5 + n]))
+        mask, player, _, device = raw[5 + n:]
+        buttons = [button for button in TELEMETRY_BUTTONS if mask & BUTTON_BITS[button]]
+        return SlotState(slot, frame, write_time, input_time, axes, buttons, player,
+                         device.rstrip(b'\0').decode('utf-8', 'replace'),
+                         bool(flags & FLAG_DEVICE), bool(flags & FLAG_MAIN))
+
+    def read_all(self):
+        return [self.read(slot) for slot in range(self.slot_count)]
+
+    def watch(self, slot=0, interval=0.001):
+        """Yield the slot's state each time the writer publishes it (polls ``seq`` every ``interval``)."""
+        offset = self.header_size + slot * self.slot_size
+        last = None
+        while True:
+            seq = _SEQ.unpack_from(self.buf, offset)[0]
+            if seq != last and not seq & 1:
+                state = self.read(slot)
+                if state is not None:
+                    last = seq
+                    yield state
+            time.sleep(interval)
+
+
+def _format(state, now):
+    if not state.has_device and not state.has_main:
+        return f"[{state.slot}] （未使用）"
+    axes = ' '.join(f"{name} {value:+.3f}" for name, value in state.axes.items())
+    owner = f"P{state.player} {state.device}" if state.has_main else '（空闲）'
+    latency = (state.write_time - state.input_time) * 1000.0
+    age = (now - state.write_time) * 1000.0 if state.write_time else float('nan')
+    return (f"[{state.slot}] {owner} 帧 {state.frame} 处理 {latency:.2f}ms 距今 {age:.0f}ms\n"
+            f"    {axes}\n    按键: {', '.join(state.buttons) or '-'}")
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description='读取 wtxrc 共享内存遥测')
+    parser.add_argument('path', nargs='?', default=None, help=f'遥测文件（默认 {default_path()}）')
+    parser.add_argument('--once', action='store_true', help='输出一份 JSON 快照后退出')
+    parser.add_argument('--interval', type=float, default=0.05, help='实时显示的刷新间隔（秒）')
+    args = parser.parse_args()
+
+    try:
+        reader = TelemetryReader(args.path)
+    except (OSError, ValueError) as e:
+        print(f"[TELEMETRY] 无法打开遥测文件: {e}")
+        sys.exit(1)
+
+    if args.once:
+        print(json.dumps({'path': reader.path, 'writer_pid': reader.writer_pid,
+                          'slots': [s._asdict() if s else None for s in reader.read_all()]},
+                         ensure_ascii=False, indent=2))
+        sys.exit(0)
+
+    try:
+        while True:
+            if reader.stale():
+                # 服务器退出或重启：重新映射新的文件
+                try:
+                    replacement = TelemetryReader(args.path)
+                except (OSError, ValueError):
+                    replacement = None
+                if replacement is not None and replacement.writer_pid:
+                    reader.close()
+                    reader = replacement
+                elif replacement is not None:
+                    replacement.close()
+            now = time.time()
+            lines = [f"{reader.path}  写入进程 {reader.writer_pid or '已退出'}"]
+            lines += [_format(state, now) for state in reader.read_all() if state is not None]
+            sys.stdout.write('\x1b[H\x1b[J' + '\n'.join(lines) + '\n')
+            sys.stdout.flush()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
@@ -0,0 +1,305 @@
+"""
+直接写 /dev/uinput 的 Linux 虚拟输入设备（不依赖 python-uinput）。
+
+设备通过 UI_DEV_SETUP / UI_ABS_SETUP ioctl 创建，事件以预先打包好的
+``struct input_event`` 记录暂存，每一帧（一组事件 + SYN_REPORT）用一次
+``os.writev`` 写出。
+
+传入 ``fd`` 时不会执行任何 ioctl，只往该文件描述符写事件记录，
+因此可以对着一个 pipe 使用，不需要 uinput 内核模块::
+
+    r, w = os.pipe()
+    pad = UinputGamepad(fd=w)
+    pad.set_axis('left_x', 0.5)
+    pad.flush()
+    events = list(read_events(os.read(r, 4096)))
+"""
+
+import os
+import struct
+
+try:
+    from config import config
+    JOYSTICK_CONFIG = config.JOYSTICK_CONFIG
+except Exception:
+    JOYSTICK_CONFIG = {}
+
+# ---- linux/uinput.h, linux/input-event-codes.h ----
+
+_IOC_NONE = 0
+_IOC_WRITE = 1
+
+
+def _IOC(direction, type_, nr, size):
+    return (direction << 30) | (size << 16) | (ord(type_) << 8) | nr
+
+
+def _IO(type_, nr):
+    return _IOC(_IOC_NONE, type_, nr, 0)
+
+
+def _IOW(type_, nr, size):
+    return _IOC(_IOC_WRITE, type_, nr, size)
+
+
+# struct input_event { struct timeval time; __u16 type; __u16 code; __s32 value; }
+INPUT_EVENT = struct.Struct('llHHi')
+# struct uinput_setup { struct input_id id; char name[80]; __u32 ff_effects_max; }
+UINPUT_SETUP = struct.Struct('HHHH80sI')
+# struct uinput_abs_setup { __u16 code; struct input_absinfo absinfo; }
+UINPUT_ABS_SETUP = struct.Struct('H2x6i')
+
+_VALUE = struct.Struct('i')
+_VALUE_OFFSET = INPUT_EVENT.size - _VALUE.size
+
+UI_DEV_CREATE = _IO('U', 1)
+UI_DEV_DESTROY = _IO('U', 2)
+UI_DEV_SETUP = _IOW('U', 3, UINPUT_SETUP.size)
+UI_ABS_SETUP = _IOW('U', 4, UINPUT_ABS_SETUP.size)
+UI_SET_EVBIT = _IOW('U', 100, 4)
+UI_SET_KEYBIT = _IOW('U', 101, 4)
+UI_SET_RELBIT = _IOW('U', 102, 4)
+UI_SET_ABSBIT = _IOW('U', 103, 4)
+
+BUS_USB = 0x03
+
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_REL = 0x02
+EV_ABS = 0x03
+SYN_REPORT = 0
+
+ABS_X = 0x00
+ABS_Y = 0x01
+ABS_Z = 0x02
+ABS_RX = 0x03
+ABS_RY = 0x04
+ABS_RZ = 0x05
+ABS_HAT0X = 0x10
+ABS_HAT0Y = 0x11
+
+REL_X = 0x00
+REL_Y = 0x01
+REL_HWHEEL = 0x06
+REL_WHEEL = 0x08
+
+BTN_LEFT = 0x110
+BTN_RIGHT = 0x111
+BTN_MIDDLE = 0x112
+
+BTN_A = 0x130
+BTN_B = 0x131
+BTN_X = 0x133
+BTN_Y = 0x134
+BTN_TL = 0x136
+BTN_TR = 0x137
+BTN_SELECT = 0x13a
+BTN_START = 0x13b
+BTN_MODE = 0x13c
+BTN_THUMBL = 0x13d
+BTN_THUMBR = 0x13e
+
+# Xbox 风格手柄的轴与按键
+GAMEPAD_AXES = {
+    'left_x': ABS_X,
+    'left_y': ABS_Y,
+    'right_x': ABS_RX,
+    'right_y': ABS_RY,
+    'left_trigger': ABS_Z,
+    'right_trigger': ABS_RZ,
+    'dpad_x': ABS_HAT0X,
+    'dpad_y': ABS_HAT0Y,
+}
+
+GAMEPAD_BUTTONS = {
+    'a': BTN_A,
+    'b': BTN_B,
+    'x': BTN_X,
+    'y': BTN_Y,
+    'lb': BTN_TL,
+    'rb': BTN_TR,
+    'back': BTN_SELECT,
+    'start': BTN_START,
+    'guide': BTN_MODE,
+    'ls': BTN_THUMBL,
+    'rs': BTN_THUMBR,
+}
+
+
+def pack_event(ev_type, code, value):
+    """Pack one ``struct input_event`` with a zero timestamp (the kernel stamps it)."""
+    return INPUT_EVENT.pack(0, 0, ev_type, code, value)
+
+
+SYN_REPORT_EVENT = pack_event(EV_SYN, SYN_REPORT, 0)
+
+
+def read_events(data):
+    """Decode raw ``struct input_event`` bytes into ``(type, code, value)`` tuples."""
+    for offset in range(0, len(data) - INPUT_EVENT.size + 1, INPUT_EVENT.size):
+        _, _, ev_type, code, value = INPUT_EVENT.unpack_from(data, offset)
+        yield ev_type, code, value
+
+
+class UinputDevice:
+    """A virtual input device written through /dev/uinput (or any fd).
+
+    Args:
+        name: device name shown to applications
+        keys: EV_KEY codes to enable
+        axes: {ABS code: (min, max, fuzz, flat)}
+        rels: EV_REL codes to enable
+        fd: write events to this file descriptor instead of opening ``path``;
+            no ioctls are issued and the fd is not closed by ``close()``
+        path: uinput device node
+    """
+
+    def __init__(self, name, keys=(), axes=None, rels=(), fd=None, path='/dev/uinput',
+                 vendor=0x045e, product=0x028e, version=1):
+        self.name = name
+        self.keys = tuple(keys)
+        self.axes = dict(axes or {})
+        self.rels = tuple(rels)
+        # 每个 (type, code) 一个预打包的事件记录，暂存时只改写 value 字段
+        self._slots = {}
+        self._pending = {}
+        self.frames_written = 0
+        self.events_written = 0
+        if fd is None:
+            self.fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+            self._owns_fd = True
+            try:
+                self._setup(vendor, product, version)
+            except Exception:
+                os.close(self.fd)
+                raise
+        else:
+            self.fd = fd
+            self._owns_fd = False
+
+    def _setup(self, vendor, product, version):
+        import fcntl
+        if self.keys:
+            fcntl.ioctl(self.fd, UI_SET_EVBIT, EV_KEY)
+            for code in self.keys:
+                fcntl.ioctl(self.fd, UI_SET_KEYBIT, code)
+        if self.rels:
+            fcntl.ioctl(self.fd, UI_SET_EVBIT, EV_REL)
+            for code in self.rels:
+                fcntl.ioctl(self.fd, UI_SET_RELBIT, code)
+        if self.axes:
+            fcntl.ioctl(self.fd, UI_SET_EVBIT, EV_ABS)
+            for code, (minimum, maximum, fuzz, flat) in self.axes.items():
+                fcntl.ioctl(self.fd, UI_SET_ABSBIT, code)
+                fcntl.ioctl(self.fd, UI_ABS_SETUP,
+                            UINPUT_ABS_SETUP.pack(code, 0, minimum, maximum, fuzz, flat, 0))
+        name = self.name.encode('utf-8')[:79]
+        fcntl.ioctl(self.fd, UI_DEV_SETUP,
+                    UINPUT_SETUP.pack(BUS_USB, vendor, product, version, name, 0))
+        fcntl.ioctl(self.fd, UI_DEV_CREATE)
+
+    def stage(self, ev_type, code, value):
+        """Queue an event for the next frame; a later value for the same code replaces it."""
+        key = (ev_type, code)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = bytearray(pack_event(ev_type, code, 0))
+        _VALUE.pack_into(slot, _VALUE_OFFSET, value)
+        self._pending[key] = slot
+
+    def flush(self):
+        """Write all staged events plus SYN_REPORT with a single writev. Returns the event count."""
+        if not self._pending:
+            return 0
+        iov = list(self._pending.values())
+        iov.append(SYN_REPORT_EVENT)
+        self._pending.clear()
+        os.writev(self.fd, iov)
+        self.frames_written += 1
+        self.events_written += len(iov)
+        return len(iov)
+
+    def write_frames(self, frames):
+        """Write several frames of prepacked records in one writev, each terminated by SYN_REPORT."""
+        iov = []
+        for frame in frames:
+            if frame:
+                iov.extend(frame)
+                iov.append(SYN_REPORT_EVENT)
+        if not iov:
+            return 0
+        os.writev(self.fd, iov)
+        self.frames_written += len(frames)
+        self.events_written += len(iov)
+        return len(iov)
+
+    def close(self):
+        self._pending.clear()
+        if self._owns_fd and self.fd is not None:
+            try:
+                import fcntl
+                fcntl.ioctl(self.fd, UI_DEV_DESTROY)
+            finally:
+                os.close(self.fd)
+        self.fd = None
+
+
+class UinputGamepad(UinputDevice):
+    """Xbox-style gamepad on top of :class:`UinputDevice`.
+
+    Sticks use ``JOYSTICK_CONFIG['axis_min'..'axis_max']``, triggers use
+    ``JOYSTICK_CONFIG['trigger_min'..'trigger_max']`` and the d-pad is a -1..1 hat.
+    """
+
+    def __init__(self, fd=None, path='/dev/uinput', name=None, joystick_config=None):
+        cfg = dict(JOYSTICK_CONFIG)
+        cfg.update(joystick_config or {})
+        self.axis_min = int(cfg.get('axis_min', -32767))
+        self.axis_max = int(cfg.get('axis_max', 32767))
+        self.trigger_min = int(cfg.get('trigger_min', 0))
+        self.trigger_max = int(cfg.get('trigger_max', 255))
+        stick_range = (self.axis_min, self.axis_max, 16, 128)
+        trigger_range = (self.trigger_min, self.trigger_max, 0, 0)
+        axes = {}
+        for axis_name, code in GAMEPAD_AXES.items():
+            if axis_name.endswith('_trigger'):
+                axes[code] = trigger_range
+            elif axis_name.startswith('dpad'):
+                axes[code] = (-1, 1, 0, 0)
+            else:
+                axes[code] = stick_range
+        super().__init__(name or cfg.get('name', 'wtxrc virtual gamepad'),
+                         keys=GAMEPAD_BUTTONS.values(), axes=axes, fd=fd, path=path)
+
+    def scale(self, axis_name, value):
+        """Map a float axis value (-1..1 for sticks, 0..1 for triggers) to the device range."""
+        if axis_name.endswith('_trigger'):
+            value = max(0.0, min(1.0, value))
+            return int(round(self.trigger_min + value * (self.trigger_max - self.trigger_min)))
+        value = max(-1.0, min(1.0, value))
+        if axis_name.startswith('dpad'):
+            return int(round(value))
+        return int(round(self.axis_min + (value + 1.0) * 0.5 * (self.axis_max - self.axis_min)))
+
+    def set_axis(self, axis_name, value):
+        """Stage an axis update; returns False for unknown axes."""
+        code = GAMEPAD_AXES.get(axis_name)
+        if code is None:
+            return False
+        self.stage(EV_ABS, code, self.scale(axis_name, value))
+        return True
+
+    def set_button(self, button, pressed):
+        """Stage a button state; returns False for unknown buttons."""
+        code = GAMEPAD_BUTTONS.get(button)
+        if code is None:
+            return False
+        self.stage(EV_KEY, code, 1 if pressed else 0)
+        return True
+
+    def reset(self):
+        """Stage neutral values for every axis and release every button."""
+        for axis_name in GAMEPAD_AXES:
+            self.set_axis(axis_name, 0.0)
+        for button in GAMEPAD_BUTTONS:
+            self.set_button(button, False)
@@ -0,0 +1,109 @@
+// 看板 / 直播叠加层：订阅 /api/dashboard/stream（Server-Sent Events），
+// 先收到完整快照，之后只收到变化的键；每个动画帧最多更新一次 DOM
+(() => {
+    const state = {};
+    const players = {};
+    let renderScheduled = false;
+
+    const $ = (id) => document.getElementById(id);
+
+    const scheduleRender = () => {
+        if (renderScheduled) return;
+        renderScheduled = true;
+        requestAnimationFrame(render);
+    };
+
+    const createPlayer = (name) => {
+        const root = document.createElement('div');
+        root.className = 'player';
+        root.innerHTML = `
+            <span class="title">${name.toUpperCase()}</span>
+            <div class="trigger"><div class="fill"></div></div>
+            <div class="stick"><div class="knob"></div></div>
+            <div class="stick"><div class="knob"></div></div>
+            <div class="trigger"><div class="fill"></div></div>
+            <div class="buttons"></div>`;
+        $('players').appendChild(root);
+        const [leftTrigger, rightTrigger] = root.querySelectorAll('.trigger .fill');
+        const [leftKnob, rightKnob] = root.querySelectorAll('.stick .knob');
+        return { root, leftTrigger, rightTrigger, leftKnob, rightKnob, buttons: root.querySelector('.buttons'), lastButtons: '' };
+    };
+
+    const renderChips = (container, labels) => {
+        container.replaceChildren(...labels.map(label => {
+            const chip = document.createElement('span');
+            chip.className = 'chip';
+            chip.textContent = label;
+            return chip;
+        }));
+    };
+
+    const moveKnob = (knob, x, y) => {
+        // 底座 96px、摇杆头 28px：可移动 34px；y 向上为正
+        knob.style.transform = `translate(${(x || 0) * 34}px, ${-(y || 0) * 34}px)`;
+    };
+
+    const render = () => {
+        renderScheduled = false;
+        $('profile').textContent = state.profile ? `${state.profile} · ${state.players || 0} 名玩家 · ${state.devices || 0} 台设备` : '';
+        renderChips($('held'), state.held || []);
+
+        const names = new Set();
+        Object.keys(state).forEach(key => {
+            const match = /^(p\d+)\./.exec(key);
+            if (match) names.add(match[1]);
+        });
+        Object.keys(players).forEach(name => {
+            if (!names.has(name)) {
+                players[name].root.remove();
+                delete players[name];
+            }
+        });
+        names.forEach(name => {
+            const player = players[name] || (players[name] = createPlayer(name));
+            moveKnob(player.leftKnob, state[`${name}.left_x`], state[`${name}.left_y`]);
+            moveKnob(player.rightKnob, state[`${name}.right_x`], state[`${name}.right_y`]);
+            player.leftTrigger.style.transform = `scaleY(${state[`${name}.left_trigger`] || 0})`;
+            player.rightTrigger.style.transform = `scaleY(${state[`${name}.right_trigger`] || 0})`;
+            const buttons = state[`${name}.buttons`] || [];
+            const signature = buttons.join(',');
+            if (signature !== player.lastButtons) {
+                player.lastButtons = signature;
+                renderChips(player.buttons, buttons);
+            }
+        });
+
+        const rows = Object.keys(state).filter(key => key.startsWith('slider.')).sort();
+        $('sliders').replaceChildren(...rows.map(key => {
+            const row = document.createElement('tr');
+            row.innerHTML = '<td></td><td></td>';
+            row.cells[0].textContent = key.slice('slider.'.length);
+            row.cells[1].textContent = Number(state[key]).toFixed(2);
+            return row;
+        }));
+    };
+
+    const source = new EventSource('/api/dashboard/stream');
+    source.addEventListener('snapshot', (e) => {
+        const message = JSON.parse(e.data);
+        Object.keys(state).forEach(key => delete state[key]);
+        Object.assign(state, message.state);
+        $('status').textContent = '已连接';
+        scheduleRender();
+    });
+    source.addEventListener('delta', (e) => {
+        const message = JSON.parse(e.data);
+        Object.entries(message.delta).forEach(([key, value]) => {
+            if (value === null) {
+                delete state[key];
+            } else {
+                state[key] = value;
+            }
+        });
+        scheduleRender();
+    });
+    source.onerror = () => {
+        // EventSource 会自动重连，重连后服务器重新发送快照
+        $('status').textContent = '重新连接中…';
+    };
+})();
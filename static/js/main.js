@@ -1,8 +1,30 @@
-const { createApp, ref, reactive, computed, onMounted, onUnmounted, nextTick } = Vue;
+const { createApp, ref, reactive, computed, watch, onMounted, onUnmounted, nextTick } = Vue;
 
 // Constants
 const MIN_BUTTON_SIZE = 50;
 const MAX_BUTTON_SIZE = 200;
+const MAX_TOUCHPAD_SIZE = 600;
+// 触控板：按下到抬起不超过 TOUCHPAD_TAP_MS 且总移动不超过 TOUCHPAD_TAP_SLOP（CSS 像素）视为轻触
+const TOUCHPAD_TAP_MS = 200;
+const TOUCHPAD_TAP_SLOP = 8;
+const DEFAULT_TOUCHPAD_SENSITIVITY = 1.5;
+// 虚拟摇杆：松开后按时间常数 THUMBSTICK_SPRING_MS（毫秒）弹回中心
+const THUMBSTICK_SPRING_MS = 40;
+// 按钮动作为“宏”时的默认设置（脚本语法见 server/input_manager.py 的 parse_macro）
+const DEFAULT_MACRO = {
+    script: '',
+    repeat: false,  // 连发：按住期间每 interval 秒重复一次
+    interval: 0.1,
+    cancel_on_release: false  // 单次宏松开按钮时是否中止（连发总是在松开时停止）
+};
+// 手机上连接的手柄（Gamepad API）：轴变化小于该值时不发送
+const GAMEPAD_AXIS_EPSILON = 0.004;
+const DEFAULT_THUMBSTICK = {
+    stick: 'left',  // 'left' 或 'right'
+    deadzone: 0.1,
+    deadzoneShape: 'radial',  // 'radial'（径向）或 'square'（按轴独立）
+    autoCenter: true
+};
 const BUTTON_EVENT_DELAY = 0; // Delay in ms between button_down and button_up events
 
 // 用于显示消息的辅助函数
@@ -39,6 +61,28 @@ const BUTTON_COLORS = [
     { name: '信息', color: '#909399' }
 ];
 
+// 轴滤波默认配置（与 config.py 中的 filter 字段一致）
+const DEFAULT_AXIS_FILTER = {
+    type: 'none',
+    min_cutoff: 1.0,
+    beta: 5.0,
+    d_cutoff: 1.0,
+    smooth_time: 0.03,
+    prediction: 'none',
+    max_horizon: 0.05
+};
+
+// 轴响应曲线默认配置（与 config.py 中的 curve 等字段一致）
+const DEFAULT_AXIS_CURVE = {
+    type: 'linear',
+    exponent: 2.0
+};
+const DEFAULT_AXIS_SHAPING = {
+    outer_deadzone: 0.0,
+    anti_deadzone: 0.0,
+    invert: false
+};
+
 const app = createApp({
     setup() {
         const socket = io();
@@ -47,6 +91,9 @@ const app = createApp({
         const slidersData = ref([]);  // 拖动条数据
         const isEditing = ref(false);
         const mode = ref('custom_keys');
+        // 配置档案：当前档案名与服务器预加载的档案列表 [{ name, title, mode }]
+        const profileName = ref('default');
+        const profileList = ref([]);
         const modifierKeys = ref([]);
         const specialKeys = ref([]);
         
@@ -65,12 +112,12 @@ const app = createApp({
             sliders: [],
             // 新的统一轴配置
             axis_config: {
-                left_x: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0 },
-                left_y: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0 },
-                right_x: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0 },
-                right_y: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0 },
-                left_trigger: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0 },
-                right_trigger: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0 }
+                left_x: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0, ...DEFAULT_AXIS_SHAPING, curve: { ...DEFAULT_AXIS_CURVE }, filter: { ...DEFAULT_AXIS_FILTER } },
+                left_y: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0, ...DEFAULT_AXIS_SHAPING, curve: { ...DEFAULT_AXIS_CURVE }, filter: { ...DEFAULT_AXIS_FILTER } },
+                right_x: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0, ...DEFAULT_AXIS_SHAPING, curve: { ...DEFAULT_AXIS_CURVE }, filter: { ...DEFAULT_AXIS_FILTER } },
+                right_y: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0, ...DEFAULT_AXIS_SHAPING, curve: { ...DEFAULT_AXIS_CURVE }, filter: { ...DEFAULT_AXIS_FILTER } },
+                left_trigger: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0, ...DEFAULT_AXIS_SHAPING, curve: { ...DEFAULT_AXIS_CURVE }, filter: { ...DEFAULT_AXIS_FILTER } },
+                right_trigger: { source_type: 'none', source_id: null, peak_value: 1.0, deadzone: 0.05, gyro_range: 90.0, ...DEFAULT_AXIS_SHAPING, curve: { ...DEFAULT_AXIS_CURVE }, filter: { ...DEFAULT_AXIS_FILTER } }
             }
         });
         
@@ -88,9 +135,11 @@ const app = createApp({
         const showDrivingConfigDialog = ref(false);  // 驾驶模式配置对话框
         const editingButton = reactive({
             id: '',
-            type: 'button',  // 'button' 或 'slider'
+            type: 'button',  // 'button'、'slider'、'touchpad' 或 'thumbstick'
             label: '',
             keys: [],
+            action: 'keys',  // 'keys'（释放时执行按键）、'macro'（按下时执行宏）或 'gyro_clutch'（按住时暂停陀螺仪瞄准）
+            macro: { ...DEFAULT_MACRO },
             colorIndex: 0,
             width: 100,
             height: 100,
@@ -100,7 +149,11 @@ const app = createApp({
             orientation: 'horizontal',  // 'horizontal' 或 'vertical'
             autoCenter: true,  // 是否自动归中
             axis: 'right_x',  // 绑定的xbox轴
-            rangeMode: 'bipolar'  // 'bipolar' ([-1, 1]) 或 'unipolar' ([0, 1])
+            rangeMode: 'bipolar',  // 'bipolar' ([-1, 1]) 或 'unipolar' ([0, 1])
+            // 触控板特有属性：每个 CSS 像素对应的指针像素数
+            sensitivity: DEFAULT_TOUCHPAD_SENSITIVITY,
+            // 虚拟摇杆特有属性
+            ...DEFAULT_THUMBSTICK
         });
         const selectedModifiers = ref([]); // 支持多个修饰键
         const selectedSpecialKey = ref('');
@@ -110,7 +163,30 @@ const app = createApp({
         const showMainDeviceDialog = ref(false);
         const hasExistingMainDevice = ref(false);
         const isMainDevice = ref(false);
+        // 本地多人：本设备的玩家编号和服务器的玩家槽位
+        const playerNumber = ref(null);
+        const freeSlots = ref(0);
+        const maxGamepads = ref(1);
+        // 陀螺仪瞄准（姿态变化 -> 鼠标移动）
+        const gyroMouse = ref(false);
         const gyroData = reactive({ alpha: 0, beta: 0, gamma: 0 });
+        // devicemotion 角速度源：轴配置使用 rate_* / fused_* 时，按传感器原生频率发送 motion_data
+        const MOTION_SOURCE_PATTERN = /^(rate|fused)_/;
+        const usesMotionSource = computed(() => Object.values(drivingConfig.axis_config || {}).some(
+            cfg => cfg && cfg.source_type === 'gyro' && MOTION_SOURCE_PATTERN.test(cfg.source_id || '')
+        ));
+        const connectedGamepad = ref('');  // 手机上连接的手柄名称（Gamepad API）
+        
+        // 服务器输入后端就绪状态（后端在服务器监听后于后台加载）
+        const backendStatus = reactive({});
+        const backendsLoading = computed(() => {
+            return Object.values(backendStatus).some(b => b.state === 'pending' || b.state === 'loading');
+        });
+        const failedBackends = computed(() => {
+            return Object.entries(backendStatus)
+                .filter(([, b]) => b.state === 'failed')
+                .map(([name]) => name);
+        });
         
         // Responsive dialog width
         const dialogWidth = computed(() => {
@@ -170,6 +246,9 @@ const app = createApp({
         const onAxisSourceTypeChange = (axisConfig) => {
             if (axisConfig.source_type === 'none') {
                 axisConfig.source_id = null;
+            } else if (axisConfig.source_type === 'gamepad') {
+                // 默认直通：手柄的同名轴
+                axisConfig.source_id = axisConfig.axis;
             }
         };
         
@@ -187,55 +266,85 @@ const app = createApp({
         // Timeout tracking for button event delays
         const pendingButtonTimeouts = new Set();
         
+        // 触控板：pointerId -> { id, x, y }（按下时所在的触控板，整个序列都属于它）
+        const touchpadPointers = new Map();
+        // 触控板手势状态：btnId -> { count, maxCount, startTime, travel }
+        const touchpadGestures = {};
+        // 本帧尚未发送的位移：btnId -> { dx, dy, sx, sy }，每个动画帧最多发送一次
+        const touchpadPending = {};
+        // 虚拟摇杆：pointerId -> btnId；btnId -> { x, y, pointerId, springing, lastTime, dirty }
+        const thumbstickPointers = new Map();
+        const thumbstickStates = {};
+        // 触控板位移与摇杆位置每个动画帧合并发送一次
+        let frameFlushScheduled = false;
+        
         // 编辑模式下的拖拽/缩放状态
         let dragState = null; // { buttonIndex, mode: 'move'|'resize', offsetX, offsetY, corner }
         
+        // 应用服务器发送的完整配置（首次加载或切换档案时）
+        const applyConfig = (data) => {
+            buttonsData.value = data.buttons || [];
+            mode.value = data.mode || 'custom_keys';
+            profileName.value = data.profile || 'default';
+            profileList.value = data.profiles || [];
+            modifierKeys.value = data.modifier_keys || ['ctrl', 'shift', 'alt', 'cmd', 'win'];
+            specialKeys.value = data.special_keys || [];
+            
+            // 清理旧的 axis 属性从所有滑块中
+            buttonsData.value.forEach(btn => {
+                if (btn.type === 'slider' && btn.hasOwnProperty('axis')) {
+                    delete btn.axis;
+                }
+            });
+            
+            // 加载驾驶模式配置
+            if (data.driving_config) {
+                Object.assign(drivingConfig, data.driving_config);
+                slidersData.value = drivingConfig.sliders || [];
+                
+                // 如果没有新的轴配置，从旧的gyro_axis_mapping和slider配置迁移
+                if (!drivingConfig.axis_config || Object.keys(drivingConfig.axis_config).length === 0) {
+                    migrateToUnifiedAxisConfig();
+                } else {
+                    // 确保所有轴都有配置
+                    const axes = ['left_x', 'left_y', 'right_x', 'right_y', 'left_trigger', 'right_trigger'];
+                    axes.forEach(axis => {
+                        if (!drivingConfig.axis_config[axis]) {
+                            drivingConfig.axis_config[axis] = {
+                                source_type: 'none',
+                                source_id: null,
+                                peak_value: 1.0,
+                                deadzone: 0.05,
+                                gyro_range: 90.0,
+                                ...DEFAULT_AXIS_SHAPING,
+                                curve: { ...DEFAULT_AXIS_CURVE },
+                                filter: { ...DEFAULT_AXIS_FILTER }
+                            };
+                        } else if (drivingConfig.axis_config[axis].gyro_range === undefined) {
+                            // 为已存在的配置添加 gyro_range 字段
+                            drivingConfig.axis_config[axis].gyro_range = 90.0;
+                        }
+                        // 为已存在的配置添加 filter 字段
+                        if (!drivingConfig.axis_config[axis].filter) {
+                            drivingConfig.axis_config[axis].filter = { ...DEFAULT_AXIS_FILTER };
+                        }
+                        // 为已存在的配置添加响应曲线字段
+                        drivingConfig.axis_config[axis] = { ...DEFAULT_AXIS_SHAPING, ...drivingConfig.axis_config[axis] };
+                        if (!drivingConfig.axis_config[axis].curve) {
+                            drivingConfig.axis_config[axis].curve = { ...DEFAULT_AXIS_CURVE };
+                        }
+                    });
+                }
+            }
+            
+            markDirty();
+        };
+        
         // Load initial config
         const loadConfig = async () => {
             try {
                 const response = await fetch('/api/config');
-                const data = await response.json();
-                buttonsData.value = data.buttons || [];
-                mode.value = data.mode || 'custom_keys';
-                modifierKeys.value = data.modifier_keys || ['ctrl', 'shift', 'alt', 'cmd', 'win'];
-                specialKeys.value = data.special_keys || [];
-                
-                // 清理旧的 axis 属性从所有滑块中
-                buttonsData.value.forEach(btn => {
-                    if (btn.type === 'slider' && btn.hasOwnProperty('axis')) {
-                        delete btn.axis;
-                    }
-                });
-                
-                // 加载驾驶模式配置
-                if (data.driving_config) {
-                    Object.assign(drivingConfig, data.driving_config);
-                    slidersData.value = drivingConfig.sliders || [];
-                    
-                    // 如果没有新的轴配置，从旧的gyro_axis_mapping和slider配置迁移
-                    if (!drivingConfig.axis_config || Object.keys(drivingConfig.axis_config).length === 0) {
-                        migrateToUnifiedAxisConfig();
-                    } else {
-                        // 确保所有轴都有配置
-                        const axes = ['left_x', 'left_y', 'right_x', 'right_y', 'left_trigger', 'right_trigger'];
-                        axes.forEach(axis => {
-                            if (!drivingConfig.axis_config[axis]) {
-                                drivingConfig.axis_config[axis] = {
-                                    source_type: 'none',
-                                    source_id: null,
-                                    peak_value: 1.0,
-                                    deadzone: 0.05,
-                                    gyro_range: 90.0
-                                };
-                            } else if (drivingConfig.axis_config[axis].gyro_range === undefined) {
-                                // 为已存在的配置添加 gyro_range 字段
-                                drivingConfig.axis_config[axis].gyro_range = 90.0;
-                            }
-                        });
-                    }
-                }
-                
-                markDirty();
+                applyConfig(await response.json());
             } catch (error) {
                 console.error('加载配置失败：', error);
             }
@@ -253,7 +362,10 @@ const app = createApp({
                     source_id: null,
                     peak_value: 1.0,
                     deadzone: 0.05,
-                    gyro_range: 90.0
+                    gyro_range: 90.0,
+                    ...DEFAULT_AXIS_SHAPING,
+                    curve: { ...DEFAULT_AXIS_CURVE },
+                    filter: { ...DEFAULT_AXIS_FILTER }
                 };
             });
             
@@ -315,45 +427,199 @@ const app = createApp({
             needsRender = true;
         };
         
-        // Dirty flag for optimized rendering
+        // 渲染：每个控件不随输入变化的外观预先绘制到离屏画布（精灵），只有尺寸、颜色、
+        // 标签、编辑模式等配置变化时才重绘精灵。markDirty(id) 只重绘该控件所在的
+        // 矩形区域（与其重叠的控件在该区域内一起重绘），markDirty() 重绘整个画布
         let needsRender = true;
+        // 命中测试索引需要重建（见 getButtonAtPoint）
+        let hitIndexStale = true;
+        const dirtyControls = new Set();
+        // `${id}:${layer}` -> { signature, canvas }
+        const spriteCache = new Map();
+        // 控件 id -> 上一次绘制占用的矩形（移动/缩放后要连同旧位置一起擦除）
+        const drawnRects = new Map();
+        // 精灵四周留出描边、阴影的空间
+        const SPRITE_PAD = 4;
+        const CANVAS_BACKGROUND = '#f0f2f5';
+        const LABEL_FONT = '600 12px -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif';
+        const BUTTON_FONT = '600 14px -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif';
         
-        const markDirty = () => {
-            needsRender = true;
+        const markDirty = (id) => {
+            if (id === undefined) {
+                needsRender = true;
+                hitIndexStale = true;
+            } else {
+                dirtyControls.add(id);
+            }
         };
         
         const renderLoop = () => {
             if (needsRender) {
                 renderCanvas();
                 needsRender = false;
+                dirtyControls.clear();
+            } else if (dirtyControls.size > 0) {
+                renderDirtyControls();
             }
             animationFrameId = requestAnimationFrame(renderLoop);
         };
         
+        const controlRect = (btn) => ({
+            x: btn.x - SPRITE_PAD,
+            y: btn.y - SPRITE_PAD,
+            width: btn.width + SPRITE_PAD * 2,
+            height: btn.height + SPRITE_PAD * 2
+        });
+        
+        const drawControl = (btn) => {
+            if (btn.type === 'slider') {
+                drawSlider(btn);
+            } else if (btn.type === 'touchpad') {
+                drawTouchpad(btn);
+            } else if (btn.type === 'thumbstick') {
+                drawThumbstick(btn);
+            } else {
+                drawButton(btn);
+            }
+            drawnRects.set(btn.id, controlRect(btn));
+        };
+        
         const renderCanvas = () => {
             if (!ctx) return;
             
             // Clear canvas
-            ctx.fillStyle = '#f0f2f5';
+            ctx.fillStyle = CANVAS_BACKGROUND;
             ctx.fillRect(0, 0, canvasWidth, canvasHeight);
             
-            // Draw each button
-            buttonsData.value.forEach((btn, index) => {
-                if (btn.type === 'slider') {
-                    drawSlider(btn, index);
-                } else {
-                    drawButton(btn, index);
-                }
+            // 丢弃已删除控件的精灵
+            const ids = new Set(buttonsData.value.map(btn => btn.id));
+            spriteCache.forEach((_, key) => {
+                if (!ids.has(key.slice(0, key.lastIndexOf(':')))) spriteCache.delete(key);
             });
+            drawnRects.clear();
+            
+            buttonsData.value.forEach(drawControl);
         };
         
-        const drawButton = (btn, index) => {
-            const isActive = !!activeButtonsMap[btn.id];
-            const colorIndex = btn.colorIndex !== undefined ? btn.colorIndex : 0;
-            const color = BUTTON_COLORS[colorIndex % BUTTON_COLORS.length].color;
+        const renderDirtyControls = () => {
+            if (!ctx) return;
+            const dpr = window.devicePixelRatio || 1;
+            const rects = [];
+            dirtyControls.forEach(id => {
+                const previous = drawnRects.get(id);
+                if (previous) rects.push(previous);
+                const btn = buttonsData.value.find(b => b.id === id);
+                if (btn) rects.push(controlRect(btn));
+            });
+            dirtyControls.clear();
             
-            let x = btn.x;
-            let y = btn.y;
+            rects.forEach(rect => {
+                // 对齐到设备像素，避免边缘留下半透明的残影
+                const x0 = Math.floor(rect.x * dpr) / dpr;
+                const y0 = Math.floor(rect.y * dpr) / dpr;
+                const x1 = Math.ceil((rect.x + rect.width) * dpr) / dpr;
+                const y1 = Math.ceil((rect.y + rect.height) * dpr) / dpr;
+                ctx.save();
+                ctx.beginPath();
+                ctx.rect(x0, y0, x1 - x0, y1 - y0);
+                ctx.clip();
+                ctx.fillStyle = CANVAS_BACKGROUND;
+                ctx.fillRect(x0, y0, x1 - x0, y1 - y0);
+                buttonsData.value.forEach(btn => {
+                    if (btn.x - SPRITE_PAD < x1 && btn.x + btn.width + SPRITE_PAD > x0 &&
+                        btn.y - SPRITE_PAD < y1 && btn.y + btn.height + SPRITE_PAD > y0) {
+                        drawControl(btn);
+                    }
+                });
+                ctx.restore();
+            });
+        };
+        
+        // 影响精灵外观的配置；任何一项变化都会重绘该控件的精灵
+        const spriteSignature = (btn) => [
+            btn.width, btn.height, btn.colorIndex, btn.label, btn.orientation,
+            btn.deadzone, btn.deadzoneShape, isEditing.value, window.devicePixelRatio || 1
+        ].join('|');
+        
+        const getSprite = (btn, layer, paint) => {
+            const key = `${btn.id}:${layer}`;
+            const signature = spriteSignature(btn);
+            const cached = spriteCache.get(key);
+            if (cached && cached.signature === signature) return cached.canvas;
+            
+            const dpr = window.devicePixelRatio || 1;
+            const width = Math.ceil((btn.width + SPRITE_PAD * 2) * dpr);
+            const height = Math.ceil((btn.height + SPRITE_PAD * 2) * dpr);
+            const canvas = cached ? cached.canvas :
+                (typeof OffscreenCanvas !== 'undefined' ? new OffscreenCanvas(width, height) : document.createElement('canvas'));
+            // 设置尺寸会清空画布并重置绘图状态
+            canvas.width = width;
+            canvas.height = height;
+            const g = canvas.getContext('2d');
+            // 精灵坐标系：控件左上角为原点
+            g.setTransform(dpr, 0, 0, dpr, SPRITE_PAD * dpr, SPRITE_PAD * dpr);
+            paint(g);
+            spriteCache.set(key, { signature, canvas });
+            return canvas;
+        };
+        
+        const blitSprite = (sprite, btn) => {
+            const dpr = window.devicePixelRatio || 1;
+            // 按设备像素对齐，精灵以 1:1 绘制，不做缩放插值
+            const x = Math.round((btn.x - SPRITE_PAD) * dpr) / dpr;
+            const y = Math.round((btn.y - SPRITE_PAD) * dpr) / dpr;
+            ctx.drawImage(sprite, x, y, sprite.width / dpr, sprite.height / dpr);
+        };
+        
+        const controlColor = (btn) => {
+            const colorIndex = btn.colorIndex !== undefined ? btn.colorIndex : 0;
+            return BUTTON_COLORS[colorIndex % BUTTON_COLORS.length].color;
+        };
+        
+        const roundRectPath = (g, x, y, width, height, radius) => {
+            g.beginPath();
+            g.moveTo(x + radius, y);
+            g.lineTo(x + width - radius, y);
+            g.quadraticCurveTo(x + width, y, x + width, y + radius);
+            g.lineTo(x + width, y + height - radius);
+            g.quadraticCurveTo(x + width, y + height, x + width - radius, y + height);
+            g.lineTo(x + radius, y + height);
+            g.quadraticCurveTo(x, y + height, x, y + height - radius);
+            g.lineTo(x, y + radius);
+            g.quadraticCurveTo(x, y, x + radius, y);
+            g.closePath();
+        };
+        
+        // 编辑模式下的虚线边框与缩放把手（精灵坐标）
+        const strokeEditable = (g) => {
+            if (isEditing.value) {
+                g.setLineDash([5, 3]);
+            }
+            g.stroke();
+            g.setLineDash([]);
+        };
+        
+        const paintResizeHandle = (g, btn) => {
+            if (isEditing.value) {
+                const handleSize = 12;
+                g.fillStyle = '#409eff';
+                g.fillRect(btn.width - handleSize, btn.height - handleSize, handleSize, handleSize);
+            }
+        };
+        
+        // 标签 + 缩放把手，画在拖动条滑块、摇杆头之上
+        const paintLabelOverlay = (g, btn, color, top) => {
+            g.fillStyle = color;
+            g.font = LABEL_FONT;
+            g.textAlign = 'center';
+            g.textBaseline = 'top';
+            g.fillText(btn.label, btn.width / 2, top);
+            paintResizeHandle(g, btn);
+        };
+        
+        const paintButton = (g, btn, isActive) => {
+            let x = 0;
+            let y = 0;
             let width = btn.width;
             let height = btn.height;
             
@@ -367,88 +633,48 @@ const app = createApp({
             }
             
             // Draw button background
-            ctx.fillStyle = color;
-            ctx.strokeStyle = isEditing.value ? '#409eff' : 'rgba(0,0,0,0.2)';
-            ctx.lineWidth = isEditing.value ? 2 : 1;
-            
-            // Rounded rectangle
-            const radius = 8;
-            ctx.beginPath();
-            ctx.moveTo(x + radius, y);
-            ctx.lineTo(x + width - radius, y);
-            ctx.quadraticCurveTo(x + width, y, x + width, y + radius);
-            ctx.lineTo(x + width, y + height - radius);
-            ctx.quadraticCurveTo(x + width, y + height, x + width - radius, y + height);
-            ctx.lineTo(x + radius, y + height);
-            ctx.quadraticCurveTo(x, y + height, x, y + height - radius);
-            ctx.lineTo(x, y + radius);
-            ctx.quadraticCurveTo(x, y, x + radius, y);
-            ctx.closePath();
-            
-            ctx.fill();
-            
-            if (isEditing.value) {
-                ctx.setLineDash([5, 3]);
-            }
-            ctx.stroke();
-            ctx.setLineDash([]);
+            g.fillStyle = controlColor(btn);
+            g.strokeStyle = isEditing.value ? '#409eff' : 'rgba(0,0,0,0.2)';
+            g.lineWidth = isEditing.value ? 2 : 1;
+            roundRectPath(g, x, y, width, height, 8);
+            g.fill();
+            strokeEditable(g);
             
             // Draw button label
-            ctx.fillStyle = 'white';
-            ctx.font = '600 14px -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif';
-            ctx.textAlign = 'center';
-            ctx.textBaseline = 'middle';
-            ctx.shadowColor = 'rgba(0,0,0,0.3)';
-            ctx.shadowBlur = 2;
-            ctx.shadowOffsetY = 1;
-            ctx.fillText(btn.label, x + width/2, y + height/2);
-            ctx.shadowBlur = 0;
-            
-            // 在编辑模式下绘制缩放把手
-            if (isEditing.value) {
-                const handleSize = 12;
-                ctx.fillStyle = '#409eff';
-                ctx.fillRect(
-                    btn.x + btn.width - handleSize,
-                    btn.y + btn.height - handleSize,
-                    handleSize,
-                    handleSize
-                );
-            }
+            g.fillStyle = 'white';
+            g.font = BUTTON_FONT;
+            g.textAlign = 'center';
+            g.textBaseline = 'middle';
+            g.shadowColor = 'rgba(0,0,0,0.3)';
+            g.shadowBlur = 2;
+            g.shadowOffsetY = 1;
+            g.fillText(btn.label, x + width / 2, y + height / 2);
+            g.shadowBlur = 0;
+            
+            paintResizeHandle(g, btn);
         };
         
-        const drawSlider = (slider, index) => {
-            const colorIndex = slider.colorIndex !== undefined ? slider.colorIndex : 0;
-            const color = BUTTON_COLORS[colorIndex % BUTTON_COLORS.length].color;
-            
+        const drawButton = (btn) => {
+            const isActive = !!activeButtonsMap[btn.id];
+            blitSprite(getSprite(btn, isActive ? 'active' : 'idle', g => paintButton(g, btn, isActive)), btn);
+        };
+        
+        const paintSliderTrack = (g, slider) => {
+            g.fillStyle = 'rgba(0,0,0,0.1)';
+            g.strokeStyle = isEditing.value ? '#409eff' : 'rgba(0,0,0,0.2)';
+            g.lineWidth = isEditing.value ? 2 : 1;
+            roundRectPath(g, 0, 0, slider.width, slider.height, 8);
+            g.fill();
+            strokeEditable(g);
+        };
+        
+        const drawSlider = (slider) => {
             // 获取当前值和范围模式
             const rangeMode = slider.rangeMode || 'bipolar';  // 'bipolar' ([-1, 1]) 或 'unipolar' ([0, 1])
             const sliderValue = slider.currentValue !== undefined ? slider.currentValue : getSliderDefaultValue(rangeMode);
             
-            // 绘制背景轨道
-            ctx.fillStyle = 'rgba(0,0,0,0.1)';
-            ctx.strokeStyle = isEditing.value ? '#409eff' : 'rgba(0,0,0,0.2)';
-            ctx.lineWidth = isEditing.value ? 2 : 1;
-            
-            const radius = 8;
-            ctx.beginPath();
-            ctx.moveTo(slider.x + radius, slider.y);
-            ctx.lineTo(slider.x + slider.width - radius, slider.y);
-            ctx.quadraticCurveTo(slider.x + slider.width, slider.y, slider.x + slider.width, slider.y + radius);
-            ctx.lineTo(slider.x + slider.width, slider.y + slider.height - radius);
-            ctx.quadraticCurveTo(slider.x + slider.width, slider.y + slider.height, slider.x + slider.width - radius, slider.y + slider.height);
-            ctx.lineTo(slider.x + radius, slider.y + slider.height);
-            ctx.quadraticCurveTo(slider.x, slider.y + slider.height, slider.x, slider.y + slider.height - radius);
-            ctx.lineTo(slider.x, slider.y + radius);
-            ctx.quadraticCurveTo(slider.x, slider.y, slider.x + radius, slider.y);
-            ctx.closePath();
-            ctx.fill();
-            
-            if (isEditing.value) {
-                ctx.setLineDash([5, 3]);
-            }
-            ctx.stroke();
-            ctx.setLineDash([]);
+            // 背景轨道
+            blitSprite(getSprite(slider, 'track', g => paintSliderTrack(g, slider)), slider);
             
             // 绘制滑块
             const knobSize = slider.orientation === 'horizontal' ? slider.height * 0.8 : slider.width * 0.8;
@@ -471,12 +697,6 @@ const app = createApp({
                 
                 knobX = slider.x + knobSize / 2 + normalizedPos * rangeX;
                 knobY = centerY;
-                
-                // 绘制滑块
-                ctx.fillStyle = color;
-                ctx.beginPath();
-                ctx.arc(knobX, knobY, knobSize / 2, 0, Math.PI * 2);
-                ctx.fill();
             } else {
                 // 竖向拖动条
                 const centerX = slider.x + slider.width / 2;
@@ -494,42 +714,196 @@ const app = createApp({
                 
                 knobX = centerX;
                 knobY = slider.y + knobSize / 2 + normalizedPos * rangeY;
-                
-                // 绘制滑块
-                ctx.fillStyle = color;
-                ctx.beginPath();
-                ctx.arc(knobX, knobY, knobSize / 2, 0, Math.PI * 2);
-                ctx.fill();
             }
             
-            // \u7ed8\u5236\u6807\u7b7e
-            ctx.fillStyle = 'rgba(0,0,0,0.7)';
-            ctx.font = '600 12px -apple-system, BlinkMacSystemFont, \"Segoe UI\", Roboto, sans-serif';
-            ctx.textAlign = 'center';
-            ctx.textBaseline = 'top';
-            ctx.fillText(slider.label, slider.x + slider.width / 2, slider.y + 4);
+            ctx.fillStyle = controlColor(slider);
+            ctx.beginPath();
+            ctx.arc(knobX, knobY, knobSize / 2, 0, Math.PI * 2);
+            ctx.fill();
+            
+            // 标签与缩放把手
+            blitSprite(getSprite(slider, 'label', g => paintLabelOverlay(g, slider, 'rgba(0,0,0,0.7)', 4)), slider);
+        };
+        
+        const paintTouchpad = (g, pad, count) => {
+            const isActive = count > 0;
+            g.fillStyle = isActive ? 'rgba(0,0,0,0.15)' : 'rgba(0,0,0,0.08)';
+            g.strokeStyle = isEditing.value ? '#409eff' : controlColor(pad);
+            g.lineWidth = isEditing.value || isActive ? 2 : 1;
+            roundRectPath(g, 0, 0, pad.width, pad.height, 12);
+            g.fill();
+            strokeEditable(g);
+            
+            // 标签与手指数
+            g.fillStyle = 'rgba(0,0,0,0.5)';
+            g.font = LABEL_FONT;
+            g.textAlign = 'center';
+            g.textBaseline = 'top';
+            g.fillText(isActive ? `${pad.label} · ${count}` : pad.label, pad.width / 2, 6);
+            
+            paintResizeHandle(g, pad);
+        };
+        
+        const drawTouchpad = (pad) => {
+            const gesture = touchpadGestures[pad.id];
+            const count = gesture ? gesture.count : 0;
+            blitSprite(getSprite(pad, `fingers${count}`, g => paintTouchpad(g, pad, count)), pad);
+        };
+        
+        // 摇杆几何：中心、底座半径、摇杆头半径与可移动距离
+        const getThumbstickGeometry = (stick) => {
+            const radius = Math.min(stick.width, stick.height) / 2;
+            const knobRadius = radius * 0.4;
+            return {
+                cx: stick.x + stick.width / 2,
+                cy: stick.y + stick.height / 2,
+                radius,
+                knobRadius,
+                travel: Math.max(1, radius - knobRadius)
+            };
+        };
+        
+        const paintThumbstickBase = (g, stick) => {
+            const { cx, cy, radius, travel } = getThumbstickGeometry({ x: 0, y: 0, width: stick.width, height: stick.height });
             
-            // \u5728\u7f16\u8f91\u6a21\u5f0f\u4e0b\u7ed8\u5236\u7f29\u653e\u628a\u624b
             if (isEditing.value) {
-                const handleSize = 12;
-                ctx.fillStyle = '#409eff';
-                ctx.fillRect(
-                    slider.x + slider.width - handleSize,
-                    slider.y + slider.height - handleSize,
-                    handleSize,
-                    handleSize
-                );
+                g.strokeStyle = '#409eff';
+                g.lineWidth = 1;
+                g.setLineDash([5, 3]);
+                g.strokeRect(0, 0, stick.width, stick.height);
+                g.setLineDash([]);
+            }
+            
+            // 底座
+            g.fillStyle = 'rgba(0,0,0,0.08)';
+            g.strokeStyle = 'rgba(0,0,0,0.2)';
+            g.lineWidth = 1;
+            g.beginPath();
+            g.arc(cx, cy, radius, 0, Math.PI * 2);
+            g.fill();
+            g.stroke();
+            
+            // 死区范围
+            const deadzone = (stick.deadzone !== undefined ? stick.deadzone : DEFAULT_THUMBSTICK.deadzone) * travel;
+            if (deadzone > 0) {
+                g.strokeStyle = 'rgba(0,0,0,0.25)';
+                g.setLineDash([3, 3]);
+                g.beginPath();
+                if (stick.deadzoneShape === 'square') {
+                    g.rect(cx - deadzone, cy - deadzone, deadzone * 2, deadzone * 2);
+                } else {
+                    g.arc(cx, cy, deadzone, 0, Math.PI * 2);
+                }
+                g.stroke();
+                g.setLineDash([]);
             }
         };
         
+        const drawThumbstick = (stick) => {
+            const state = thumbstickStates[stick.id];
+            const { cx, cy, knobRadius, travel } = getThumbstickGeometry(stick);
+            
+            blitSprite(getSprite(stick, 'base', g => paintThumbstickBase(g, stick)), stick);
+            
+            // 摇杆头（y 向上为正）
+            const knobX = cx + (state ? state.x : 0) * travel;
+            const knobY = cy - (state ? state.y : 0) * travel;
+            ctx.fillStyle = controlColor(stick);
+            ctx.beginPath();
+            ctx.arc(knobX, knobY, knobRadius, 0, Math.PI * 2);
+            ctx.fill();
+            
+            blitSprite(getSprite(stick, 'label', g => paintLabelOverlay(g, stick, 'rgba(0,0,0,0.6)', 2)), stick);
+        };
+        
+        // 命中测试的均匀网格索引：每个格子记录与之相交的控件下标（升序，即绘制顺序），
+        // 查询时只检查指针所在格子里的控件，从最上层（下标最大）开始。
+        // 布局整体变化（markDirty()、增删控件）时在下一次查询前重建，编辑器拖动时增量更新
+        const HIT_CELL_SIZE = 64;
+        const HIT_GRID_SPAN = 1024;
+        const hitGrid = new Map();  // 格子编号 -> [控件下标]
+        const hitCells = [];  // 控件下标 -> 它所在的格子编号
+        let hitIndexedLayout = null;
+        let hitIndexedCount = -1;
+        
+        const hitCellCoord = (value) => Math.max(0, Math.min(HIT_GRID_SPAN - 1, Math.floor(value / HIT_CELL_SIZE)));
+        
+        const insertHitCells = (index) => {
+            const btn = buttonsData.value[index];
+            const cells = [];
+            const x0 = hitCellCoord(btn.x);
+            const x1 = hitCellCoord(btn.x + btn.width);
+            const y0 = hitCellCoord(btn.y);
+            const y1 = hitCellCoord(btn.y + btn.height);
+            for (let cy = y0; cy <= y1; cy++) {
+                for (let cx = x0; cx <= x1; cx++) {
+                    const cell = cy * HIT_GRID_SPAN + cx;
+                    cells.push(cell);
+                    let list = hitGrid.get(cell);
+                    if (!list) {
+                        list = [];
+                        hitGrid.set(cell, list);
+                    }
+                    // 二分查找插入位置，保持下标升序
+                    let lo = 0;
+                    let hi = list.length;
+                    while (lo < hi) {
+                        const mid = (lo + hi) >> 1;
+                        if (list[mid] < index) lo = mid + 1;
+                        else hi = mid;
+                    }
+                    list.splice(lo, 0, index);
+                }
+            }
+            hitCells[index] = cells;
+        };
+        
+        const removeHitCells = (index) => {
+            const cells = hitCells[index];
+            if (!cells) return;
+            cells.forEach(cell => {
+                const list = hitGrid.get(cell);
+                if (!list) return;
+                const pos = list.indexOf(index);
+                if (pos >= 0) list.splice(pos, 1);
+                if (list.length === 0) hitGrid.delete(cell);
+            });
+            hitCells[index] = null;
+        };
+        
+        const rebuildHitIndex = () => {
+            hitGrid.clear();
+            hitCells.length = 0;
+            const layout = buttonsData.value;
+            for (let i = 0; i < layout.length; i++) {
+                insertHitCells(i);
+            }
+            hitIndexedLayout = layout;
+            hitIndexedCount = layout.length;
+            hitIndexStale = false;
+        };
+        
+        // 编辑器移动/缩放了一个控件
+        const updateHitIndex = (index) => {
+            if (hitIndexStale) return;
+            removeHitCells(index);
+            insertHitCells(index);
+        };
+        
         // Find button at a given point (canvas coordinates)
         const getButtonAtPoint = (canvasX, canvasY) => {
+            const layout = buttonsData.value;
+            if (hitIndexStale || layout !== hitIndexedLayout || layout.length !== hitIndexedCount) {
+                rebuildHitIndex();
+            }
+            const list = hitGrid.get(hitCellCoord(canvasY) * HIT_GRID_SPAN + hitCellCoord(canvasX));
+            if (!list) return null;
             // Check buttons in reverse order (top-most first)
-            for (let i = buttonsData.value.length - 1; i >= 0; i--) {
-                const btn = buttonsData.value[i];
+            for (let i = list.length - 1; i >= 0; i--) {
+                const btn = layout[list[i]];
                 if (canvasX >= btn.x && canvasX <= btn.x + btn.width &&
                     canvasY >= btn.y && canvasY <= btn.y + btn.height) {
-                    return { button: btn, index: i };
+                    return { button: btn, index: list[i] };
                 }
             }
             return null;
@@ -568,7 +942,7 @@ const app = createApp({
             console.log(`按钮 ${btn.label} 按下`);
             socket.emit('button_down', { id: btn.id, label: btn.label });
             activeButtonsMap[btnId] = true;
-            markDirty();
+            markDirty(btnId);
             // Visual feedback only - key action will be executed on pointer release
         };
         
@@ -577,7 +951,7 @@ const app = createApp({
             if (!activeButtonsMap[btnId]) return;
             
             delete activeButtonsMap[btnId];
-            markDirty();
+            markDirty(btnId);
             // Visual state cleanup only - no key events emitted
         };
         
@@ -593,7 +967,7 @@ const app = createApp({
                     const defaultValue = getSliderDefaultValue(rangeMode);
                     btn.currentValue = defaultValue;
                     socket.emit('slider_value', { id: btn.id, value: defaultValue });
-                    markDirty();
+                    markDirty(btn.id);
                 }
                 return;
             }
@@ -645,9 +1019,196 @@ const app = createApp({
             
             // 发送到后端
             socket.emit('slider_value', { id: slider.id, value: value });
-            markDirty();
+            markDirty(slider.id);
+        };
+        
+        // ---- 触控板 ----
+        // pointermove 可能以远高于帧率的频率到达：位移先在本地累积，每个动画帧合并为一条
+        // touchpad_delta 发送，服务器再按鼠标输出周期累积后写出
+        const scheduleFrameFlush = () => {
+            if (frameFlushScheduled) return;
+            frameFlushScheduled = true;
+            requestAnimationFrame(flushFrameInputs);
+        };
+        
+        const flushFrameInputs = (now) => {
+            frameFlushScheduled = false;
+            flushTouchpadDeltas();
+            flushThumbsticks(now);
+        };
+        
+        const flushTouchpadDeltas = () => {
+            Object.keys(touchpadPending).forEach(padId => {
+                const pending = touchpadPending[padId];
+                delete touchpadPending[padId];
+                if (pending.dx || pending.dy || pending.sx || pending.sy) {
+                    socket.emit('touchpad_delta', {
+                        id: padId,
+                        dx: Math.round(pending.dx * 100) / 100,
+                        dy: Math.round(pending.dy * 100) / 100,
+                        sx: Math.round(pending.sx * 100) / 100,
+                        sy: Math.round(pending.sy * 100) / 100
+                    });
+                }
+            });
+        };
+        
+        const handleTouchpadDown = (pad, e, x, y) => {
+            let gesture = touchpadGestures[pad.id];
+            if (!gesture || gesture.count === 0) {
+                gesture = touchpadGestures[pad.id] = { count: 0, maxCount: 0, startTime: e.timeStamp, travel: 0 };
+            }
+            gesture.count += 1;
+            gesture.maxCount = Math.max(gesture.maxCount, gesture.count);
+            touchpadPointers.set(e.pointerId, { id: pad.id, x, y });
+            markDirty(pad.id);
+        };
+        
+        const handleTouchpadMove = (pointer, x, y) => {
+            const dx = x - pointer.x;
+            const dy = y - pointer.y;
+            pointer.x = x;
+            pointer.y = y;
+            if (!dx && !dy) return;
+            
+            const pad = buttonsData.value.find(b => b.id === pointer.id);
+            const gesture = touchpadGestures[pointer.id];
+            if (!pad || !gesture) return;
+            gesture.travel += Math.abs(dx) + Math.abs(dy);
+            
+            const pending = touchpadPending[pointer.id] || (touchpadPending[pointer.id] = { dx: 0, dy: 0, sx: 0, sy: 0 });
+            if (gesture.count >= 2) {
+                // 双指滚动：取各手指位移的平均值
+                pending.sx += dx / gesture.count;
+                pending.sy += dy / gesture.count;
+            } else {
+                const sensitivity = pad.sensitivity !== undefined ? pad.sensitivity : DEFAULT_TOUCHPAD_SENSITIVITY;
+                pending.dx += dx * sensitivity;
+                pending.dy += dy * sensitivity;
+            }
+            scheduleFrameFlush();
+        };
+        
+        const handleTouchpadUp = (pointerId, timeStamp) => {
+            const pointer = touchpadPointers.get(pointerId);
+            touchpadPointers.delete(pointerId);
+            const gesture = touchpadGestures[pointer.id];
+            if (!gesture) return;
+            gesture.count = Math.max(0, gesture.count - 1);
+            if (gesture.count === 0) {
+                // 先发出未发送的位移，保证点击落在移动后的位置
+                flushTouchpadDeltas();
+                const isTap = timeStamp - gesture.startTime <= TOUCHPAD_TAP_MS && gesture.travel <= TOUCHPAD_TAP_SLOP;
+                if (isTap) {
+                    socket.emit('touchpad_tap', { id: pointer.id, button: gesture.maxCount >= 2 ? 'right' : 'left' });
+                }
+                delete touchpadGestures[pointer.id];
+            }
+            markDirty(pointer.id);
+        };
+        
+        const resetTouchpads = () => {
+            touchpadPointers.clear();
+            Object.keys(touchpadGestures).forEach(padId => delete touchpadGestures[padId]);
+            Object.keys(touchpadPending).forEach(padId => delete touchpadPending[padId]);
+        };
+        
+        // ---- 虚拟摇杆 ----
+        // x/y 合并为一条 stick_value，每个动画帧最多发送一次；服务器作为一次两轴原子更新写入手柄
+        const handleThumbstickDown = (stick, e, x, y) => {
+            const state = thumbstickStates[stick.id] || (thumbstickStates[stick.id] = { x: 0, y: 0, pointerId: null, springing: false, lastTime: 0, dirty: false });
+            // 每个摇杆只跟随一个 pointer
+            if (state.pointerId !== null) return;
+            state.pointerId = e.pointerId;
+            state.springing = false;
+            thumbstickPointers.set(e.pointerId, stick.id);
+            handleThumbstickMove(stick.id, x, y);
+        };
+        
+        const handleThumbstickMove = (stickId, x, y) => {
+            const stick = buttonsData.value.find(b => b.id === stickId);
+            const state = thumbstickStates[stickId];
+            if (!stick || !state) return;
+            const { cx, cy, travel } = getThumbstickGeometry(stick);
+            let vx = (x - cx) / travel;
+            let vy = (cy - y) / travel;
+            const magnitude = Math.hypot(vx, vy);
+            if (magnitude > 1) {
+                vx /= magnitude;
+                vy /= magnitude;
+            }
+            if (vx === state.x && vy === state.y) return;
+            state.x = vx;
+            state.y = vy;
+            state.dirty = true;
+            scheduleFrameFlush();
+            markDirty(stickId);
+        };
+        
+        const handleThumbstickUp = (pointerId) => {
+            const stickId = thumbstickPointers.get(pointerId);
+            thumbstickPointers.delete(pointerId);
+            const stick = buttonsData.value.find(b => b.id === stickId);
+            const state = thumbstickStates[stickId];
+            if (!state) return;
+            state.pointerId = null;
+            const autoCenter = stick && stick.autoCenter !== undefined ? stick.autoCenter : DEFAULT_THUMBSTICK.autoCenter;
+            if (autoCenter) {
+                // 弹簧归中：在后续动画帧中指数衰减到中心
+                state.springing = true;
+                state.lastTime = performance.now();
+                scheduleFrameFlush();
+            }
+        };
+        
+        const flushThumbsticks = (now) => {
+            Object.keys(thumbstickStates).forEach(stickId => {
+                const state = thumbstickStates[stickId];
+                if (state.springing) {
+                    const dt = Math.max(0, now - state.lastTime);
+                    state.lastTime = now;
+                    const decay = Math.exp(-dt / THUMBSTICK_SPRING_MS);
+                    state.x *= decay;
+                    state.y *= decay;
+                    if (Math.hypot(state.x, state.y) < 0.01) {
+                        state.x = 0;
+                        state.y = 0;
+                        state.springing = false;
+                    } else {
+                        scheduleFrameFlush();
+                    }
+                    state.dirty = true;
+                    markDirty(stickId);
+                }
+                if (state.dirty) {
+                    state.dirty = false;
+                    socket.emit('stick_value', {
+                        id: stickId,
+                        x: Math.round(state.x * 1000) / 1000,
+                        y: Math.round(state.y * 1000) / 1000
+                    });
+                }
+            });
         };
         
+        const resetThumbsticks = () => {
+            thumbstickPointers.clear();
+            Object.keys(thumbstickStates).forEach(stickId => {
+                const state = thumbstickStates[stickId];
+                state.pointerId = null;
+                state.springing = false;
+                if (state.x || state.y) {
+                    state.x = 0;
+                    state.y = 0;
+                    state.dirty = true;
+                    scheduleFrameFlush();
+                }
+            });
+        };
+        
+        // 触控板与摇杆捕获在其上按下的整个 pointer 序列，不参与按钮的滑入/滑出
+        const capturesPointer = (btn) => btn.type === 'touchpad' || btn.type === 'thumbstick';
+        
         // Canvas event handlers
         const setupCanvasEvents = () => {
             const canvas = canvasRef.value;
@@ -694,7 +1255,12 @@ const app = createApp({
             } else {
                 // Normal mode - track pointer even if not on button initially
                 // This allows for slide-in detection in pointermove
-                if (hit) {
+                if (hit && hit.button.type === 'touchpad') {
+                    // 触控板捕获整个 pointer 序列，移出范围也继续跟踪
+                    handleTouchpadDown(hit.button, e, x, y);
+                } else if (hit && hit.button.type === 'thumbstick') {
+                    handleThumbstickDown(hit.button, e, x, y);
+                } else if (hit) {
                     pointerToButton.set(e.pointerId, hit.button.id);
                     
                     // \u5982\u679c\u662f\u62d6\u52a8\u6761\uff0c\u7acb\u5373\u5904\u7406\u503c\u66f4\u65b0
@@ -731,18 +1297,30 @@ const app = createApp({
                 } else if (dragState.mode === 'resize') {
                     const deltaX = x - dragState.startX;
                     const deltaY = y - dragState.startY;
-                    btn.width = Math.max(MIN_BUTTON_SIZE, Math.min(MAX_BUTTON_SIZE, dragState.startWidth + deltaX));
-                    btn.height = Math.max(MIN_BUTTON_SIZE, Math.min(MAX_BUTTON_SIZE, dragState.startHeight + deltaY));
+                    const maxSize = btn.type === 'touchpad' ? MAX_TOUCHPAD_SIZE : MAX_BUTTON_SIZE;
+                    btn.width = Math.max(MIN_BUTTON_SIZE, Math.min(maxSize, dragState.startWidth + deltaX));
+                    btn.height = Math.max(MIN_BUTTON_SIZE, Math.min(maxSize, dragState.startHeight + deltaY));
                 }
-                markDirty();
+                updateHitIndex(dragState.buttonIndex);
+                markDirty(btn.id);
             } else if (!isEditing.value) {
+                const touchpadPointer = touchpadPointers.get(e.pointerId);
+                if (touchpadPointer) {
+                    handleTouchpadMove(touchpadPointer, x, y);
+                    return;
+                }
+                if (thumbstickPointers.has(e.pointerId)) {
+                    handleThumbstickMove(thumbstickPointers.get(e.pointerId), x, y);
+                    return;
+                }
+                
                 // Check if pointer moved to different button
                 // Only handle tracked pointers
                 if (!pointerToButton.has(e.pointerId)) return;
                 
                 const currentBtnId = pointerToButton.get(e.pointerId);
                 const hit = getButtonAtPoint(x, y);
-                const newBtnId = hit ? hit.button.id : null;
+                const newBtnId = hit && !capturesPointer(hit.button) ? hit.button.id : null;
                 
                 // \u5982\u679c\u5f53\u524d\u6309\u94ae\u662f\u62d6\u52a8\u6761\uff0c\u5904\u7406\u62d6\u52a8
                 if (currentBtnId && hit && hit.button.id === currentBtnId && hit.button.type === 'slider') {
@@ -772,6 +1350,13 @@ const app = createApp({
             if (isEditing.value) {
                 dragState = null;
             } else {
+                if (touchpadPointers.has(e.pointerId)) {
+                    handleTouchpadUp(e.pointerId, e.timeStamp);
+                }
+                if (thumbstickPointers.has(e.pointerId)) {
+                    handleThumbstickUp(e.pointerId);
+                }
+                
                 const btnId = pointerToButton.get(e.pointerId);
                 if (btnId) {
                     // Execute the button action on release
@@ -814,6 +1399,8 @@ const app = createApp({
                     handleButtonRelease(btnId);
                 });
                 pointerToButton.clear();
+                resetTouchpads();
+                resetThumbsticks();
             }
             markDirty();
         };
@@ -830,6 +1417,8 @@ const app = createApp({
                 type: btn.type || 'button',
                 label: btn.label,
                 keys: [...(btn.keys || [])],
+                action: btn.action || 'keys',
+                macro: { ...DEFAULT_MACRO, ...(btn.macro || {}) },
                 colorIndex: btn.colorIndex !== undefined ? btn.colorIndex : 0,
                 width: btn.width || 100,
                 height: btn.height || 100,
@@ -837,7 +1426,11 @@ const app = createApp({
                 y: btn.y,
                 orientation: btn.orientation || 'horizontal',
                 autoCenter: btn.autoCenter !== undefined ? btn.autoCenter : true,
-                rangeMode: btn.rangeMode || 'bipolar'  // 向后兼容：旧的拖动条默认为bipolar
+                rangeMode: btn.rangeMode || 'bipolar',  // 向后兼容：旧的拖动条默认为bipolar
+                sensitivity: btn.sensitivity !== undefined ? btn.sensitivity : DEFAULT_TOUCHPAD_SENSITIVITY,
+                stick: btn.stick || DEFAULT_THUMBSTICK.stick,
+                deadzone: btn.deadzone !== undefined ? btn.deadzone : DEFAULT_THUMBSTICK.deadzone,
+                deadzoneShape: btn.deadzoneShape || DEFAULT_THUMBSTICK.deadzoneShape
             });
             showEditDialog.value = true;
         };
@@ -848,6 +1441,8 @@ const app = createApp({
                 type: 'button',
                 label: 'New',
                 keys: [],
+                action: 'keys',
+                macro: { ...DEFAULT_MACRO },
                 colorIndex: 0,
                 width: 80,
                 height: 80,
@@ -880,6 +1475,38 @@ const app = createApp({
             showEditDialog.value = true;
         };
         
+        const addNewThumbstick = () => {
+            Object.assign(editingButton, {
+                id: '',
+                type: 'thumbstick',
+                label: 'Stick',
+                keys: [],
+                colorIndex: 0,
+                width: 160,
+                height: 160,
+                x: 50,
+                y: 50,
+                ...DEFAULT_THUMBSTICK
+            });
+            showEditDialog.value = true;
+        };
+        
+        const addNewTouchpad = () => {
+            Object.assign(editingButton, {
+                id: '',
+                type: 'touchpad',
+                label: 'Touchpad',
+                keys: [],
+                colorIndex: 0,
+                width: 300,
+                height: 200,
+                x: 50,
+                y: 50,
+                sensitivity: DEFAULT_TOUCHPAD_SENSITIVITY
+            });
+            showEditDialog.value = true;
+        };
+        
         // Add all selected keys at once (supports multiple modifiers)
         const addKey = () => {
             // Add all selected modifiers
@@ -925,6 +1552,30 @@ const app = createApp({
                 y: editingButton.y
             };
             
+            if (editingButton.type === 'button') {
+                buttonData.action = editingButton.action || 'keys';
+                if (buttonData.action === 'macro') {
+                    const macro = editingButton.macro;
+                    buttonData.macro = {
+                        script: macro.script,
+                        repeat: !!macro.repeat,
+                        interval: macro.interval,
+                        cancel_on_release: macro.repeat ? true : !!macro.cancel_on_release
+                    };
+                }
+            }
+            
+            if (editingButton.type === 'touchpad') {
+                buttonData.sensitivity = editingButton.sensitivity;
+            }
+            
+            if (editingButton.type === 'thumbstick') {
+                buttonData.stick = editingButton.stick;
+                buttonData.deadzone = editingButton.deadzone;
+                buttonData.deadzoneShape = editingButton.deadzoneShape;
+                buttonData.autoCenter = editingButton.autoCenter;
+            }
+            
             // 如果是拖动条，添加拖动条特有属性
             if (editingButton.type === 'slider') {
                 buttonData.orientation = editingButton.orientation;
@@ -978,7 +1629,7 @@ const app = createApp({
                 
                 // 从统一轴配置中反向生成旧格式
                 Object.entries(drivingConfig.axis_config).forEach(([axis, config]) => {
-                    if (config.source_type === 'gyro' && config.source_id) {
+                    if (config.source_type === 'gyro' && config.source_id in newGyroMapping) {
                         newGyroMapping[config.source_id] = axis;
                     } else if (config.source_type === 'slider' && config.source_id) {
                         const sliderBtn = buttonsData.value.find(b => b.id === config.source_id && b.type === 'slider');
@@ -1013,7 +1664,7 @@ const app = createApp({
                 const result = await response.json();
                 console.log('保存驾驶配置响应:', result);
                 
-                showMessage.success('驾驶配置已保存，请重启服务器以应用更改');
+                showMessage.success('驾驶配置已保存并已生效');
             } catch (error) {
                 console.error('保存驾驶配置失败：', error);
                 showMessage.error('保存驾驶配置失败: ' + error.message);
@@ -1090,10 +1741,77 @@ const app = createApp({
                     window.addEventListener('deviceorientation', handleGyro);
                 }
             }
+            if (usesMotionSource.value) {
+                startMotion();
+            }
         };
         
         const stopGyroscope = () => {
             window.removeEventListener('deviceorientation', handleGyro);
+            stopMotion();
+        };
+        
+        let motionActive = false;
+        let lastMotionTime = -Infinity;
+        let orientationPending = false;
+        
+        const startMotion = () => {
+            if (motionActive || typeof DeviceMotionEvent === 'undefined') return;
+            const listen = () => {
+                motionActive = true;
+                window.addEventListener('devicemotion', handleMotion);
+            };
+            if (typeof DeviceMotionEvent.requestPermission === 'function') {
+                DeviceMotionEvent.requestPermission()
+                    .then(permissionState => {
+                        if (permissionState === 'granted') {
+                            listen();
+                        }
+                    })
+                    .catch(console.error);
+            } else {
+                listen();
+            }
+        };
+        
+        const stopMotion = () => {
+            motionActive = false;
+            lastMotionTime = -Infinity;
+            window.removeEventListener('devicemotion', handleMotion);
+        };
+        
+        watch(usesMotionSource, (enabled) => {
+            if (!isMainDevice.value) return;
+            if (enabled) {
+                startMotion();
+            } else {
+                stopMotion();
+            }
+        });
+        
+        const handleMotion = (event) => {
+            const rate = event.rotationRate;
+            if (!rate || rate.alpha === null) {
+                // 没有陀螺仪（只有加速度计）：退回 deviceorientation
+                console.warn('devicemotion 不含 rotationRate，改用 deviceorientation');
+                stopMotion();
+                return;
+            }
+            lastMotionTime = event.timeStamp;
+            const data = {
+                rate_alpha: rate.alpha || 0,
+                rate_beta: rate.beta || 0,
+                rate_gamma: rate.gamma || 0,
+                t: event.timeStamp
+            };
+            if (orientationPending) {
+                // 新的 deviceorientation 姿态随角速度一起发送，作为服务器端融合的漂移参考
+                orientationPending = false;
+                data.alpha = gyroData.alpha;
+                data.beta = gyroData.beta;
+                data.gamma = gyroData.gamma;
+            }
+            socket.emit('motion_data', data);
         };
         
         const handleGyro = (event) => {
@@ -1101,26 +1819,214 @@ const app = createApp({
             gyroData.beta = event.beta || 0;
             gyroData.gamma = event.gamma || 0;
             
+            // devicemotion 正常触发时，姿态只作为下一个 motion_data 的参考，不单独发送
+            if (motionActive && event.timeStamp - lastMotionTime < 250) {
+                orientationPending = true;
+                return;
+            }
+            
             socket.emit('gyro_data', {
                 alpha: gyroData.alpha,
                 beta: gyroData.beta,
-                gamma: gyroData.gamma
+                gamma: gyroData.gamma,
+                t: event.timeStamp  // 传感器事件时间（毫秒），服务器滤波器据此计算 dt
+            });
+        };
+        
+        // 周期性测量往返延迟，服务器用它决定预测外推时长
+        const LATENCY_PROBE_INTERVAL = 2000;
+        let latencyProbeTimer = null;
+        
+        const probeLatency = () => {
+            socket.emit('latency_probe', performance.now(), (sentAt) => {
+                socket.emit('latency_report', { rtt: performance.now() - sentAt });
             });
         };
         
+        const startLatencyProbe = () => {
+            if (latencyProbeTimer) return;
+            probeLatency();
+            latencyProbeTimer = setInterval(probeLatency, LATENCY_PROBE_INTERVAL);
+        };
+        
+        const stopLatencyProbe = () => {
+            if (latencyProbeTimer) {
+                clearInterval(latencyProbeTimer);
+                latencyProbeTimer = null;
+            }
+        };
+        
+        // ---- 手机上连接的手柄（Gamepad API） ----
+        // 每个动画帧读取一次 navigator.getGamepads()，与上次发送的状态比较，
+        // 只把变化的轴和按键以 [下标, 值, ...] 的形式发送（gamepad_delta）
+        let gamepadIndex = null;
+        let gamepadPollId = null;
+        let gamepadTimestamp = null;
+        const gamepadLast = { axes: [], buttons: [] };
+        
+        // 清空已发送的状态，下一帧重新发送完整状态（重连、服务器归中之后）
+        const resetGamepadBaseline = () => {
+            gamepadLast.axes = [];
+            gamepadLast.buttons = [];
+            gamepadTimestamp = null;
+        };
+        
+        const pollGamepad = () => {
+            gamepadPollId = requestAnimationFrame(pollGamepad);
+            const pad = navigator.getGamepads ? navigator.getGamepads()[gamepadIndex] : null;
+            if (!pad || !pad.connected) return;
+            // 浏览器没有新的输入报告时 timestamp 不变
+            if (pad.timestamp && pad.timestamp === gamepadTimestamp) return;
+            gamepadTimestamp = pad.timestamp;
+            
+            const a = [];
+            for (let i = 0; i < pad.axes.length; i++) {
+                const value = Math.round(pad.axes[i] * 1000) / 1000;
+                const last = gamepadLast.axes[i];
+                if (last === undefined || Math.abs(value - last) >= GAMEPAD_AXIS_EPSILON || (value === 0 && last !== 0)) {
+                    gamepadLast.axes[i] = value;
+                    a.push(i, value);
+                }
+            }
+            const b = [];
+            for (let i = 0; i < pad.buttons.length; i++) {
+                const button = pad.buttons[i];
+                let value = Math.round(button.value * 100) / 100;
+                if (button.pressed && value === 0) value = 1;
+                if (gamepadLast.buttons[i] !== value) {
+                    gamepadLast.buttons[i] = value;
+                    b.push(i, value);
+                }
+            }
+            if (a.length || b.length) {
+                socket.emit('gamepad_delta', { a, b });
+            }
+        };
+        
+        const onGamepadConnected = (e) => {
+            if (mode.value !== 'driving' || gamepadIndex !== null) return;
+            gamepadIndex = e.gamepad.index;
+            connectedGamepad.value = e.gamepad.id;
+            resetGamepadBaseline();
+            socket.emit('gamepad_delta', { reset: true });
+            if (!gamepadPollId) {
+                gamepadPollId = requestAnimationFrame(pollGamepad);
+            }
+        };
+        
+        const onGamepadDisconnected = (e) => {
+            if (e.gamepad.index !== gamepadIndex) return;
+            stopGamepadPolling();
+            socket.emit('gamepad_delta', { reset: true });
+        };
+        
+        const stopGamepadPolling = () => {
+            if (gamepadPollId) {
+                cancelAnimationFrame(gamepadPollId);
+                gamepadPollId = null;
+            }
+            gamepadIndex = null;
+            connectedGamepad.value = '';
+        };
+        
+        socket.on('connect', () => {
+            resetGamepadBaseline();
+        });
+        
         // Socket event handlers
         socket.on('ask_main_device', (data) => {
             hasExistingMainDevice.value = data.current_main;
+            freeSlots.value = data.free_slots ?? 0;
+            maxGamepads.value = data.max_gamepads ?? 1;
             showMainDeviceDialog.value = true;
         });
         
         socket.on('main_status_changed', (data) => {
             isMainDevice.value = data.is_main;
+            playerNumber.value = data.is_main ? (data.player ?? null) : null;
+            gyroMouse.value = !!(data.is_main && data.gyro_mouse);
+            if (data.reason === 'full') {
+                showMessage.warning('玩家槽位已满，无法设为主设备');
+            }
             if (data.is_main) {
                 startGyroscope();
+                startLatencyProbe();
             } else {
                 stopGyroscope();
+                stopLatencyProbe();
+            }
+        });
+        
+        socket.on('gyro_mouse_changed', (data) => {
+            gyroMouse.value = !!data.enabled;
+        });
+        
+        const setGyroMouse = (enabled) => {
+            socket.emit('set_gyro_mouse', { enabled });
+        };
+        
+        socket.on('players_changed', (data) => {
+            maxGamepads.value = data.max_gamepads ?? maxGamepads.value;
+            freeSlots.value = (data.players || []).filter(p => !p.occupied).length;
+        });
+        
+        // 把当前轴配置保存为本玩家自己的配置（不影响其他玩家）
+        const savePlayerProfile = () => {
+            const axisConfig = JSON.parse(JSON.stringify(drivingConfig.axis_config));
+            socket.emit('set_player_profile', { axis_config: axisConfig }, (res) => {
+                if (res && res.status === 'success') {
+                    showMessage.success(`已保存为玩家 ${res.player} 的配置`);
+                } else {
+                    showMessage.error((res && res.message) || '保存玩家配置失败');
+                }
+            });
+        };
+        
+        socket.on('input_stalled', (data) => {
+            console.warn('[看门狗] 输入停滞，已归中', data);
+            resetGamepadBaseline();
+            if (data.reason === 'timeout') {
+                showMessage.warning('输入中断，轴已归中');
+            }
+        });
+        
+        // 页面切到后台时通知服务器立即归中，而不是等待超时
+        const onVisibilityChange = () => {
+            if (document.visibilityState === 'hidden') {
+                socket.emit('client_hidden');
+                resetGamepadBaseline();
+            }
+        };
+        
+        socket.on('backend_status', (data) => {
+            Object.assign(backendStatus, data.backends || {});
+        });
+        
+        // 切换档案：服务器已释放按住的输入并归中，这里只丢弃本地的按下状态（不发送 button_up，
+        // 新档案中可能有同 id 的按钮），然后直接应用推送的新布局
+        const switchProfile = (name) => {
+            if (name === profileName.value) return;
+            socket.emit('switch_profile', { name }, (res) => {
+                if (!res || res.status !== 'success') {
+                    showMessage.error((res && res.message) || '切换档案失败');
+                }
+            });
+        };
+        
+        socket.on('profile_changed', (data) => {
+            Object.keys(activeButtonsMap).forEach(btnId => delete activeButtonsMap[btnId]);
+            pointerToButton.clear();
+            resetTouchpads();
+            thumbstickPointers.clear();
+            Object.keys(thumbstickStates).forEach(stickId => delete thumbstickStates[stickId]);
+            isEditing.value = false;
+            if (data.config.mode !== 'driving') {
+                showDrivingConfigDialog.value = false;
+                showMainDeviceDialog.value = false;
             }
+            applyConfig(data.config);
+            const profile = profileList.value.find(p => p.name === data.name);
+            showMessage.success(`已切换到档案: ${profile ? profile.title : data.name}`);
         });
         
         socket.on('layout_saved', (data) => {
@@ -1140,11 +2046,15 @@ const app = createApp({
                 if (canvas) {
                     canvas.addEventListener('dblclick', onCanvasDoubleClick);
                 }
+                document.addEventListener('visibilitychange', onVisibilityChange);
+                window.addEventListener('gamepadconnected', onGamepadConnected);
+                window.addEventListener('gamepaddisconnected', onGamepadDisconnected);
             });
         });
         
         onUnmounted(() => {
             stopGyroscope();
+            stopLatencyProbe();
             if (animationFrameId) {
                 cancelAnimationFrame(animationFrameId);
             }
@@ -1152,6 +2062,10 @@ const app = createApp({
             pendingButtonTimeouts.forEach(timeoutId => clearTimeout(timeoutId));
             pendingButtonTimeouts.clear();
             window.removeEventListener('resize', resizeCanvas);
+            document.removeEventListener('visibilitychange', onVisibilityChange);
+            window.removeEventListener('gamepadconnected', onGamepadConnected);
+            window.removeEventListener('gamepaddisconnected', onGamepadDisconnected);
+            stopGamepadPolling();
         });
         
         return {
@@ -1160,6 +2074,9 @@ const app = createApp({
             slidersData,
             isEditing,
             mode,
+            profileName,
+            profileList,
+            switchProfile,
             modifierKeys,
             specialKeys,
             showEditDialog,
@@ -1171,7 +2088,17 @@ const app = createApp({
             showMainDeviceDialog,
             hasExistingMainDevice,
             isMainDevice,
+            playerNumber,
+            freeSlots,
+            maxGamepads,
+            savePlayerProfile,
+            gyroMouse,
+            setGyroMouse,
             gyroData,
+            connectedGamepad,
+            backendStatus,
+            backendsLoading,
+            failedBackends,
             drivingConfig,
             dialogWidth,
             activeButtonsMap,
@@ -1185,6 +2112,8 @@ const app = createApp({
             editButton,
             addNewButton,
             addNewSlider,
+            addNewTouchpad,
+            addNewThumbstick,
             addKey,
             removeKey,
             saveButtonEdit,